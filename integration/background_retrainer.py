@@ -0,0 +1,113 @@
+from owlready2 import *
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import tempfile
+import os
+from time import process_time
+
+
+KNOWLEDGE_FOLDER = "knowledge_folder"
+
+# rules inductor living in the worker process (set by the worker's initializer)
+_worker_inductor = None
+# temporary working directory of the worker process (the inductors save their files relative to it)
+_worker_dir = None
+# whether or not the records learnt by the worker's incremental model are compared with the snapshot
+_worker_verification = False
+
+
+def _init_worker(onto_path, rules_inductor_class, records_verification):
+    """ Preparing the worker process - loading the base ontology (the TBox and the actions' synonyms needed for
+     the training) and moving to the separate working directory, so the files of the worker and of the system
+     do not collide """
+    global _worker_inductor, _worker_dir, _worker_verification
+    onto = get_ontology("file://" + onto_path).load()
+    _worker_inductor = rules_inductor_class(onto)
+    _worker_verification = records_verification
+    _worker_dir = tempfile.TemporaryDirectory()
+    os.makedirs(os.path.join(_worker_dir.name, KNOWLEDGE_FOLDER))
+    os.chdir(_worker_dir.name)
+
+
+def _retrain(dataset, changed_records):
+    """ Training the new model on the snapshot of the history (the incremental model learns only the changed records);
+     returns the inference rules (in the text form) and the CPU time of the training """
+    retraining_time = process_time()
+    _worker_inductor.dataset = dataset
+    if _worker_inductor.incremental:
+        _worker_inductor.merge_changed_records(changed_records)
+    _worker_inductor.train_model()
+    if _worker_verification and _worker_inductor.incremental and not _worker_inductor.verify_learnt_records():
+        print("Warning! The records learnt in the background differ from the snapshot, building the model again...")
+        _worker_inductor.merge_changed_records(None)
+        _worker_inductor.train_model()
+    rules_swrl = _worker_inductor.get_swrl_rules()
+    _worker_inductor.dataset = None
+    # the incremental model is updated by the next retraining
+    if not _worker_inductor.incremental:
+        _worker_inductor.model = None
+    return rules_swrl, process_time() - retraining_time
+
+
+class BackgroundRetrainer:
+    """ Worker process that trains the new inference rules on the snapshots of the history, while the system keeps
+     classifying with the previous rules; the system collects the finished rules and swaps them in by itself """
+    def __init__(self, onto_path, rules_inductor_class, records_verification=False):
+        # 'spawn' is used, so the worker does not inherit the system's ontology
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker,
+                                            initargs=(os.path.abspath(onto_path), rules_inductor_class,
+                                                      records_verification))
+        self.future = None  # the retraining in progress
+        # records changed by all the updates of the dataset since the last submitted retraining, the ones learnt by
+        # the system's own inductor too (see 'RulesInductorHoeffding.merge_changed_records')
+        self.changed_records = dict()
+        self.generation = None  # generation of the rules that the retraining in progress was started with
+        self.requested_again = False  # whether or not the retraining was requested while the previous one was running
+        self.retrainings_count = 0  # number of the finished retrainings
+        self.worker_cpu_time = 0.0  # total CPU time of the retrainings (in the worker)
+
+    def is_busy(self):
+        """ Checking if the retraining is in progress """
+        return self.future is not None
+
+    def add_changed_records(self, changed_records):
+        """ Adding the records changed by the update of the dataset (needed only by the incremental inductors;
+         None - the changes are not known, so the worker's model is built again); each update has to be added, since
+         the worker's model learns the changes only from the retrainer """
+        if changed_records is None or self.changed_records is None:
+            self.changed_records = None
+        else:
+            self.changed_records.update(changed_records)
+
+    def submit(self, dataset, generation):
+        """ Starting the retraining on the given snapshot of the history (the dataset) with the records changed since
+         the last submitted retraining; if the previous retraining is still in progress, the new one is only
+         requested (the changes are kept for it) """
+        if self.is_busy():
+            self.requested_again = True
+            return False
+        self.future = self.executor.submit(_retrain, dataset, self.changed_records)
+        self.changed_records = dict()
+        self.generation = generation
+        self.requested_again = False
+        return True
+
+    def collect(self):
+        """ Getting the results of the finished retraining - the inference rules (in the text form), the generation
+         of the rules it was started with and the CPU time of the retraining; returns None if the retraining is not
+         finished (or not started) """
+        if self.future is None or not self.future.done():
+            return None
+        future, generation = self.future, self.generation
+        self.future = None
+        self.generation = None
+        rules_swrl, cpu_time = future.result()
+        self.retrainings_count += 1
+        self.worker_cpu_time += cpu_time
+        return rules_swrl, generation, cpu_time
+
+    def stop(self):
+        """ Stopping the worker process (the results of the retraining in progress are abandoned) """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.future = None
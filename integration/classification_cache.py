@@ -0,0 +1,48 @@
+from .ontology_index import SITUATION_FEATURES
+from collections import OrderedDict
+
+
+class ClassificationCache:
+    """ Bounded cache (least recently used entries are evicted first) of the reasoning's results; the situations with
+     the same features (user, mood, weather, time) get the same actions as long as the inference rules do not change """
+    def __init__(self, max_size):
+        self.max_size = max_size  # maximum number of the cached results
+        self.entries = OrderedDict()  # features of the situation -> list of the inferred actions
+        self.hits = 0  # number of the results found in the cache
+        self.misses = 0  # number of the results missing from the cache
+        self.evictions = 0  # number of the results removed due to the cache's size
+        self.invalidations = 0  # number of the results removed because they became outdated
+
+    @staticmethod
+    def get_key(situation):
+        """ Features of the situation, used as the key of the cache """
+        return tuple(getattr(situation, f) for f in SITUATION_FEATURES)
+
+    def get(self, situation):
+        """ Getting the cached actions for the situation (None if they are missing) """
+        key = self.get_key(situation)
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return list(self.entries[key])
+
+    def put(self, situation, actions):
+        """ Saving the actions inferred for the situation """
+        if self.max_size <= 0:
+            return
+        key = self.get_key(situation)
+        self.entries[key] = list(actions)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, situation=None):
+        """ Removing the cached actions of the situation (all the cached results if no situation is given) """
+        if situation is None:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+        elif self.entries.pop(self.get_key(situation), None) is not None:
+            self.invalidations += 1
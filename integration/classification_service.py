@@ -0,0 +1,321 @@
+from .feedback_oracles import FeedbackOracle
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import asyncio
+import json
+import threading
+import numpy as np
+from time import perf_counter
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# maximum time (in seconds) the system waits for the robot's answer to its question
+DEFAULT_FEEDBACK_TIMEOUT = 60.0
+# maximum number of the classifications in progress at once (including the ones waiting for the robots' answers)
+MAX_CLASSIFICATIONS = 32
+# number of the recent requests used to compute the latency percentiles
+LATENCY_WINDOW = 1000
+LATENCY_PERCENTILES = [50, 90, 99]
+# classes of the individuals describing the situation (names used in the requests)
+SITUATION_CLASSES = ["User", "General_mood", "Weather", "General_time"]
+
+
+def _request_attribute(name):
+    """ Attribute of the oracle kept separately for each of the system's threads (i.e. for each classification request
+     in progress) """
+    return property(lambda self: getattr(self.requests, name, None),
+                    lambda self, value: setattr(self.requests, name, value))
+
+
+class SessionFeedbackOracle(FeedbackOracle):
+    """ The child oracle that passes the system's questions to the robot whose observation is being classified;
+     if the robot sent the expected action with the request, the questions are answered without asking it; if the robot
+     does not answer (in time), the proposed action is accepted (or the first option is chosen); the ontology's lock is
+     released while the answer is awaited, so the other requests are classified in the meantime """
+    # the state of the classification request (each request is classified by its own thread)
+    current_situation = _request_attribute("current_situation")
+    wanted_interaction = _request_attribute("wanted_interaction")
+    session = _request_attribute("session")  # session of the robot whose observation is being classified
+    request_id = _request_attribute("request_id")  # id of the classification request
+    expected_action = _request_attribute("expected_action")  # action expected by the robot (None - the robot is asked)
+
+    def __init__(self, feedback_timeout=DEFAULT_FEEDBACK_TIMEOUT):
+        self.requests = threading.local()  # the state of the requests, by the threads classifying them
+        super().__init__()
+        self.loop = None  # event loop of the service (the questions are sent to it from the system's threads)
+        self.ontology_lock = None  # lock of the ontology, released while waiting for the answer (None - not released)
+        self.feedback_timeout = feedback_timeout  # maximum time of waiting for the answer
+        self.timeouts_count = 0  # number of the questions that were not answered in time
+
+    def begin(self, session, request_id, expected_action=None):
+        """ Switching the oracle to the next classification request """
+        self.session = session
+        self.request_id = request_id
+        self.expected_action = expected_action
+
+    def _get_wanted_interaction(self, sit_dict):
+        """ The action sent with the request (if any) """
+        return self.expected_action
+
+    def _ask(self, question):
+        """ Sending the question to the robot and waiting for its answer on the event loop (None if there was no answer
+         in time); the ontology is not held in the meantime """
+        answer = asyncio.run_coroutine_threadsafe(self.session.ask(self.request_id, question, self.feedback_timeout),
+                                                  self.loop)
+        if self.ontology_lock is not None:
+            self.ontology_lock.release()
+        try:
+            answer = answer.result()
+        finally:
+            if self.ontology_lock is not None:
+                self.ontology_lock.acquire()
+        if answer is None:
+            self.timeouts_count += 1
+        return answer
+
+    def accept_action(self, action):
+        """ Checking the proposed action with the expected one or asking the robot about it """
+        if self.wanted_interaction is not None:
+            return super().accept_action(action)
+        answer = self._ask({"question": "accept", "action": action.name})
+        return answer is None or bool(answer.get("accept", True))
+
+    def choose_action(self, action_options):
+        """ Picking the expected action or asking the robot to pick one of the options """
+        if self.wanted_interaction is not None:
+            return super().choose_action(action_options)
+        answer = self._ask({"question": "choose", "options": [a.name for a in action_options]})
+        if answer is not None:
+            for a in action_options:
+                if a.name == answer.get("choice"):
+                    return a
+        return action_options[0]
+
+
+class _Session:
+    """ Connection with a single robot; the messages are JSON lines, the robot may have many requests in progress """
+    def __init__(self, reader, writer):
+        self.reader = reader  # stream of the robot's messages
+        self.writer = writer  # stream of the service's messages
+        self.questions = dict()  # answers awaited for the questions, by the ids of the requests
+
+    async def send(self, message):
+        """ Sending the message to the robot """
+        self.writer.write((json.dumps(message) + "\n").encode())
+        await self.writer.drain()
+
+    async def ask(self, request_id, question, timeout):
+        """ Sending the question about the request and waiting for the answer (None if there was no answer in time
+         or the robot has disconnected) """
+        answer = asyncio.get_running_loop().create_future()
+        self.questions[request_id] = answer
+        try:
+            await self.send({"type": "question", "id": request_id, **question})
+            return await asyncio.wait_for(answer, timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            return None
+        finally:
+            self.questions.pop(request_id, None)
+
+    def answer(self, message):
+        """ Passing the robot's answer to the awaited question """
+        answer = self.questions.get(message.get("id"))
+        if answer is not None and not answer.done():
+            answer.set_result(message)
+
+
+class ClassificationService:
+    """ Local service classifying the observations of many robots at once (JSON lines over TCP); the sessions' messages
+     are handled concurrently and each request is classified by its own thread of the system, but only the thread
+     holding the ontology's lock works on the ontology (so it is never modified concurrently) - the lock is released
+     only while the robot's answer to the system's question is awaited (on the event loop), so the other requests are
+     classified in the meantime; the queue depth and the latency percentiles are reported on request ('stats');
+     the service replaces the system's feedback oracle, so it should be created before loading the system's
+     components """
+    def __init__(self, system, host=DEFAULT_HOST, port=DEFAULT_PORT, feedback_timeout=DEFAULT_FEEDBACK_TIMEOUT):
+        self.system = system  # system classifying the observations
+        self.host = host  # address of the service
+        self.port = port  # port of the service (0 - any free port)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CLASSIFICATIONS)  # the system's threads
+        self.ontology_lock = threading.Lock()  # lock held by the thread working on the ontology
+        self.server = None  # the listening server
+        self.oracle = SessionFeedbackOracle(feedback_timeout)  # oracle passing the questions to the robots
+        self.oracle.ontology_lock = self.ontology_lock
+        self.system.feedback_oracle = self.oracle
+        self.classifications = set()  # classifications in progress (the futures of the system's threads)
+        self.submitted_count = 0  # number of the requests passed to the system's threads (changed only by the loop)
+        self.started_count = 0  # number of the requests that got the ontology's lock (changed only under the lock)
+        self.max_queue_depth = 0  # the highest queue depth so far
+        self.requests_count = 0  # number of the handled requests
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # times from receiving the requests to sending the outcomes
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)  # times the requests waited for the system's thread
+
+    async def start(self):
+        """ Starting the server; returns the port it listens on """
+        self.oracle.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle_session, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Classification service listening on {self.host}:{self.port}")
+        return self.port
+
+    async def stop(self):
+        """ Stopping the server and shutting the system down (after the requests in progress) """
+        self.server.close()
+        await self.server.wait_closed()
+        await asyncio.gather(*self.classifications, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._shutdown)
+        self.executor.shutdown(wait=True)
+        print(f"Service's statistics: {self.get_stats()}")
+
+    def get_stats(self):
+        """ Queue depth and latency percentiles (in seconds) of the recent requests """
+        stats = {"queue_depth": self.submitted_count - self.started_count, "max_queue_depth": self.max_queue_depth,
+                 "requests_count": self.requests_count, "feedback_timeouts": self.oracle.timeouts_count}
+        for name, times in [("latency", self.latencies), ("queue_wait", self.queue_waits)]:
+            for p in LATENCY_PERCENTILES:
+                stats[f"{name}_p{p}"] = float(np.percentile(times, p)) if len(times) > 0 else None
+        return stats
+
+    def _shutdown(self):
+        """ Shutting the system down (in the system's thread, holding the ontology's lock) """
+        with self.ontology_lock:
+            self.system.system_shutdown()
+
+    def _get_situation(self, situation):
+        """ Finding the individuals of the observation by their names (ValueError if any of them is not known); it is
+         called only while holding the ontology's lock """
+        sit_dict = dict()
+        for class_name in SITUATION_CLASSES:
+            individual = self.system.onto[situation.get(class_name, "")]
+            if individual is None or not isinstance(individual, self.system.onto[class_name]):
+                raise ValueError(f"Unrecognized {class_name}'s name: '{situation.get(class_name)}'")
+            sit_dict[class_name] = individual
+        return sit_dict
+
+    def _classify(self, session, request_id, situation, expected_action):
+        """ Classification of the single observation (in the system's thread, holding the ontology's lock, except for
+         the waits for the robot's answers); returns the outcome and the time of starting the classification """
+        with self.ontology_lock:
+            self.started_count += 1
+            start_time = perf_counter()
+            sit_dict = self._get_situation(situation)
+            self.oracle.begin(session, request_id, expected_action)
+            return self.system.classify_new_situation(sit_dict), start_time
+
+    async def _handle_classify(self, session, message):
+        """ Queueing the classification request and sending its outcome to the robot """
+        arrival_time = perf_counter()
+        self.submitted_count += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.submitted_count - self.started_count)
+        classification = asyncio.get_running_loop().run_in_executor(
+            self.executor, self._classify, session, message.get("id"), message.get("situation", dict()),
+            message.get("expected_action"))
+        self.classifications.add(classification)
+        classification.add_done_callback(self.classifications.discard)
+        try:
+            outcome, start_time = await classification
+        except ValueError as e:
+            await session.send({"type": "error", "id": message.get("id"), "message": str(e)})
+            return
+        latency = perf_counter() - arrival_time
+        self.latencies.append(latency)
+        self.queue_waits.append(start_time - arrival_time)
+        self.requests_count += 1
+        await session.send({"type": "outcome", "id": message.get("id"), "situation": outcome["situation"],
+                            "action": outcome["action"], "was_asked": outcome["was_asked"],
+                            "reward": float(outcome["reward"]), "latency": latency})
+
+    async def _handle_session(self, reader, writer):
+        """ Handling the messages of the single robot until it disconnects """
+        session = _Session(reader, writer)
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    await session.send({"type": "error", "id": None, "message": "Invalid JSON message"})
+                    continue
+                if message.get("type") == "classify":
+                    # the classification is not awaited here, so the session can still answer the questions
+                    task = asyncio.create_task(self._handle_classify(session, message))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif message.get("type") == "feedback":
+                    session.answer(message)
+                elif message.get("type") == "stats":
+                    await session.send({"type": "stats", "id": message.get("id"), **self.get_stats()})
+                else:
+                    await session.send({"type": "error", "id": message.get("id"),
+                                        "message": f"Unrecognized message's type: '{message.get('type')}'; "
+                                                   f"Accepted values: ['classify', 'feedback', 'stats']"})
+            # the requests of the disconnected robot are still classified (the history is kept)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+
+class ServiceClient:
+    """ Client of the classification service, used by the robot; the questions of the service are answered by
+     the given function ('answer_question(question) -> answer', e.g. {"accept": True} or {"choice": "Telling_a_joke"}) """
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, answer_question=None):
+        self.host = host  # address of the service
+        self.port = port  # port of the service
+        self.answer_question = answer_question  # function answering the service's questions
+        self.reader = None  # stream of the service's messages
+        self.writer = None  # stream of the robot's messages
+        self.responses = dict()  # awaited responses, by the ids of the requests
+        self.next_id = 0  # id of the next request
+        self.listener = None  # task reading the service's messages
+
+    async def connect(self):
+        """ Connecting to the service """
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        """ Disconnecting from the service """
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.cancel()
+
+    async def _send(self, message):
+        """ Sending the message to the service """
+        self.writer.write((json.dumps(message) + "\n").encode())
+        await self.writer.drain()
+
+    async def _listen(self):
+        """ Reading the service's messages - answering the questions and passing the responses to the requests """
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message["type"] == "question":
+                answer = self.answer_question(message) if self.answer_question is not None else dict()
+                await self._send({"type": "feedback", "id": message["id"], **answer})
+            else:
+                response = self.responses.pop(message.get("id"), None)
+                if response is not None:
+                    response.set_result(message)
+
+    async def _request(self, message):
+        """ Sending the request and waiting for its response """
+        request_id = self.next_id
+        self.next_id += 1
+        self.responses[request_id] = asyncio.get_running_loop().create_future()
+        await self._send({**message, "id": request_id})
+        return await self.responses[request_id]
+
+    async def classify(self, situation, expected_action=None):
+        """ Classification of the observation (dictionary of the individuals' names, e.g. {"User": "Anna", ...});
+         if the expected action is given, the service does not ask any questions """
+        return await self._request({"type": "classify", "situation": situation, "expected_action": expected_action})
+
+    async def get_stats(self):
+        """ Queue depth and latency percentiles of the service """
+        return await self._request({"type": "stats"})
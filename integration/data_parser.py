@@ -1,30 +1,86 @@
+from .tracing import traced
 from owlready2 import *
 import os
-import pandas as pd
 
 
 KNOWLEDGE_FOLDER = "knowledge_folder"
 DEFAULT_DATASET = "actions_taken.csv"
+# columns of the dataset (in this order)
+DATASET_COLUMNS = ["Id", "hadUser", "hasPersonality", "hasGender", "hasAge", "hadMood", "wasWeather", "wasTime",
+                   "takenAction"]
+# query used by Owlready2 to find the instances of the class (so the situations keep the order of 'instances()')
+INSTANCES_QUERY = "SELECT DISTINCT ?i { ?i a/(rdfs:subClassOf|owl:equivalentClass|^owl:equivalentClass)* ?? . }"
+
+
+def _get_name(iri):
+    """ Name of the entity (the part of its IRI after the namespace) """
+    separator_id = iri.rfind('#') if '#' in iri else iri.rfind('/')
+    return iri[separator_id + 1:]
 
 
 class OntologyDataParser:
-    """ The purpose of this class is to parse the important information from ontology to more easily interpretable
-    dataframe and later - the .csv file """
+    """ The purpose of this class is to parse the important information from ontology to the records of the history
+    store and later - the .csv file """
     def __init__(self, onto):
         self.onto = onto  # the ontology with important data
-        self.dataframe = None  # dataframe, parsed from the ontology
 
     def get_ontology(self):
         """ get loaded ontology """
         return self.onto
 
-    def get_dataframe(self):
-        """ get dataframe, created from the parsed information """
-        return self.dataframe
+    def _read_columns_bulk(self):
+        """ Reading the columns of the dataset (the lists of the values, in the order of the situations) with a few
+         queries to the quadstore """
+        world = self.onto.world
+        # the situations' storids (in the same order as 'instances()' gives them)
+        situations = [r[0] for r in world.prepare_sparql(INSTANCES_QUERY).execute_raw((self.onto.Situation,))]
+        situations_ids = {s: i for i, s in enumerate(situations)}
+        # the users whose properties are added to the situations' ones (like in the walk - only the direct instances)
+        users = {r[0] for r in world.graph.execute("SELECT s FROM objs WHERE p=? AND o=?",
+                                                   (rdf_type, self.onto.User.storid))}
+        # the properties of the dataset's columns
+        properties = [p for p in (self.onto[c] for c in DATASET_COLUMNS[1:]) if isinstance(p, PropertyClass)]
+        properties_names = {p.storid: p.python_name for p in properties}
+        object_properties = [p.storid for p in properties if isinstance(p, ObjectPropertyClass)]
+        data_properties = [p.storid for p in properties if not isinstance(p, ObjectPropertyClass)]
+        # the values of the properties, in the order of the quadstore (so the last of the many values wins, like
+        # in the walk); the object values are kept as storids and named later
+        situations_values = dict()  # situation's storid -> {property's name: value}
+        users_values = dict()  # user's storid -> {property's name: value}
+        for table, props in [("objs", object_properties), ("datas", data_properties)]:
+            if len(props) == 0:
+                continue
+            rows = world.graph.execute(f"SELECT s, p, o{', d' if table == 'datas' else ''} FROM {table} "
+                                       f"WHERE p IN ({','.join('?' * len(props))}) ORDER BY rowid", props)
+            for row in rows:
+                if row[0] in situations_ids:
+                    values = situations_values.setdefault(row[0], dict())
+                elif row[0] in users:
+                    values = users_values.setdefault(row[0], dict())
+                else:
+                    continue
+                values[properties_names[row[1]]] = ("individual", row[2]) if table == "objs" \
+                    else ("literal", world._to_python(row[2], row[3]))
+        # the names of the situations and of the individuals used as the values
+        names = {storid: _get_name(iri) for storid, iri in world.graph.execute("SELECT storid, iri FROM resources")}
+        # building the columns
+        columns = {c: [float("nan")] * len(situations) for c in DATASET_COLUMNS}
+        columns["Id"] = [names[s] for s in situations]
+        for s, values in situations_values.items():
+            i = situations_ids[s]
+            # the users' values are added to the situation's ones
+            for _, (kind, value) in list(values.items()):
+                if kind == "individual" and value in users:
+                    values.update(users_values.get(value, dict()))
+            for name, (kind, value) in values.items():
+                columns[name][i] = names[value] if kind == "individual" else value
+        # parsing boolean values for users' genders
+        columns["hasGender"] = [{False: "male", True: "female"}.get(v, v) if isinstance(v, bool) else v
+                                for v in columns["hasGender"]]
+        return columns
 
-    def parse_situations_to_df(self):
-        """ This method is supposed to get the information about systems' interactions with users that were previously
-         registered in the main ontology and parse them to the interpretable dataframe """
+    def _read_records_walk(self, sit_list):
+        """ Reading the records of the given situations (the dictionaries of the values), individual by individual """
         def check_properties(current_ind, current_obs):
             """ Method that is responsible for getting the values from the individual's consecutive properties """
             for p in current_ind.get_properties():
@@ -40,8 +96,6 @@ class OntologyDataParser:
                     if self.onto.User in value.is_a:
                         check_properties(value, current_obs)
 
-        # getting the instances of the previous situations, when the system interacted with different users
-        sit_list = self.onto.Situation.instances()
         # preparing the base for the future dataframe
         actions_list = []
         # getting the information about circumstances from the properties of each situation
@@ -52,15 +106,29 @@ class OntologyDataParser:
             check_properties(s, new_observ)
             # adding the "row" to the base
             actions_list.append(new_observ)
-        # creating the dataframe
-        self.dataframe = pd.DataFrame.from_records(actions_list)
-        # parsing boolean values for users' genders
-        self.dataframe["hasGender"].replace({False: "male", True: "female"}, inplace=True)
-        # rearranging the column order for better readability and to keep consistency
-        self.dataframe = self.dataframe[["Id", "hadUser", "hasPersonality", "hasGender", "hasAge", "hadMood",
-                                         "wasWeather", "wasTime", "takenAction"]]
+        return actions_list
+
+    @traced("store_situations")
+    def store_situations(self, history_store, situations=None):
+        """ Putting the records of the situations in the columnar history store - all the situations are parsed with
+         a few queries to the quadstore (the previous records are removed), or only the given ones (e.g. the new ones
+         or the ones whose actions have changed) are parsed individual by individual and their records are replaced """
+        if situations is None:
+            columns = self._read_columns_bulk()
+            history_store.clear()
+            history_store.put_records(columns["Id"], columns)
+            return
+        records = self._read_records_walk(situations)
+        for r in records:
+            # parsing boolean values for users' genders
+            if isinstance(r.get("hasGender"), bool):
+                r["hasGender"] = "female" if r["hasGender"] else "male"
+        history_store.put_records([r["Id"] for r in records],
+                                  {c: [r.get(c) for r in records] for c in history_store.columns})
 
-    def save_dataframe(self, csv_name=DEFAULT_DATASET):
-        """ Saving dataframe to the csv file """
+    @traced("save_history")
+    def save_history(self, history_store, csv_name=DEFAULT_DATASET):
+        """ Saving the records of the history store (with the missing values) to the csv file """
         df_path = os.path.join(KNOWLEDGE_FOLDER, csv_name)
-        self.dataframe.to_csv(df_path, sep=';', index=False)
+        dataframe = history_store.to_dataframe(categorical=False, complete=False, with_ids=True)
+        dataframe.to_csv(df_path, sep=';', index=False)
@@ -0,0 +1,128 @@
+import os
+
+
+KNOWLEDGE_FOLDER = "knowledge_folder"
+DEFAULT_TEST_DATASET = "actions_test.csv"
+
+
+class FeedbackOracle:
+    """ Parent class for the child oracles; the purpose of the 'Feedback Oracle' is to give answers to the system's
+     questions (accepting the classification's result, picking an action) in place of the system's user """
+    def __init__(self):
+        self.current_situation = None  # observation that is currently being classified
+        self.wanted_interaction = None  # name of the interaction expected for the current observation
+
+    def _get_wanted_interaction(self, sit_dict):
+        """ Base for getting the name of the interaction that is expected for the given observation """
+        raise NotImplementedError
+
+    def pause(self, message):
+        """ Pause in the system's workflow; only an actual user needs it, so by default nothing happens """
+        pass
+
+    def observe(self, sit_dict):
+        """ Informing the oracle about the new observation (it happens once per observation) """
+        self.current_situation = sit_dict
+        wanted_interaction = self._get_wanted_interaction(sit_dict)
+        # the oracles may return both the names and the individuals of the interactions
+        self.wanted_interaction = getattr(wanted_interaction, "name", wanted_interaction)
+
+    def accept_action(self, action):
+        """ Checking if the action proposed by the system is the one expected (synonyms are also accepted) """
+        action_syn = [s.name for s in action.INDIRECT_equivalent_to]
+        return action.name == self.wanted_interaction or self.wanted_interaction in action_syn
+
+    def choose_action(self, action_options):
+        """ Picking the expected action from the list of possible interaction options """
+        for a in action_options:
+            if a.name == self.wanted_interaction:
+                return a
+        # looking for the synonym of the expected action if the action itself is not among the options
+        for a in action_options:
+            if self.accept_action(a):
+                return a
+        raise ValueError(f"Unrecognized interaction's name: '{self.wanted_interaction}'; "
+                         f"Accepted values: {[a.name for a in action_options]}")
+
+
+class InteractiveFeedbackOracle(FeedbackOracle):
+    """ The child oracle that passes all the questions to the actual user (via the standard input) """
+    def _get_wanted_interaction(self, sit_dict):
+        """ The expectations of the user are unknown until they answer the questions """
+        return None
+
+    def pause(self, message):
+        """ Waiting for the user to let the system proceed """
+        input(message)
+
+    def accept_action(self, action):
+        """ Asking the user for affirmation of the proposed action (input needs to be valid) """
+        while True:
+            try:
+                satisfaction = input("Do you accept this result? Yes (Y) / No (N): ").upper()
+                if satisfaction not in ["Y", "N"]:
+                    raise ValueError("WARNING: Invalid input detected! Please try again!")
+                break
+            except ValueError as e:
+                print(e)
+        return satisfaction == "Y"
+
+    def choose_action(self, action_options):
+        """ Asking the user to pick one of the possible interaction options """
+        # listing out the options
+        for i, a in enumerate(action_options):
+            print(f"{i} - {a.name}")
+        # awaiting an user to make a choice
+        while True:
+            choice_id = input("Choose one of the above that suits you (put an appropriate ID): ")
+            # making sure that input is valid
+            try:
+                return action_options[int(choice_id)]
+            except (ValueError, IndexError):
+                print("WARNING: Invalid input detected! Please try again!")
+
+
+class CsvFeedbackOracle(FeedbackOracle):
+    """ The child oracle that replays the ground truth from the .csv file (e.g. 'actions_test.csv'),
+     one row per observation """
+    def __init__(self, csv_name=DEFAULT_TEST_DATASET, first_row=0):
+        super().__init__()
+        import pandas as pd  # imported only when it is needed
+        self.dataset = pd.read_csv(os.path.join(KNOWLEDGE_FOLDER, csv_name), sep=';')  # replayed records
+        self.current_row = first_row - 1  # index of the record for the current observation
+
+    def _get_wanted_interaction(self, sit_dict):
+        """ Moving on to the next record in the file """
+        self.current_row += 1
+        if self.current_row >= len(self.dataset):
+            raise IndexError(f"The replayed file has run out of records (rows: {len(self.dataset)})")
+        return self.dataset["takenAction"].iloc[self.current_row]
+
+    def get_situations(self, onto):
+        """ Generator of the observations recorded in the replayed file (starting from the current record) """
+        for _, row in self.dataset.iloc[self.current_row + 1:].iterrows():
+            yield {"User": onto[row["hadUser"]], "General_mood": onto[row["hadMood"]],
+                   "Weather": onto[row["wasWeather"]], "General_time": onto[row["wasTime"]]}
+
+
+class CallableFeedbackOracle(FeedbackOracle):
+    """ The child oracle that asks the given function (taking the observation's dictionary) for the expected action """
+    def __init__(self, function):
+        super().__init__()
+        self.function = function  # function returning the name (or the individual) of the expected interaction
+
+    def _get_wanted_interaction(self, sit_dict):
+        """ Calling the function for the current observation """
+        return self.function(sit_dict)
+
+
+class QueueFeedbackOracle(FeedbackOracle):
+    """ The child oracle that takes the expected actions from the queue, one item per observation """
+    def __init__(self, feedback_queue, timeout=None):
+        super().__init__()
+        self.feedback_queue = feedback_queue  # queue with the names (or the individuals) of the expected interactions
+        self.timeout = timeout  # maximum time (in seconds) of waiting for the answer
+
+    def _get_wanted_interaction(self, sit_dict):
+        """ Taking the next answer from the queue """
+        return self.feedback_queue.get(timeout=self.timeout)
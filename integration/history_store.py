@@ -0,0 +1,140 @@
+from .data_parser import DATASET_COLUMNS
+import numpy as np
+import tempfile
+import os
+
+
+# type of the values kept in the store's columns (the codes of the categorical values and the ages)
+CODES_DTYPE = np.int16
+# code of the missing value (in all the columns)
+MISSING_CODE = -1
+# number of the records the file has room for at the beginning (doubled whenever it runs out)
+INITIAL_CAPACITY = 1024
+# columns whose values are kept as they are (the other ones are interned)
+INTEGER_COLUMNS = ["hasAge"]
+
+
+class HistoryStore:
+    """ Columnar store of the history's records (the situations), backed by the memory-mapped file; the categorical
+     values (users, personalities, genders, moods, weathers, times and actions) are interned to the small integer codes
+     and the ages are kept as they are, so each record takes a few bytes and the columns are read without copying
+     (as the views of the file) """
+    def __init__(self, file_path=None, capacity=INITIAL_CAPACITY):
+        self.file_path = file_path  # path to the file with the columns (None - the temporary file, removed on closing)
+        self.columns = [c for c in DATASET_COLUMNS if c != "Id"]  # names of the store's columns (in the file's order)
+        # values of the categorical columns (by their codes) and the codes of the values
+        self.vocabularies = {c: [] for c in self.columns if c not in INTEGER_COLUMNS}
+        self.codes = {c: dict() for c in self.vocabularies}
+        self.rows = dict()  # situation's name -> its record's row
+        self.names = []  # names of the situations (by the rows)
+        self.file = None  # the file with the columns
+        self.data = None  # memory-mapped columns (one row of the array per column)
+        self._map(capacity)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _map(self, capacity):
+        """ Mapping the new file with room for the given number of records (the current records are copied to it; the
+         dataframes read before keep the previous file until they are gone) """
+        if self.file_path is None:
+            new_file = tempfile.TemporaryFile()
+        else:
+            new_file = open(self.file_path + ".tmp", "w+b")
+        new_data = np.memmap(new_file, dtype=CODES_DTYPE, mode="w+", shape=(len(self.columns), capacity))
+        if self.data is not None:
+            new_data[:, :len(self.names)] = self.data[:, :len(self.names)]
+            self.file.close()
+        if self.file_path is not None:
+            os.replace(self.file_path + ".tmp", self.file_path)
+        self.file = new_file
+        self.data = new_data
+
+    def _intern(self, column, value):
+        """ Code of the column's value (the new values get the next codes) """
+        # the missing values (None or NaN)
+        if value is None or value != value:
+            return MISSING_CODE
+        if column in INTEGER_COLUMNS:
+            return value
+        code = self.codes[column].get(value)
+        if code is None:
+            code = len(self.vocabularies[column])
+            if code > np.iinfo(CODES_DTYPE).max:
+                raise ValueError(f"Too many values in the column '{column}' (maximum: {np.iinfo(CODES_DTYPE).max + 1})")
+            self.codes[column][value] = code
+            self.vocabularies[column].append(value)
+        return code
+
+    def put_records(self, names, columns):
+        """ Putting the records of the situations in the store - the records of the known situations are replaced, the
+         new ones are added at the end; 'columns' - the values of the records (the lists in the order of the names) """
+        # making room for the new records
+        new_names = [n for n in dict.fromkeys(names) if n not in self.rows]
+        capacity = self.data.shape[1]
+        while capacity < len(self.names) + len(new_names):
+            capacity *= 2
+        if capacity > self.data.shape[1]:
+            self._map(capacity)
+        for name in new_names:
+            self.rows[name] = len(self.names)
+            self.names.append(name)
+        rows = [self.rows[name] for name in names]
+        for i, c in enumerate(self.columns):
+            self.data[i, rows] = [self._intern(c, v) for v in columns[c]]
+
+    def get_record(self, name, columns):
+        """ Values of the situation's record in the given columns (None if the situation is not in the store or its
+         record has the missing values) """
+        row = self.rows.get(name)
+        if row is None:
+            return None
+        record = []
+        for c in columns:
+            code = int(self.data[self.columns.index(c), row])
+            if code == MISSING_CODE:
+                return None
+            record.append(code if c in INTEGER_COLUMNS else self.vocabularies[c][code])
+        return tuple(record)
+
+    def clear(self):
+        """ Removing all the records (the codes of the values are kept) """
+        self.rows = dict()
+        self.names = []
+
+    def to_dataframe(self, skipped_situations=(), categorical=True, complete=True, with_ids=False):
+        """ The records as the dataframe (the records of the skipped situations and, if 'complete', the ones with
+         the missing values are omitted); the categorical columns are pandas' categoricals built on the codes (or,
+         if not 'categorical', the values themselves); if no record is omitted, the columns of the codes and the ages
+         are the read-only views of the file (so they must not be modified in place) """
+        import pandas as pd  # imported only when it is needed
+        data = self.data[:, :len(self.names)]
+        selected = np.ones(len(self.names), dtype=bool)
+        if complete:
+            selected &= (data != MISSING_CODE).all(axis=0)
+        for name in skipped_situations:
+            if name in self.rows:
+                selected[self.rows[name]] = False
+        # the records are copied only if some of them are omitted
+        if not selected.all():
+            data = data[:, selected]
+        else:
+            data = data.view(np.ndarray)
+            data.flags.writeable = False
+        dataframe_columns = dict()
+        if with_ids:
+            dataframe_columns["Id"] = np.array(self.names, dtype=object)[selected]
+        for i, c in enumerate(self.columns):
+            if c in INTEGER_COLUMNS:
+                dataframe_columns[c] = data[i]
+            elif categorical:
+                dataframe_columns[c] = pd.Categorical.from_codes(data[i], categories=self.vocabularies[c])
+            else:
+                # the missing code points at the last value (NaN)
+                dataframe_columns[c] = np.array(self.vocabularies[c] + [np.nan], dtype=object)[data[i]]
+        return pd.DataFrame(dataframe_columns, copy=False)
+
+    def close(self):
+        """ Closing the file (the temporary file is removed) """
+        self.data = None
+        self.file.close()
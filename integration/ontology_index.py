@@ -0,0 +1,72 @@
+import bisect
+
+
+# functional properties describing the situation (its features)
+SITUATION_FEATURES = ["hadUser", "hadMood", "wasWeather", "wasTime"]
+
+
+class OntologyIndex:
+    """ In-memory indexes over the individuals of the ontology, updated incrementally with every added situation;
+     thanks to that, the system does not have to scan the whole history (e.g. to get the new situation's id) """
+    def __init__(self, onto):
+        self.onto = onto  # the ontology with the whole knowledge
+        self.last_situation_id = 0  # the highest id among the situations (e.g. 20 for 's20')
+        self.situations = dict()  # name of the situation -> situation (in order of addition)
+        self.users_situations = dict()  # user's name -> names of the user's situations (in order of addition)
+        self.touched_situations = set()  # names of the situations whose actions might have been changed by the reasoner
+        self.actions_catalog = []  # list of all the interaction options, sorted by the name
+        self.actions_names = []  # names of the interaction options (in the same order as the catalog)
+        self.build()
+
+    def build(self):
+        """ Building the indexes from scratch (the only full scan of the ontology) """
+        self.last_situation_id = 0
+        self.situations = dict()
+        self.users_situations = dict()
+        self.touched_situations = set()
+        for s in self.onto.Situation.instances():
+            self.add_situation(s)
+        self.actions_catalog = []
+        self.actions_names = []
+        for a in self.onto.Interaction_with_user.instances():
+            self.add_action(a)
+
+    def add_situation(self, situation):
+        """ Putting the new situation in the indexes """
+        self.situations[situation.name] = situation
+        self.last_situation_id = max(self.last_situation_id, int(situation.name[1:]))
+        self.users_situations.setdefault(situation.hadUser.name, []).append(situation.name)
+
+    def get_new_situation_name(self):
+        """ Name for the next situation added to the ontology (e.g. 's21') """
+        return "s" + str(self.last_situation_id + 1)
+
+    def get_situations_count(self):
+        """ Number of the situations in the ontology """
+        return len(self.situations)
+
+    def get_situations(self):
+        """ All the situations of the ontology """
+        return list(self.situations.values())
+
+    def get_user_situations(self, user):
+        """ Situations of the given user (e.g. the history sent to the user's shard of the world) """
+        return [self.situations[n] for n in self.users_situations.get(user.name, [])]
+
+    def touch_situations(self, situations=None):
+        """ Marking the situations whose actions might have been changed by the reasoner (all of them if none given) """
+        self.touched_situations.update(self.situations if situations is None else (s.name for s in situations))
+
+    def pop_touched_situations(self):
+        """ Getting (and forgetting) the situations marked as possibly changed by the reasoner """
+        touched = [self.situations[n] for n in self.touched_situations if n in self.situations]
+        self.touched_situations = set()
+        return touched
+
+    def add_action(self, action):
+        """ Putting the interaction option in the sorted catalog (without duplicates) """
+        action_id = bisect.bisect_left(self.actions_names, action.name)
+        if action_id < len(self.actions_names) and self.actions_names[action_id] == action.name:
+            return
+        self.actions_names.insert(action_id, action.name)
+        self.actions_catalog.insert(action_id, action)
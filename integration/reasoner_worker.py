@@ -0,0 +1,305 @@
+from .reasoning_module import ReasoningModule, get_rule_text
+from owlready2 import *
+import owlready2
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+from time import time
+
+
+# Java libraries of the Pellet reasoner, shipped with Owlready2
+PELLET_FOLDER = os.path.join(os.path.dirname(owlready2.__file__), "pellet")
+# values of the properties in the Pellet's output (subject, property and object IRIs)
+PELLET_PROPERTY_REGEXP = re.compile("^PROPINST: ([^ ]+) ([^ ]+) ([^ ]+)$", re.MULTILINE)
+
+
+def _split_iri(iri):
+    """ Splitting the entity's IRI to the IRI of its namespace and its name """
+    separator_id = iri.rfind('#') if '#' in iri else iri.rfind('/')
+    return iri[:separator_id + 1], iri[separator_id + 1:]
+
+
+def describe_individual(individual, skipped_properties=()):
+    """ Plain (picklable) description of the individual - its IRI, classes, values of the properties and synonyms """
+    classes = [c.iri for c in individual.is_a if isinstance(c, ThingClass)]
+    properties = []
+    for p in individual.get_properties():
+        if p.python_name in skipped_properties:
+            continue
+        values = [("individual", v.iri) if isinstance(v, Thing) else ("literal", v) for v in p[individual]]
+        properties.append((p.iri, FunctionalProperty in p.is_a, values))
+    equivalents = [i.iri for i in individual.INDIRECT_equivalent_to]
+    return individual.iri, classes, properties, equivalents
+
+
+def describe_linked_individuals(individuals, described=None):
+    """ Descriptions of the given individuals and of all the individuals linked to them (e.g. the user of the situation
+     and the user's personality) """
+    described = dict() if described is None else described  # IRI -> description
+    to_describe = list(individuals)
+    while len(to_describe) > 0:
+        individual = to_describe.pop()
+        if individual.iri in described:
+            continue
+        described[individual.iri] = describe_individual(individual)
+        for p in individual.get_properties():
+            to_describe.extend(v for v in p[individual] if isinstance(v, Thing))
+        to_describe.extend(individual.INDIRECT_equivalent_to)
+    return described
+
+
+def _get_jvm_path():
+    """ Path of the JVM library of the Java used by Owlready2 (JPype's default one if it is not found) """
+    import jpype
+    java_path = shutil.which(owlready2.JAVA_EXE)
+    if java_path is not None:
+        java_home = os.path.dirname(os.path.dirname(os.path.realpath(java_path)))
+        for jvm_path in [os.path.join(java_home, "lib", "server", "libjvm.so"),
+                         os.path.join(java_home, "lib", "server", "libjvm.dylib"),
+                         os.path.join(java_home, "bin", "server", "jvm.dll")]:
+            if os.path.exists(jvm_path):
+                return jvm_path
+    return jpype.getDefaultJVMPath()
+
+
+class _ResidentPellet:
+    """ Pellet reasoner running in the JVM started once in the worker process (through JPype), so no JVM is launched
+     for the reasoning - the realization reads the module from the file and its output is the same as the one of
+     the Pellet's command-line tool used by Owlready2 """
+    def __init__(self):
+        # JPype is imported only in the worker process (no other component needs it)
+        import jpype
+        self.jpype = jpype
+        classpath = [os.path.join(PELLET_FOLDER, f) for f in os.listdir(PELLET_FOLDER) if f.endswith(".jar")]
+        jpype.startJVM(_get_jvm_path(), f"-Xmx{owlready2.JAVA_MEMORY}M", classpath=classpath)
+        self.pellet = jpype.JClass("pellet.Pellet")
+        self.system = jpype.JClass("java.lang.System")
+        self.output_stream_class = jpype.JClass("java.io.ByteArrayOutputStream")
+        self.print_stream_class = jpype.JClass("java.io.PrintStream")
+
+    def realize(self, file_path):
+        """ Realizing the ontology from the 'N-Triples' file, with the values of the properties inferred (like
+         Owlready2's 'sync_reasoner_pellet'); returns the Pellet's output """
+        output, errors = self.output_stream_class(), self.output_stream_class()
+        stdout, stderr = self.system.out, self.system.err
+        # the Pellet's command prints its results, so they are captured instead of the JVM's standard streams
+        self.system.setOut(self.print_stream_class(output, True, "UTF-8"))
+        self.system.setErr(self.print_stream_class(errors, True, "UTF-8"))
+        try:
+            command = self.pellet.getCommand("realize")
+            command.parseArgs(["realize", "--loader", "Jena", "--input-format", "N-Triples", "--infer-prop-values",
+                               "--ignore-imports", file_path])
+            command.run()
+            command.finish()
+        except self.jpype.JException as e:
+            message = f"{e}\n{errors.toString('UTF-8')}"
+            if "inconsistent" in message.lower():
+                raise OwlReadyInconsistentOntologyError(f"Java error message is: {message}")
+            raise OwlReadyJavaError(f"Java error message is:\n{message}")
+        finally:
+            self.system.setOut(stdout)
+            self.system.setErr(stderr)
+        return str(output.toString("UTF-8"))
+
+
+class _WorkerModule:
+    """ Module of the ontology living in the worker process, modified with the plain descriptions sent from the system
+     and reasoned about by the resident Pellet """
+    def __init__(self, snapshot, base_iri):
+        self.world = World()  # the world of the worker
+        self.module_onto = self.world.get_ontology(base_iri).load(fileobj=io.BytesIO(snapshot), format="ntriples")
+        # text of the rule -> rule in the module (the rules from the snapshot are included)
+        self.rules = {get_rule_text(r): r for r in self.module_onto.rules()}
+        self.reasoner = _ResidentPellet()  # the reasoner, kept loaded between the classifications
+        # file the module is saved to for the reasoner (rewritten at each reasoning)
+        module_file, self.module_path = tempfile.mkstemp(suffix=".nt")
+        os.close(module_file)
+        # name of the Owlready2's annotation, left out of the saved module (like in Owlready2's reasoning)
+        self.python_name_storid = self.world._abbreviate(
+            "http://www.lesfleursdunormal.fr/static/_downloads/owlready_ontology.owl#python_name")
+
+    def apply_individuals(self, descriptions):
+        """ Creating (or refreshing) the described individuals """
+        with self.module_onto:
+            # creating the missing individuals first, so they can refer to each other
+            for iri, classes, _, _ in descriptions:
+                if self.world[iri] is None:
+                    namespace_iri, name = _split_iri(iri)
+                    module_classes = [self.world[c] for c in classes]
+                    individual = module_classes[0](name, namespace=self.module_onto.get_namespace(namespace_iri))
+                    for c in module_classes[1:]:
+                        individual.is_a.append(c)
+            # setting the values of their properties and their synonyms
+            for iri, _, properties, equivalents in descriptions:
+                individual = self.world[iri]
+                for prop_iri, functional, values in properties:
+                    prop = self.world[prop_iri]
+                    values = [self.world[v] if kind == "individual" else v for kind, v in values]
+                    if functional:
+                        setattr(individual, prop.python_name, values[0] if len(values) > 0 else None)
+                    else:
+                        setattr(individual, prop.python_name, values)
+                individual.equivalent_to = [self.world[i] for i in equivalents]
+
+    def sync_rules(self, rules_texts, descriptions):
+        """ Synchronizing the module's inference rules with the given ones (only the changed rules are replaced) """
+        self.apply_individuals(descriptions)
+        with self.module_onto:
+            for rule_text in list(self.rules):
+                if rule_text not in rules_texts:
+                    destroy_entity(self.rules.pop(rule_text))
+            for rule_text in rules_texts:
+                if rule_text not in self.rules:
+                    module_rule = Imp()
+                    module_rule.set_as_rule(rule_text)
+                    self.rules[rule_text] = module_rule
+
+    def classify(self, situations_iris, descriptions, keep_situations=False):
+        """ Reasoning over the module with the described situations; returns the IRIs of the actions inferred for them
+         (the situations are removed from the module afterwards, unless they are supposed to be kept in it) """
+        self.apply_individuals(descriptions)
+        module_situations = [self.world[iri] for iri in situations_iris]
+        self.world.save(self.module_path, format="ntriples", filter=lambda graph, s, p, o, d: p != self.python_name_storid)
+        output = self.reasoner.realize(self.module_path)
+        # the actions are read from the reasoner's output (the module is not changed by the inferences)
+        taken_action_iri = self.module_onto.takenAction.iri
+        inferred_actions = {iri: [] for iri in situations_iris}
+        for situation_iri, property_iri, action_iri in PELLET_PROPERTY_REGEXP.findall(output):
+            if property_iri == taken_action_iri and situation_iri in inferred_actions and \
+                    action_iri not in inferred_actions[situation_iri]:
+                inferred_actions[situation_iri].append(action_iri)
+        if keep_situations:
+            return [inferred_actions[iri] for iri in situations_iris]
+        # removing the situations from the module, so it does not grow with the history
+        with self.module_onto:
+            for s in module_situations:
+                destroy_entity(s)
+        return [inferred_actions[iri] for iri in situations_iris]
+
+    def close(self):
+        """ Removing the module's file """
+        os.remove(self.module_path)
+
+
+def _run_worker(connection, snapshot, base_iri):
+    """ Main loop of the worker process - executing the commands received through the pipe """
+    worker_module = _WorkerModule(snapshot, base_iri)
+    while True:
+        command, args = connection.recv()
+        if command == "stop":
+            worker_module.close()
+            break
+        try:
+            result = getattr(worker_module, command)(*args)
+            connection.send(("ok", result))
+        except Exception as e:
+            connection.send(("error", e))
+    connection.close()
+
+
+class ReasonerWorker:
+    """ Long-lived worker process, keeping the module of the ontology (see 'ReasoningModule') and the reasoner warm
+     between the classifications - the Pellet reasoner runs in the JVM loaded once into the worker (through JPype), so
+     the JVM's startup is not paid for each reasoning; the system sends only the changes (new situations, added/removed
+     rules) through the pipe and the worker is restarted automatically if it crashes; only Pellet can be kept loaded
+     (the HermiT's command-line tool exits the JVM when it finishes) """
+    max_retries = 2  # how many times the request is repeated after the worker's crash
+
+    def __init__(self, onto, reasoner_type):
+        if reasoner_type != "pellet":
+            raise ValueError(f"Unrecognized reasoner's name for the reasoner worker: '{reasoner_type}'; "
+                             f"Accepted values: ['pellet']")
+        self.onto = onto  # the ontology with the whole knowledge
+        self.rules = []  # current inference rules (needed to restart the worker)
+        self.process = None  # the worker process
+        self.connection = None  # system's end of the pipe
+        self.worker_time = 0.0  # total time spent waiting for the worker
+        self.restarts_count = 0  # number of the worker's restarts after the crashes
+        self._start()
+
+    def _start(self):
+        """ Starting the worker process with the snapshot of the module (the TBox and the current rules) """
+        module = ReasoningModule(self.onto)
+        module.sync_rules(self.rules)
+        # 'spawn' is used, so the worker does not inherit the system's ontology
+        context = multiprocessing.get_context("spawn")
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=_run_worker, daemon=True,
+                                       args=(worker_connection, module.get_snapshot(), self.onto.base_iri))
+        self.process.start()
+        worker_connection.close()
+
+    def _request(self, command, *args):
+        """ Sending the command to the worker and waiting for the result (the worker is restarted if it crashed) """
+        request_time = time()
+        for _ in range(self.max_retries + 1):
+            try:
+                self.connection.send((command, args))
+                status, result = self.connection.recv()
+            except (EOFError, OSError):
+                print("WARNING: Reasoner worker has crashed! Restarting the worker...")
+                self.stop()
+                self._start()
+                self.restarts_count += 1
+                continue
+            self.worker_time += time() - request_time
+            if status == "error":
+                raise result
+            return result
+        raise RuntimeError(f"Reasoner worker has crashed {self.max_retries + 1} times in a row")
+
+    @staticmethod
+    def describe_rules(rules):
+        """ Plain descriptions of the inference rules - their texts and the individuals they refer to """
+        referred_individuals = [a for r in rules for atom in list(r.body) + list(r.head)
+                                for a in atom.arguments if isinstance(a, Thing) and not isinstance(a, Variable)]
+        descriptions = describe_linked_individuals(referred_individuals)
+        return [get_rule_text(r) for r in rules], list(descriptions.values())
+
+    @staticmethod
+    def describe_situations(situations):
+        """ Plain descriptions of the situations (without their actions) and of the individuals linked to them (with all
+         their properties) """
+        described = {s.iri: describe_individual(s, skipped_properties=("takenAction",)) for s in situations}
+        linked_individuals = [v for s in situations for p in s.get_properties() if p.python_name != "takenAction"
+                              for v in p[s] if isinstance(v, Thing)]
+        return [s.iri for s in situations], list(describe_linked_individuals(linked_individuals, described).values())
+
+    def sync_described_rules(self, rules, rules_texts, descriptions):
+        """ Sending the described inference rules to the worker """
+        self.rules = list(rules)
+        self._request("sync_rules", rules_texts, descriptions)
+
+    def add_described(self, descriptions):
+        """ Sending the described individuals (e.g. the previous situations) to the worker, which keeps them """
+        self._request("apply_individuals", descriptions)
+
+    def classify_described(self, situations_iris, descriptions, keep_situations=False):
+        """ Reasoning over the module with the described situations in the worker; returns the IRIs of the actions
+         inferred for each situation (the main ontology is not used, so it is safe to call it from another thread) """
+        return self._request("classify", situations_iris, descriptions, keep_situations)
+
+    def sync_rules(self, rules):
+        """ Sending the current inference rules (with the individuals they refer to) to the worker """
+        rules = list(rules)
+        self.sync_described_rules(rules, *self.describe_rules(rules))
+
+    def classify(self, situations, sync_reasoner=None):
+        """ Reasoning over the module with the given situations in the worker (the worker uses its own reasoner);
+         returns the lists of actions inferred for each situation (as the individuals of the main ontology) """
+        inferred_actions = self.classify_described(*self.describe_situations(situations))
+        return [[self.onto.world[a] for a in actions] for actions in inferred_actions]
+
+    def stop(self):
+        """ Stopping the worker process """
+        try:
+            self.connection.send(("stop", ()))
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.connection.close()
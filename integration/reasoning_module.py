@@ -0,0 +1,162 @@
+from owlready2 import *
+import types
+import io
+
+
+def get_rule_text(rule):
+    """ Parsing the rule to the text that uses only the entities' names (so it fits every world) """
+    def parse_atom(atom):
+        # the predicate of the atom
+        if isinstance(atom, ClassAtom):
+            predicate = atom.class_predicate.name
+        elif isinstance(atom, BuiltinAtom):
+            predicate = atom.builtin
+        else:
+            predicate = atom.property_predicate.name
+        # the arguments of the atom (variables, entities and literal values)
+        arguments = []
+        for a in atom.arguments:
+            if isinstance(a, Variable):
+                arguments.append(f"?{a.name}")
+            elif isinstance(a, bool):
+                arguments.append(str(a).lower())
+            elif hasattr(a, "name"):
+                arguments.append(a.name)
+            else:
+                arguments.append(str(a))
+        return f"{predicate}({', '.join(arguments)})"
+
+    return ", ".join(parse_atom(a) for a in rule.body) + " -> " + ", ".join(parse_atom(a) for a in rule.head)
+
+
+class ReasoningModule:
+    """ Separate world that holds only the module of the ontology needed to classify a new situation - the TBox,
+     the current inference rules, the situation itself and the individuals linked to it; thanks to that, the cost of
+     the reasoning does not depend on the number of the historical situations """
+    def __init__(self, onto):
+        self.onto = onto  # the ontology with the whole knowledge
+        self.world = World()  # the world of the module, independent of the main one
+        self.module_onto = self.world.get_ontology(onto.base_iri)  # the module's ontology
+        self.rules = dict()  # text of the rule -> rule in the module
+        # copying the TBox (classes and properties) to the module
+        for c in onto.classes():
+            self._get_module_entity(c)
+        for p in onto.properties():
+            self._get_module_entity(p)
+
+    def _map(self, x):
+        """ Getting the module's equivalent of the given entity, construct or value """
+        if isinstance(x, (ThingClass, PropertyClass, Thing)):
+            return self._get_module_entity(x)
+        if isinstance(x, Restriction):
+            return Restriction(self._map(x.property), x.type, x.cardinality, self._map(x.value))
+        if isinstance(x, And):
+            return And([self._map(c) for c in x.Classes])
+        if isinstance(x, Or):
+            return Or([self._map(c) for c in x.Classes])
+        if isinstance(x, Not):
+            return Not(self._map(x.Class))
+        if isinstance(x, OneOf):
+            return OneOf([self._map(i) for i in x.instances])
+        if isinstance(x, Inverse):
+            return Inverse(self._map(x.property))
+        # datatypes and literal values are independent of the world
+        return x
+
+    def _get_module_entity(self, entity, copy_properties=True):
+        """ Getting the module's equivalent of the given class, property or individual (creating it if needed) """
+        # entities of OWL itself (e.g. 'Thing', 'FunctionalProperty') are shared by all the worlds
+        if entity.namespace.world is not self.onto.world:
+            return entity
+        module_entity = self.world[entity.iri]
+        if module_entity is not None:
+            return module_entity
+        module_namespace = self.module_onto.get_namespace(entity.namespace.base_iri)
+        # creating the individual (the values of its properties are copied separately)
+        if isinstance(entity, Thing):
+            module_classes = [self._map(c) for c in entity.is_a]
+            module_entity = module_classes[0](entity.name, namespace=module_namespace)
+            for c in module_classes[1:]:
+                module_entity.is_a.append(c)
+            if copy_properties:
+                self.copy_individual_properties(entity)
+            return module_entity
+        # creating the class or the property (its parents need to be created beforehand)
+        with self.module_onto:
+            module_entity = types.new_class(entity.name, tuple(self._map(c) for c in entity.is_a
+                                                               if isinstance(c, (ThingClass, PropertyClass))),
+                                            exec_body=lambda body: body.update({"namespace": module_namespace}))
+            for c in entity.is_a:
+                if not isinstance(c, (ThingClass, PropertyClass)):
+                    module_entity.is_a.append(self._map(c))
+            if isinstance(entity, ThingClass):
+                module_entity.equivalent_to = [self._map(c) for c in entity.equivalent_to]
+            else:
+                module_entity.domain = [self._map(c) for c in entity.domain]
+                module_entity.range = [self._map(c) for c in entity.range]
+                if entity.inverse_property is not None:
+                    module_entity.inverse_property = self._map(entity.inverse_property)
+        return module_entity
+
+    def copy_individual_properties(self, individual, skipped_properties=()):
+        """ Copying (or refreshing) the values of the individual's properties and its synonyms to the module """
+        module_individual = self._get_module_entity(individual, copy_properties=False)
+        with self.module_onto:
+            for p in individual.get_properties():
+                if p.python_name in skipped_properties or p.namespace.world is not self.onto.world:
+                    continue
+                values = [self._map(v) for v in p[individual]]
+                if FunctionalProperty in p.is_a:
+                    setattr(module_individual, p.python_name, values[0] if len(values) > 0 else None)
+                else:
+                    setattr(module_individual, p.python_name, values)
+            module_individual.equivalent_to = [self._map(i) for i in individual.INDIRECT_equivalent_to]
+        return module_individual
+
+    def sync_rules(self, rules):
+        """ Synchronizing the module's inference rules with the given ones (only the changed rules are replaced) """
+        wanted_rules = dict()
+        for r in rules:
+            wanted_rules[get_rule_text(r)] = r
+        with self.module_onto:
+            # removing the outdated rules
+            for rule_text in list(self.rules):
+                if rule_text not in wanted_rules:
+                    destroy_entity(self.rules.pop(rule_text))
+            # adding the new rules (with the individuals they refer to)
+            for rule_text, r in wanted_rules.items():
+                if rule_text not in self.rules:
+                    for atom in list(r.body) + list(r.head):
+                        for a in atom.arguments:
+                            if isinstance(a, Thing):
+                                self._get_module_entity(a)
+                    module_rule = Imp()
+                    module_rule.set_as_rule(rule_text)
+                    self.rules[rule_text] = module_rule
+
+    def classify(self, situations, sync_reasoner):
+        """ Reasoning over the module with the given situations (the reasoner is invoked once for all of them); returns
+         the lists of actions inferred for each situation (as the individuals of the main ontology) """
+        module_situations = []
+        for situation in situations:
+            # copying the situation with its linked individuals (their values are refreshed in case they were changed)
+            for p in situation.get_properties():
+                for v in p[situation]:
+                    if isinstance(v, Thing):
+                        self.copy_individual_properties(v)
+            module_situations.append(self.copy_individual_properties(situation, skipped_properties=("takenAction",)))
+        # the reasoning itself
+        with self.module_onto:
+            sync_reasoner(self.world, infer_property_values=True)
+        inferred_actions = [[self.onto.world[a.iri] for a in s.takenAction] for s in module_situations]
+        # removing the situations from the module, so it does not grow with the history
+        with self.module_onto:
+            for s in module_situations:
+                destroy_entity(s)
+        return inferred_actions
+
+    def get_snapshot(self):
+        """ Saving the current state of the module (in the 'N-Triples' format) """
+        snapshot = io.BytesIO()
+        self.module_onto.save(file=snapshot, format="ntriples")
+        return snapshot.getvalue()
@@ -0,0 +1,171 @@
+from collections import deque
+from time import time
+
+
+class RetrainingPolicy:
+    """ Parent class for the child policies; the policy either asks for the retraining of the inference rules
+     (triggers) or forbids it (limits), based on the observations it was informed about """
+    def observe(self, observation):
+        """ Informing the policy about the classified observation - dictionary with keys: 'history_size' (number of
+         the classified situations), 'rejected' (whether the user rejected any result), 'covered' (whether the rules
+         gave any result) """
+        pass
+
+    def get_trigger_reason(self):
+        """ Reason for the retraining (None if the policy does not ask for it) """
+        return None
+
+    def get_veto_reason(self):
+        """ Reason for forbidding the retraining (None if the policy allows it) """
+        return None
+
+    def on_retraining(self):
+        """ Informing the policy that the retraining has started """
+        pass
+
+    def on_retraining_cost(self, cpu_time):
+        """ Informing the policy about the CPU time of the finished retraining """
+        pass
+
+
+class EveryNPolicy(RetrainingPolicy):
+    """ The child policy that asks for the retraining after every N-th classified situation """
+    def __init__(self, n=10):
+        self.n = n  # number of the situations between the retrainings
+        self.history_size = 0  # number of the classified situations
+
+    def observe(self, observation):
+        """ Saving the number of the classified situations """
+        self.history_size = observation["history_size"]
+
+    def get_trigger_reason(self):
+        """ Asking for the retraining if the number of the classified situations is divisible by N """
+        if self.history_size > 0 and self.history_size % self.n == 0:
+            return f"history reached {self.history_size} situations (every {self.n})"
+        return None
+
+
+class WindowRatePolicy(RetrainingPolicy):
+    """ Base for the child policies that ask for the retraining if the rate of some event among the recently
+     classified situations exceeds the threshold """
+    event_name = None  # name of the event, used in the reason
+
+    def __init__(self, threshold, window=20, min_observations=10):
+        self.threshold = threshold  # maximum rate of the event that does not need the retraining
+        self.window = deque(maxlen=window)  # whether or not the event happened for the recent situations
+        self.min_observations = min_observations  # minimum number of the situations needed to compute the rate
+
+    def _is_event(self, observation):
+        """ Base for checking if the event happened for the observation """
+        raise NotImplementedError
+
+    def observe(self, observation):
+        """ Saving the event for the observation """
+        self.window.append(self._is_event(observation))
+
+    def get_trigger_reason(self):
+        """ Asking for the retraining if the rate of the event is too high """
+        if len(self.window) < self.min_observations:
+            return None
+        rate = sum(self.window) / len(self.window)
+        if rate > self.threshold:
+            return f"{self.event_name} rate {rate:.2f} > {self.threshold} (last {len(self.window)} situations)"
+        return None
+
+    def on_retraining(self):
+        """ The new rules need to be judged on their own """
+        self.window.clear()
+
+
+class RejectionDriftPolicy(WindowRatePolicy):
+    """ The child policy that asks for the retraining if the users reject the results too often (the users'
+     preferences drift away from the rules) """
+    event_name = "rejection"
+
+    def __init__(self, threshold=0.3, window=20, min_observations=10):
+        super().__init__(threshold, window, min_observations)
+
+    def _is_event(self, observation):
+        """ The user rejected at least one of the results """
+        return observation["rejected"]
+
+
+class CoverageMissPolicy(WindowRatePolicy):
+    """ The child policy that asks for the retraining if the rules do not give any result too often """
+    event_name = "coverage miss"
+
+    def __init__(self, threshold=0.2, window=20, min_observations=10):
+        super().__init__(threshold, window, min_observations)
+
+    def _is_event(self, observation):
+        """ The rules did not give any result """
+        return not observation["covered"]
+
+
+class CpuBudgetPolicy(RetrainingPolicy):
+    """ The child policy that forbids the retraining if the CPU time spent on the retrainings during the last hour
+     exceeds the budget """
+    def __init__(self, seconds_per_hour=60.0):
+        self.seconds_per_hour = seconds_per_hour  # CPU time budget (in seconds) per hour
+        self.costs = deque()  # pairs of (time of the retraining, its CPU time)
+
+    def get_spent_time(self):
+        """ CPU time spent on the retrainings during the last hour """
+        while len(self.costs) > 0 and self.costs[0][0] < time() - 3600:
+            self.costs.popleft()
+        return sum(c[1] for c in self.costs)
+
+    def get_veto_reason(self):
+        """ Forbidding the retraining if the budget is exhausted """
+        spent_time = self.get_spent_time()
+        if spent_time >= self.seconds_per_hour:
+            return f"CPU budget exhausted ({spent_time:.2f}s of {self.seconds_per_hour}s in the last hour)"
+        return None
+
+    def on_retraining_cost(self, cpu_time):
+        """ Saving the CPU time of the retraining """
+        self.costs.append((time(), cpu_time))
+
+
+class RetrainingScheduler:
+    """ Scheduler consulted by the system about the retraining of the inference rules; the retraining happens if any
+     policy asks for it (or if the rules failed to classify the situation) and none of the policies forbids it;
+     all the decisions are logged """
+    def __init__(self, policies=None):
+        # the policies of the scheduler (by default - the retraining after every 10th situation)
+        self.policies = policies if policies is not None else [EveryNPolicy(10)]
+        self.history_size = 0  # number of the classified situations
+        self.decisions_log = []  # list of the decisions (only when the retraining was asked for)
+        self.retrainings_cpu_time = 0.0  # total CPU time of the retrainings
+
+    def observe(self, observation):
+        """ Informing all the policies about the classified observation """
+        self.history_size = observation["history_size"]
+        for p in self.policies:
+            p.observe(observation)
+
+    def should_retrain(self, on_demand=False):
+        """ Deciding if the inference rules should be retrained; 'on_demand' - the rules failed to classify
+         the situation """
+        if on_demand:
+            trigger_reasons = ["rules failed to classify the situation"]
+        else:
+            trigger_reasons = [r for r in (p.get_trigger_reason() for p in self.policies) if r is not None]
+        if len(trigger_reasons) == 0:
+            return False
+        veto_reasons = [r for r in (p.get_veto_reason() for p in self.policies) if r is not None]
+        decision = len(veto_reasons) == 0
+        self.decisions_log.append({"history_size": self.history_size, "on_demand": on_demand, "retrain": decision,
+                                   "trigger_reasons": trigger_reasons, "veto_reasons": veto_reasons})
+        print(f"Retraining scheduler's decision: {'retrain' if decision else 'skip'} "
+              f"({'; '.join(trigger_reasons + veto_reasons)})")
+        if decision:
+            for p in self.policies:
+                p.on_retraining()
+        return decision
+
+    def record_retraining_cost(self, cpu_time):
+        """ Informing all the policies about the CPU time of the finished retraining """
+        self.retrainings_cpu_time += cpu_time
+        for p in self.policies:
+            p.on_retraining_cost(cpu_time)
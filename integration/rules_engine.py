@@ -0,0 +1,174 @@
+from owlready2 import *
+import operator
+
+
+# comparisons offered by the SWRL built-ins that can be handled by the engine
+BUILTIN_COMPARISONS = {"lessThan": operator.lt, "lessThanOrEqual": operator.le,
+                       "greaterThan": operator.gt, "greaterThanOrEqual": operator.ge,
+                       "equal": operator.eq, "notEqual": operator.ne}
+
+
+class UnsupportedRuleError(Exception):
+    """ Raised when the inference rule contains an element that the engine cannot evaluate by itself """
+    pass
+
+
+class CompiledRule:
+    """ Inference rule compiled to the list of simple conditions over the paths of properties, starting from the
+     classified situation (e.g. path ('hadUser', 'hasAge') leads to the age of the situation's user) """
+    def __init__(self, rule):
+        self.rule = rule  # original inference rule (Imp)
+        self.conditions = []  # list of tuples: (path, condition type, expected value/values/class/comparison)
+        self.head_actions = []  # list of the actions inferred by the rule
+        self.index_keys = []  # (path, value) pairs, used for the rule's indexing
+        self._compile()
+
+    @staticmethod
+    def _get_equivalents(value):
+        """ Set of values considered equal to the given one (individuals can have their synonyms) """
+        equivalents = {value}
+        if isinstance(value, Thing):
+            equivalents.update(value.INDIRECT_equivalent_to)
+        return frozenset(equivalents)
+
+    def _compile(self):
+        """ Parsing the rule's atoms to conditions; raises 'UnsupportedRuleError' if that is impossible """
+        # the head of the rule needs to have a form of 'takenAction(?s, Action)'
+        if len(self.rule.head) != 1:
+            raise UnsupportedRuleError(f"Unsupported rule's head: {self.rule}")
+        head = self.rule.head[0]
+        if not isinstance(head, IndividualPropertyAtom) or head.property_predicate.name != "takenAction" or \
+           not isinstance(head.arguments[0], Variable) or isinstance(head.arguments[1], Variable):
+            raise UnsupportedRuleError(f"Unsupported rule's head: {self.rule}")
+        self.head_actions = sorted(self._get_equivalents(head.arguments[1]), key=lambda k: k.name)
+        # paths to the values of the rule's variables (the situation's variable is the starting point)
+        var_paths = {head.arguments[0].name: ()}
+        # going over each atom and setting the conditions that need to be met; the atoms referring to the variables
+        # that are not bound yet (e.g. 'User(?u)' placed before 'hadUser(?s, ?u)') are postponed
+        pending_atoms = list(self.rule.body)
+        while len(pending_atoms) > 0:
+            postponed_atoms = []
+            for atom in pending_atoms:
+                if not self._compile_atom(atom, var_paths):
+                    postponed_atoms.append(atom)
+            # none of the atoms could be compiled in the last pass
+            if len(postponed_atoms) == len(pending_atoms):
+                raise UnsupportedRuleError(f"Unsupported atom '{postponed_atoms[0]}' in the rule: {self.rule}")
+            pending_atoms = postponed_atoms
+        # the first comparison with the constant individual/value (or its synonyms) is used as the rule's index
+        for path, cond_type, expected in self.conditions:
+            if cond_type == "equal":
+                self.index_keys = [(path, e) for e in expected]
+                break
+
+    def _compile_atom(self, atom, var_paths):
+        """ Parsing the single atom to the condition; returns False if the atom's variable is not bound yet """
+        args = atom.arguments
+        if not isinstance(args[0], Variable):
+            raise UnsupportedRuleError(f"Unsupported atom '{atom}' in the rule: {self.rule}")
+        if args[0].name not in var_paths:
+            return False
+        if isinstance(atom, ClassAtom):
+            self.conditions.append((var_paths[args[0].name], "class", atom.class_predicate))
+        elif isinstance(atom, (IndividualPropertyAtom, DatavaluedPropertyAtom)):
+            path = var_paths[args[0].name] + (atom.property_predicate,)
+            # binding a new variable to the value of the property
+            if isinstance(args[1], Variable):
+                if args[1].name in var_paths:
+                    raise UnsupportedRuleError(f"Unsupported atom '{atom}' in the rule: {self.rule}")
+                var_paths[args[1].name] = path
+                self.conditions.append((path, "exists", None))
+            # comparing the value of the property with the constant
+            else:
+                self.conditions.append((path, "equal", self._get_equivalents(args[1])))
+        elif isinstance(atom, BuiltinAtom):
+            if atom.builtin not in BUILTIN_COMPARISONS or len(args) != 2 or isinstance(args[1], Variable):
+                raise UnsupportedRuleError(f"Unsupported atom '{atom}' in the rule: {self.rule}")
+            self.conditions.append((var_paths[args[0].name], "compare", (BUILTIN_COMPARISONS[atom.builtin], args[1])))
+        else:
+            raise UnsupportedRuleError(f"Unsupported atom '{atom}' in the rule: {self.rule}")
+        return True
+
+    def matches(self, get_values):
+        """ Checking if all the rule's conditions are met; 'get_values' returns the list of values for the given path """
+        for path, cond_type, expected in self.conditions:
+            values = get_values(path)
+            if cond_type == "exists":
+                if len(values) == 0:
+                    return False
+            elif cond_type == "equal":
+                if not any(v in expected for v in values):
+                    return False
+            elif cond_type == "class":
+                if not any(isinstance(v, expected) for v in values):
+                    return False
+            else:
+                comparison, constant = expected
+                if not any(comparison(v, constant) for v in values):
+                    return False
+        return True
+
+
+class CompiledRulesEngine:
+    """ In-process rules engine; the inference rules are compiled to the indexed conditions, so the actions for the new
+     situation can be found without launching the reasoner (the engine can also refuse to decide) """
+    def __init__(self):
+        self.compiled_rules = []  # all the compiled rules
+        self.rules_index = dict()  # (path, value) -> list of compiled rules, indexed by the value
+        self.unindexed_rules = []  # compiled rules without any value to be indexed by
+        self.indexed_paths = []  # paths of the properties used in the index
+        self.unsupported_rules = []  # rules that could not be compiled (the engine cannot decide if they exist)
+
+    def compile(self, rules):
+        """ Compiling the given inference rules (the previous ones are forgotten) """
+        self.compiled_rules = []
+        self.rules_index = dict()
+        self.unindexed_rules = []
+        self.unsupported_rules = []
+        for r in rules:
+            try:
+                compiled_rule = CompiledRule(r)
+            except UnsupportedRuleError:
+                self.unsupported_rules.append(r)
+                continue
+            self.compiled_rules.append(compiled_rule)
+            # putting the rule in the index
+            if len(compiled_rule.index_keys) > 0:
+                for k in compiled_rule.index_keys:
+                    self.rules_index.setdefault(k, []).append(compiled_rule)
+            else:
+                self.unindexed_rules.append(compiled_rule)
+        self.indexed_paths = list(dict.fromkeys(k[0] for k in self.rules_index))
+
+    def can_decide(self):
+        """ The engine can decide only if it managed to compile all the inference rules """
+        return len(self.unsupported_rules) == 0
+
+    def classify(self, situation):
+        """ Getting the actions inferred for the given situation; returns None if the engine cannot decide """
+        if not self.can_decide():
+            return None
+        # values of the situation's properties are cached, since many rules share the same paths
+        values_cache = {(): [situation]}
+
+        def get_values(path):
+            """ Side function, getting the values at the end of the path of properties """
+            if path not in values_cache:
+                values = []
+                for v in get_values(path[:-1]):
+                    if isinstance(v, Thing):
+                        values.extend(path[-1][v])
+                values_cache[path] = values
+            return values_cache[path]
+
+        # getting the candidates from the index
+        candidate_rules = list(self.unindexed_rules)
+        for path in self.indexed_paths:
+            for v in get_values(path):
+                candidate_rules.extend(self.rules_index.get((path, v), []))
+        # checking the candidates (without duplicates) and gathering the inferred actions (without duplicates)
+        inferred_actions = dict()
+        for r in dict.fromkeys(candidate_rules):
+            if r.matches(get_values):
+                inferred_actions.update(dict.fromkeys(r.head_actions))
+        return list(inferred_actions)
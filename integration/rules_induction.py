@@ -1,40 +1,92 @@
 from .data_parser import OntologyDataParser
+from .history_store import HistoryStore
+from .reasoning_module import get_rule_text
+from .tracing import tracer, traced
+from collections import Counter
 import json
+import math
 import re
-import shutil
 import os
+import numpy as np
 from owlready2 import *
-from chefboost import Chefboost as chef
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import make_column_transformer
-from sklearn.pipeline import make_pipeline
-from sklearn.tree import DecisionTreeClassifier, export_text
 
 
 KNOWLEDGE_FOLDER = "knowledge_folder"
-DEFAULT_DATASET = "actions_taken.csv"
+# comment marking the inference rules put in the ontology by the inductors (the other rules are never removed)
+INFERRED_RULE_COMMENT = "inferred by the rules inductor"
+# parameters of the Hoeffding tree: the probability of splitting the leaf although its best feature does not give
+# any information gain and the number of the new records the leaf collects between the attempts to split it
+HOEFFDING_DELTA = 1e-3
+HOEFFDING_GRACE_PERIOD = 10
+# number of the trainings after which the Hoeffding tree is built again from all the records (0 - never)
+HOEFFDING_REBUILD_PERIOD = 10
 
 
 class RulesInductor:
     """ Parent class for the child inductors; the purpose of the 'Rules Inductor' is to train machine learning
      models based on the historical data from the ontology and parse them into inference rules for the ontology """
     wanted_rules_file = None  # base name of the file in which model's conditional expressions will be saved
+    # whether or not the categorical columns of the dataset are pandas' categoricals (built on the history store's
+    # codes, without copying); otherwise they are the strings
+    categorical_dataset = True
+    # whether or not the model is updated by the next trainings (instead of being trained again), so it has to be kept
+    incremental = False
+    # whether or not the dataset has the column with the situations' names ('Id')
+    dataset_with_ids = False
 
     def __init__(self, onto):
         self.onto = onto  # the ontology with important data
         self.dataset = None  # dataframe, parsed from the ontology
+        self.onto_parser = OntologyDataParser(onto)  # parser of the history's records
+        # columnar store keeping the records of the whole history between the learnings (only the changes are parsed
+        # again); created at the first learning
+        self.history = None
         self.model = None  # trained machine learning model
         self.inferred_rules_list = list()  # list of inferred rule, parsed from conditional expressions
+        self.inferred_rules_texts = dict()  # text of the inferred rule -> the rule (used to find the changed rules)
+        self.export_rules = False  # whether or not the learnt rules are also saved to the files (for debugging)
+        self.action_labels = dict()  # synonym of the action -> the action its records are labelled with
 
+    @traced("reset")
     def reset(self):
         """ This function's goal is to reset/clear all the class' parameters, except for the ontology """
         self.dataset = None
+        if self.history is not None:
+            self.history.close()
+            self.history = None
         self.model = None
+        self.remove_swrl_rules()
+
+    @traced("remove_swrl_rules")
+    def remove_swrl_rules(self):
+        """ Removing the inferred rules from the ontology (the dataset and the model are kept) """
         # removing rules from the ontology one at a time
         with self.onto:
             for r in self.inferred_rules_list:
                 destroy_entity(r)
         self.inferred_rules_list = []
+        self.inferred_rules_texts = dict()
+
+    def restore_swrl_rules(self):
+        """ Finding the inferred rules that are already in the ontology (e.g. the ones saved in the quadstore by
+         the previous analysis), so they are replaced by the next learning """
+        self.inferred_rules_list = [r for r in self.onto.rules() if INFERRED_RULE_COMMENT in r.comment]
+        self.inferred_rules_texts = {get_rule_text(r): r for r in self.inferred_rules_list}
+
+    @traced("sync_swrl_rules")
+    def sync_swrl_rules(self, rules_swrl):
+        """ Replacing the inferred rules in the ontology with the given ones (in the text form) - only the rules that
+         are not in the new set are removed and only the ones that are not in the ontology yet are added (each group in
+         one batch), the rest is kept as it is; returns the numbers of the added, removed and kept rules """
+        wanted_rules = dict.fromkeys(rules_swrl)
+        outdated_rules = [t for t in self.inferred_rules_texts if t not in wanted_rules]
+        new_rules = [t for t in wanted_rules if t not in self.inferred_rules_texts]
+        with self.onto:
+            for rule_text in outdated_rules:
+                destroy_entity(self.inferred_rules_texts.pop(rule_text))
+        self.inferred_rules_list = list(self.inferred_rules_texts.values())
+        self.set_swrl_rules(new_rules)
+        return len(new_rules), len(outdated_rules), len(wanted_rules) - len(new_rules)
 
     def get_rules_info(self):
         """ An additional function which is supposed to return analysis statistics about inferred rules """
@@ -45,17 +97,34 @@ class RulesInductor:
             body_length_sum += len(r.body)
         return rules_num, body_length_sum / rules_num
 
-    def get_dataset(self, dataset_csv=DEFAULT_DATASET):
-        """ Using 'Data Parser' to get the dataset form the ontology """
-        onto_parser = OntologyDataParser(self.onto)
-        onto_parser.parse_situations_to_df()
-        # saving dataset into csv file just to be safe
-        onto_parser.save_dataframe(dataset_csv)
-        self.dataset = onto_parser.get_dataframe()
-        # removing an 'Id' column and potential records with missing values
-        self.dataset.drop(columns=['Id'], inplace=True)
-        self.dataset.dropna(inplace=True)
+    @traced("get_dataset")
+    def get_dataset(self, dataset_csv=None, skipped_situations=(), changed_situations=None):
+        """ Using 'Data Parser' to get the dataset form the ontology (the records of the skipped situations are omitted);
+         if the changed situations are given (the new ones and the ones whose actions have changed since the previous
+         learning), only they are parsed again and the rest of the records is kept in the history store from
+         the previous learning, otherwise (None) the whole history is parsed; the dataset is saved to the .csv file
+         only if its name is given """
+        if self.history is None:
+            self.history = HistoryStore()
+            changed_situations = None
+        self.onto_parser.store_situations(self.history, changed_situations)
+        if dataset_csv is not None:
+            self.onto_parser.save_history(self.history, dataset_csv)
+        # records with missing values are omitted
+        self.dataset = self.history.to_dataframe(skipped_situations, categorical=self.categorical_dataset,
+                                                 with_ids=self.dataset_with_ids)
+
+    @traced("verify_dataset")
+    def verify_dataset(self, skipped_situations=()):
+        """ Comparing the records of the history store (e.g. the ones updated only with the changed situations) with
+         the records parsed from the whole history; returns True if they are the same """
+        full_history = HistoryStore()
+        self.onto_parser.store_situations(full_history)
+        full_dataset = full_history.to_dataframe(skipped_situations, categorical=False, with_ids=True)
+        full_history.close()
+        return full_dataset.equals(self.history.to_dataframe(skipped_situations, categorical=False, with_ids=True))
 
+    @traced("train_model.synonyms")
     def train_model(self):
         """ Base for the training process """
         # get synonyms of the instances
@@ -74,11 +143,42 @@ class RulesInductor:
                 if not present:
                     synonyms[i.name] = parsed_equivalents
         # parsing class labels in dataset
+        self.action_labels = {s: k for k, v in synonyms.items() for s in v}
         for k, v in synonyms.items():
-            self.dataset["takenAction"].replace(v, k, inplace=True)
+            self.dataset["takenAction"] = self.dataset["takenAction"].replace(v, k)
 
+    @traced("parse_to_swrl")
     def parse_to_swrl(self):
-        """ This function is supposed to parse conditional expressions from learned models to inference rules """
+        """ This function is supposed to parse conditional expressions from learned models to inference rules and to put
+         them in the ontology """
+        self.set_swrl_rules(self.get_swrl_rules())
+
+    @traced("set_swrl_rules")
+    def set_swrl_rules(self, rules_swrl):
+        """ Putting the given inference rules (in the text form) in the ontology """
+        with self.onto:
+            for rule_swrl in rules_swrl:
+                new_rule = Imp()
+                new_rule.set_as_rule(rule_swrl)
+                new_rule.comment = [INFERRED_RULE_COMMENT]
+                self.inferred_rules_list.append(new_rule)
+                self.inferred_rules_texts[rule_swrl] = new_rule
+        # printing inferred rules for the user to see
+        print()
+        for r in self.inferred_rules_list:
+            print(str(r))
+
+    def get_rules_elements(self):
+        """ Elements of the learnt rules (the dictionaries with the keys: current_level, return_statement, feature_name,
+         rule), by default read from the json file saved by the training """
+        json_file_dir = os.path.join(KNOWLEDGE_FOLDER, self.wanted_rules_file) + ".json"
+        with open(json_file_dir, 'r') as f:
+            return json.load(f)
+
+    @traced("get_swrl_rules")
+    def get_swrl_rules(self):
+        """ Parsing conditional expressions from learned models to inference rules; returns the list of the rules
+         (in the text form), without putting them in the ontology """
         # gender map for the inference rules (fitting to the ontology)
         gender_map = {"male": "false", "female": "true"}
         # reversre gender map for the inference rules
@@ -163,12 +263,10 @@ class RulesInductor:
                 # yielding created substitutes for the negated rules (returning a generator)
                 yield ", ".join(new_body_copy)
 
-        # get json file with the rules' elements
-        json_file_dir = os.path.join(KNOWLEDGE_FOLDER, self.wanted_rules_file) + ".json"
-        with open(json_file_dir, 'r') as f:
-            facts_list = json.load(f)
-        # list used in verification of potential rules' repeats
-        temp_rules_list = list()
+        # get the rules' elements
+        facts_list = self.get_rules_elements()
+        # rules found so far (the dictionary keeps their order and finds the repeats by the hashes)
+        temp_rules_dict = dict()
         # base for the body of an inference rule (starting with 'Situation(?s)')
         rule_body_list = ["Situation(?s)"]
         # iterating over  subsequent dictionaries in json file
@@ -223,7 +321,8 @@ class RulesInductor:
                 # due to the possibility of creating multiple rules after the elimination of negations,
                 # all the current rules are being put in in the appropriate list
                 if '~' in rule_body:
-                    possible_bodies_list = eliminate_negations(rule_body_list, feature_value)
+                    with tracer.span("eliminate_negations"):
+                        possible_bodies_list = list(eliminate_negations(rule_body_list, feature_value))
                 else:
                     possible_bodies_list = [rule_body]
                 for rb in possible_bodies_list:
@@ -237,37 +336,28 @@ class RulesInductor:
                                   ", greaterThan\(\?a, \d+\)"]:
                             rb = re.sub(j, "", rb)
                     rule_swrl = rb + rule_head
-                    # setting a new rule to the ontology
-                    if rule_swrl not in temp_rules_list:
-                        temp_rules_list.append(rule_swrl)
-                        with self.onto:
-                            new_rule = Imp()
-                            new_rule.set_as_rule(rule_swrl)
-                            self.inferred_rules_list.append(new_rule)
-        # printing inferred rules for the user to see
-        print()
-        for r in self.inferred_rules_list:
-            print(str(r))
+                    # saving a new rule (without repeats)
+                    temp_rules_dict[rule_swrl] = None
+        return list(temp_rules_dict)
 
 
 class RulesInductorChefboost(RulesInductor):
-    """ The child inductor that is supposed to use chefboost module for machine learning """
-    # directory in which chefboost saves the learning results (rules) by default
-    chefboost_output_dir = os.path.join("outputs", "rules", "rules")
+    """ The child inductor that is supposed to use chefboost module for machine learning; the tree is built in memory
+     (its rules are not written to the 'outputs' directory), the files with the rules are saved only for debugging """
     # the base name for the files (.py and .json) that are supposed to contain learnt rules
     wanted_rules_file = "chefboost_rules"
+    # chefboost treats only the columns of the strings as the categorical ones
+    categorical_dataset = False
 
-    def _alter_json_rules(self, json_file_dir):
-        """ Side function which makes some modifications to the json file with learnt rules """
+    @staticmethod
+    def _alter_rules(rules):
+        """ Side function which makes some modifications to the learnt rules (chefboost's rules elements) """
         # specifying important information about rules that will be needed in the parsing process
         wanted_keys = ["current_level", "return_statement", "feature_name", "rule"]
-        # base for the new json file
-        new_json_list = []
-        # opening the default file
-        with open(json_file_dir, 'r') as f:
-            json_list = json.load(f)
-        # going over each rule element in the default file
-        for j in json_list:
+        # base for the new rules elements
+        new_rules = []
+        # going over each rule element
+        for j in rules:
             # base for a new rule element
             new_json_dict = dict()
             # getting needed information from established keys
@@ -278,88 +368,131 @@ class RulesInductorChefboost(RulesInductor):
                 new_json_dict["feature_name"] = "takenAction"
             # omitting the "else" statements that do not fit any specific values
             if new_json_dict["feature_name"] != "":
-                new_json_list.append(new_json_dict)
-        # replacing "default" file with the new one
-        os.remove(json_file_dir)
-        with open(json_file_dir, 'w') as f:
-            json.dump(new_json_list, f, indent=4)
+                new_rules.append(new_json_dict)
+        return new_rules
 
+    def get_rules_elements(self):
+        """ Elements of the learnt rules, taken from the model in memory """
+        return self._alter_rules(self.model)
+
+    @traced("train_model")
     def train_model(self):
         """ Training process using chefboost """
         super().train_model()
-        # setting the algorithm for the model
-        config = {'algorithm': 'C4.5'}
-        # training the model
-        self.model = chef.fit(self.dataset, config=config, target_label='takenAction')
-        # moving rules files (.py and .json) from default directory to the knowledge folder
-        wanted_file_dir = os.path.join(KNOWLEDGE_FOLDER, self.wanted_rules_file)
-        for sufix in [".py", ".json"]:
-            full_file_dir = wanted_file_dir + sufix
-            # deleting previous files form the knowledge folder
-            if os.path.exists(full_file_dir):
-                os.remove(full_file_dir)
-            os.rename(self.chefboost_output_dir + sufix, full_file_dir)
-        # removing the default directory
-        shutil.rmtree('outputs')
-        # making some modifications to the .json file
+        # the backend is imported only when it is needed (it takes seconds)
+        from chefboost.commons import functions as chef_functions
+        from chefboost.training import Training as chef_training
+        # setting the algorithm for the model (the parallel mode of chefboost keeps the rules' elements in memory)
+        config = chef_functions.initializeParams({'algorithm': 'C4.5', 'enableParallelism': True})
+        # the target column is expected to be the last one, named 'Decision'
+        dataset = self.dataset.rename(columns={"takenAction": "Decision"})
+        dataset_features = {c: dataset[c].dtypes for c in dataset.columns[:-1]}
+        # training the model - chefboost returns the rules' elements (instead of writing them to the files) only below
+        # the tree's root, so the tree is built from the second level and its levels are shifted back afterwards; unlike
+        # 'chef.fit', the branches are built in this process and the model is not evaluated on the training data
+        with tracer.span("chefboost.fit"):
+            rules = chef_training.buildDecisionTree(dataset, root=2, file=self.wanted_rules_file + ".py", config=config,
+                                                    dataset_features=dataset_features)
+        self.model = []
+        for r in rules:
+            r = json.loads(r)
+            r["current_level"] -= 1
+            self.model.append(r)
+        if self.export_rules:
+            with tracer.span("chefboost.files"):
+                self._save_rules(chef_training, list(dataset_features))
+
+    def _save_rules(self, chef_training, feature_names):
+        """ Saving the learnt rules to the knowledge folder - chefboost's decision function (.py) and the rules'
+         elements (.json) """
         json_file_dir = os.path.join(KNOWLEDGE_FOLDER, self.wanted_rules_file) + ".json"
-        self._alter_json_rules(json_file_dir)
+        # the decision function is reconstructed by chefboost from its own rules' elements
+        with open(json_file_dir, 'w') as f:
+            json.dump(self.model, f, indent=4)
+        chef_training.reconstructRules(json_file_dir, feature_names)
+        with open(json_file_dir, 'w') as f:
+            json.dump(self.get_rules_elements(), f, indent=4)
 
 
 class RulesInductorSklearn(RulesInductor):
-    """ The child inductor that is supposed to use scikit-learn module for machine learning """
+    """ The child inductor that is supposed to use scikit-learn module for machine learning; the rules' elements are
+     read directly from the learnt tree's arrays, the files with the rules are saved only for debugging """
     # the base name for the files (.txt and .json) that are supposed to contain learnt rules
     wanted_rules_file = "sklearn_rules"
+    # columns of the dataset transformed by the One Hot Encoder (the remaining 'hasAge' is passed as it is)
+    encoded_features = ["hadUser", "hasPersonality", "hasGender", "hadMood", "wasWeather", "wasTime"]
 
-    def _parse_rules_to_json(self, text_repr, json_file_dir):
-        """ Private method that will help in parsing the tree's output into readable json file;
-         Items needed for the rule dictionary:
-         current_level, rule, feature_name, return_statement"""
-        # splitting text from .txt file into separate string lines
-        rules_list = text_repr.splitlines()
-        # base for the .json file
-        rules_json = []
-        # going over each rule element in the .txt file
-        for r in rules_list:
-            # base for a new rule element
-            new_rule_dict = dict()
-            # setting the 'current level' for the current rule element
-            new_rule_dict["current_level"] = len(re.findall("\|", r))
-            new_rule_dict["return_statement"] = 0  # default value
-            # getting the conditional expression from the element
-            rule_atoms = re.search("\w.+$", r)[0].split()
+    def __init__(self, onto):
+        super().__init__(onto)
+        self.rules_elements = []  # elements of the learnt rules, read from the tree
+
+    def get_rules_elements(self):
+        """ Elements of the learnt rules, read from the tree in memory """
+        return self.rules_elements
+
+    @traced("sklearn.get_tree_rules")
+    def _get_tree_rules(self, clf, features):
+        """ Private method that reads the rules' elements directly from the tree's arrays, in the same order and form
+         as they would be parsed from the tree's text representation ('export_text' - depth first, the branch of
+         the false condition before the true one); 'features' - pairs (feature's name, one-hot encoded value or None
+         for 'hasAge') for the tree's inputs """
+        tree = clf.tree_
+        # the classes of the leaves and the thresholds of the splits (computed for all the nodes at once)
+        classes = clf.classes_[np.argmax(tree.value[:, 0, :], axis=1)]
+        thresholds = np.char.mod("%.2f", tree.threshold)
+        leaves = tree.children_left == -1
+        rules_elements = []
+        # stack of the nodes to visit (with their levels) and of the elements waiting for their turn
+        stack = [(0, 1, None)]
+        while len(stack) > 0:
+            node, level, rule_element = stack.pop()
+            if rule_element is not None:
+                rules_elements.append(rule_element)
             # settings for the return statements
-            if rule_atoms[0] == "class:":
-                new_rule_dict["return_statement"] = 1
-                new_rule_dict["feature_name"] = "takenAction"
-                new_rule_dict["rule"] = ' '.join(rule_atoms)
-            # settings for the 'hasAge' predicate (keeping the mathematical comparison)
-            elif rule_atoms[0] == "hasAge":
-                new_rule_dict["feature_name"] = "hasAge"
-                new_rule_dict["rule"] = "if " + ''.join(rule_atoms)
-            # settings for everything else (object properties that are not 'takenAction')
+            elif leaves[node]:
+                rules_elements.append({"current_level": level, "return_statement": 1, "feature_name": "takenAction",
+                                       "rule": f"class: {classes[node]}"})
             else:
-                feature_name, feature_value = rule_atoms[0].split('_', 1)
-                new_rule_dict["feature_name"] = feature_name
-                # if the variable from OneHotEncoding is equal to '0'
-                if rule_atoms[1] == "<=":
-                    # replacing 'negated' genders with their opposites
+                feature_name, feature_value = features[tree.feature[node]]
+                # settings for the 'hasAge' predicate (keeping the mathematical comparison)
+                if feature_value is None:
+                    false_rule = f"if {feature_name}<={thresholds[node]}"
+                    true_rule = f"if {feature_name}>{thresholds[node]}"
+                # settings for everything else (the variables from OneHotEncoding)
+                else:
+                    true_rule = f"if {feature_name} == {feature_value}"
+                    # if the variable is equal to '0' - replacing 'negated' genders with their opposites
                     if feature_name == "hasGender":
-                        if feature_value == "male":
-                            feature_value = "female"
-                        else:
-                            feature_value = "male"
+                        false_rule = f"if {feature_name} == {'female' if feature_value == 'male' else 'male'}"
                     # establishing the 'negated' conditional expression
                     else:
-                        feature_name = "not " + feature_name
-                new_rule_dict["rule"] = f"if {feature_name} == {feature_value}"
-            rules_json.append(new_rule_dict)
-        # saving .json file
-        with open(json_file_dir + ".json", 'w') as f:
-            json.dump(rules_json, f, indent=4)
+                        false_rule = f"if not {feature_name} == {feature_value}"
+                # the elements are taken from the stack in the reversed order
+                for child, rule in [(tree.children_right[node], true_rule), (tree.children_left[node], false_rule)]:
+                    stack.append((child, level + 1, None))
+                    stack.append((None, level, {"current_level": level, "return_statement": 0,
+                                                "feature_name": feature_name, "rule": rule}))
+        return rules_elements
+
+    def _save_rules(self, clf, features):
+        """ Saving the learnt rules to the knowledge folder - the tree's text representation (.txt) and the rules'
+         elements (.json) """
+        from sklearn.tree import export_text
+        feat_names = [f"{n}_{v}" if v is not None else n for n, v in features]
+        save_file_dir = os.path.join(KNOWLEDGE_FOLDER, self.wanted_rules_file)
+        with open(save_file_dir + '.txt', 'w', encoding='utf-8') as f:
+            f.write(export_text(clf, feature_names=feat_names, max_depth=100))
+        with open(save_file_dir + ".json", 'w') as f:
+            json.dump(self.rules_elements, f, indent=4)
 
+    @traced("train_model")
     def train_model(self):
         """ Training process using scikit-learn """
+        # the backend is imported only when it is needed (it takes seconds)
+        from sklearn.preprocessing import OneHotEncoder
+        from sklearn.compose import make_column_transformer
+        from sklearn.pipeline import make_pipeline
+        from sklearn.tree import DecisionTreeClassifier
         super().train_model()
         # splitting training dataset to X and y
         X = self.dataset.drop(columns=["takenAction"])
@@ -368,7 +501,7 @@ class RulesInductorSklearn(RulesInductor):
         ohe = OneHotEncoder()
         # implementing the column transformer that will transform all categorical variables with the use of OHE
         col_trans = make_column_transformer(
-            (ohe, ["hadUser", "hasPersonality", "hasGender", "hadMood", "wasWeather", "wasTime"]),
+            (ohe, self.encoded_features),
             remainder="passthrough"  # making sure that 'hasAge' won't be dropped
         )
         # setting the base classification tree with predetermined random state
@@ -376,18 +509,375 @@ class RulesInductorSklearn(RulesInductor):
         # creating the model taht combines the column transformer with the classifier
         self.model = make_pipeline(col_trans, clf)
         # training the classifier
-        self.model.fit(X, y)
-        # getting feature names
-        feat_names = self.model["columntransformer"].transformers_[0][1].get_feature_names_out()
-        feat_names = list(feat_names) + ["hasAge"]
+        with tracer.span("sklearn.fit"):
+            self.model.fit(X, y)
+        # getting features (the encoded ones in the order of the encoder's output, 'hasAge' at the end)
+        categories = self.model["columntransformer"].transformers_[0][1].categories_
+        features = [(n, v) for n, values in zip(self.encoded_features, categories) for v in values] + [("hasAge", None)]
         # getting the conditional expressions form the learnt tree
-        text_representation = export_text(clf, feature_names=list(feat_names), max_depth=100)
-        # saving if...else rules to .txt file
-        save_file_dir = os.path.join(KNOWLEDGE_FOLDER, self.wanted_rules_file)
-        for sufix in [".txt", ".json"]:
-            if os.path.exists(save_file_dir + sufix):
-                os.remove(save_file_dir + sufix)
-        with open(save_file_dir + '.txt', 'w', encoding='utf-8') as f:
-            f.write(text_representation)
-        # parsing if...else rules to json file
-        self._parse_rules_to_json(text_representation, save_file_dir)
+        self.rules_elements = self._get_tree_rules(clf, features)
+        # saving if...else rules to .txt and .json files
+        if self.export_rules:
+            with tracer.span("sklearn.files"):
+                self._save_rules(clf, features)
+
+
+class _HoeffdingNode:
+    """ Node of the Hoeffding tree - the leaf keeping its records (so they can be passed to the children once it is
+     split) and their statistics (the numbers of the actions for each value of each feature), or the binary split of
+     the records - by the feature's value (like the one-hot encoded features of scikit-learn's tree) or by the age's
+     threshold """
+    def __init__(self, conditions, negated_features=()):
+        self.conditions = conditions  # conditions leading to the node: (feature, comparison, value)
+        # indexes of the features negated by the conditions (the leaf's rules list their values instead)
+        self.negated_features = negated_features
+        self.records = Counter()  # the leaf's records - tuples of the features' values and the action (with numbers)
+        # numbers of the leaf's records for each combination of the negated features' values (one rule for each)
+        self.negations_counts = Counter()
+        self.class_counts = Counter()  # numbers of the leaf's records for each action
+        self.features_counts = dict()  # feature's index -> value -> numbers of the leaf's records for each action
+        self.checked_records_num = 0  # number of the leaf's records at the last attempt to split it
+        self.split_feature = None  # index of the feature the node is split on (None - the node is the leaf)
+        # value of the categorical feature the records are split by (they go to the True child if they have it) or
+        # the age's threshold of the split on 'hasAge' (the records above it go to the True child)
+        self.split_value = None
+        self.children = dict()  # result of the split's comparison (True/False) -> child
+        self.rules_swrl = []  # inference rules of the subtree, written at its last change
+        self.changed = True  # whether or not the subtree has changed since its rules were written
+
+    def get_negations(self, record):
+        """ Values of the record's negated features """
+        return tuple(record[f] for f in self.negated_features)
+
+    def get_records_num(self):
+        """ Number of the leaf's records """
+        return sum(self.class_counts.values())
+
+    def get_action(self):
+        """ The most common action of the leaf's records (the first one by the name in case of the tie; None if
+         the leaf has no records) """
+        if len(self.class_counts) == 0:
+            return None
+        return min(self.class_counts, key=lambda k: (-self.class_counts[k], k))
+
+    def get_child(self, record, is_numerical):
+        """ Child the record goes to ('is_numerical' - whether or not the split is made by the threshold) """
+        value = record[self.split_feature]
+        return self.children[value > self.split_value if is_numerical else value == self.split_value]
+
+    def update(self, record, count, features):
+        """ Adding the record to the leaf (or removing it, if the count is negative); its values are counted for
+         the features (indexes) the leaf can still be split on """
+        action = record[-1]
+        for counts, key in [(self.records, record), (self.class_counts, action),
+                            (self.negations_counts, self.get_negations(record))] + \
+                [(self.features_counts.setdefault(f, dict()).setdefault(record[f], Counter()), action) for f in features]:
+            counts[key] += count
+            if counts[key] <= 0:
+                del counts[key]
+
+
+class RulesInductorHoeffding(RulesInductor):
+    """ The child inductor that learns the Hoeffding tree (the incremental decision tree) - instead of training the tree
+     again on the whole history, it updates the tree with the records of the situations that changed since
+     the previous training (the previous record is forgotten and the new one is learnt, so the training costs
+     O(depth) per changed situation): each of them is passed from the root to its leaf and the leaf is split once
+     its best feature's information gain
+     exceeds the Hoeffding bound (with the confidence of 1 - 'HOEFFDING_DELTA', as in the Extremely Fast Decision
+     Tree); the leaves keep their records, so the children of the split start with their exact statistics and
+     the records that are no longer in the dataset (e.g. the ones with the fixed actions) are forgotten exactly;
+     the rules are written again only for the subtrees that changed; since the splits are never revisited and
+     the bound holds back the splits on the few records, the tree is grown greedily from all the records (like
+     the batch-trained trees) at the first training and after every 'rebuild_period' trainings """
+    # the features in the order of the dataset's columns ('hasAge' is the only numerical one)
+    features = ["hadUser", "hasPersonality", "hasGender", "hasAge", "hadMood", "wasWeather", "wasTime"]
+    # the features describing the situation's user (the rules refer to them through the variable '?u')
+    user_features = ["hasPersonality", "hasGender", "hasAge"]
+    incremental = True
+    # the records are kept by the situations' names (the tree is built again from the dataset)
+    dataset_with_ids = True
+
+    def __init__(self, onto, rebuild_period=HOEFFDING_REBUILD_PERIOD):
+        super().__init__(onto)
+        self.rebuild_period = rebuild_period  # number of the trainings after which the tree is built again
+        self.trainings_count = 0  # number of the trainings so far
+        self.learnt_records = dict()  # situation's name -> its record learnt by the tree
+        # situation's name -> its record changed since the previous training (None if the situation left the dataset);
+        # None - the changes are not known, so the tree is built again at the next training
+        self.changed_records = None
+        # the changes of the records found by the last update of the dataset (None - the whole history was parsed)
+        self.dataset_changes = None
+        self.skipped_situations = set()  # names of the situations left out of the last dataset
+        self.rewritten_leaves_num = 0  # number of the leaves whose rules were written at the last parsing
+
+    def reset(self):
+        """ Resetting the inductor (the tree is built again at the next training) """
+        super().reset()
+        self.trainings_count = 0
+        self.learnt_records = dict()
+        self.changed_records = None
+        self.dataset_changes = None
+        self.skipped_situations = set()
+
+    def get_dataset(self, dataset_csv=None, skipped_situations=(), changed_situations=None):
+        """ Getting the dataset (see the parent's method) and finding the records changed by the update - the records
+         of the changed situations and of the ones whose leaving out of the dataset has changed are read from
+         the history store (the tree learns them at the next training) """
+        full_parse = self.history is None or changed_situations is None
+        super().get_dataset(dataset_csv, skipped_situations, changed_situations)
+        skipped_situations = set(skipped_situations)
+        if full_parse:
+            self.dataset_changes = None
+        else:
+            names = {s.name for s in changed_situations} | self.skipped_situations | skipped_situations
+            self.dataset_changes = {n: self.history.get_record(n, self.features + ["takenAction"])
+                                    if n not in skipped_situations else None for n in names}
+        self.skipped_situations = skipped_situations
+        self.merge_changed_records(self.dataset_changes)
+
+    def merge_changed_records(self, changed_records):
+        """ Adding the records changed since the previous training (situation's name -> its record, None if
+         the situation left the dataset; None - the changes are not known, so the tree is built again) """
+        if changed_records is None or self.changed_records is None:
+            self.changed_records = None
+        else:
+            self.changed_records.update(changed_records)
+
+    @staticmethod
+    def _get_entropy(counts):
+        """ Entropy of the actions' distribution """
+        total = sum(counts)
+        return -sum(c / total * math.log2(c / total) for c in counts if c > 0) if total > 0 else 0.0
+
+    def _get_split_gain(self, leaf, feature):
+        """ The best information gain of the binary split of the leaf's records by the feature (index); returns
+         the gain and the feature's value (or the age's threshold) of the split """
+        values_counts = leaf.features_counts.get(feature, dict())
+        records_num = leaf.get_records_num()
+        entropy = self._get_entropy(leaf.class_counts.values())
+        best_gain, best_value = 0.0, None
+        # the records with the value and the other ones (or the ones with the ages up to the threshold and the ones
+        # above it, for the thresholds between the consecutive ages)
+        if self.features[feature] == "hasAge":
+            splits = []
+            lower_counts = Counter()
+            for age in sorted(values_counts)[:-1]:
+                lower_counts.update(values_counts[age])
+                splits.append((int(age), lower_counts.copy()))
+        else:
+            splits = list(values_counts.items()) if len(values_counts) > 1 else []
+        for value, value_counts in splits:
+            value_num = sum(value_counts.values())
+            gain = entropy - value_num / records_num * self._get_entropy(value_counts.values()) - \
+                (records_num - value_num) / records_num * self._get_entropy((leaf.class_counts - value_counts).values())
+            if gain > best_gain:
+                best_gain, best_value = gain, value
+        return best_gain, best_value
+
+    def _create_node(self, conditions):
+        """ Node of the tree with the given conditions """
+        negated_features = list(dict.fromkeys(self.features.index(f) for f, comparison, _ in conditions
+                                              if comparison == "!="))
+        return _HoeffdingNode(conditions, negated_features)
+
+    def _get_leaf_features(self, leaf):
+        """ Indexes of the features the leaf can still be split on (the categorical ones whose values are not set by
+         its conditions and 'hasAge') """
+        used_features = {f for f, comparison, _ in leaf.conditions if comparison == "=="}
+        return [i for i, f in enumerate(self.features) if f not in used_features]
+
+    def _add_to_leaf(self, leaf, record, count):
+        """ Adding the record to the leaf (or removing it) and splitting the leaf if it has enough new records;
+         returns True if the leaf was split """
+        leaf.update(record, count, self._get_leaf_features(leaf))
+        if leaf.get_records_num() - leaf.checked_records_num >= HOEFFDING_GRACE_PERIOD:
+            return self._attempt_split(leaf)
+        return False
+
+    def _attempt_split(self, leaf, bounded=True):
+        """ Splitting the leaf if its best feature's information gain exceeds the Hoeffding bound (or, if not
+         'bounded', if the gain is positive - the greedy split of the batch-trained trees); the leaf's records are
+         passed to its children (which are split as well, if they have enough records); returns True if the leaf was
+         split """
+        records_num = leaf.get_records_num()
+        leaf.checked_records_num = records_num
+        if len(leaf.class_counts) < 2:
+            return False
+        gain, value, feature = max((self._get_split_gain(leaf, f) + (f,) for f in self._get_leaf_features(leaf)),
+                                   key=lambda k: k[0])
+        # the range of the information gain is log2 of the number of the actions
+        bound = math.sqrt(math.log2(len(leaf.class_counts)) ** 2 * math.log(1 / HOEFFDING_DELTA) / (2 * records_num)) \
+            if bounded else 0.0
+        if gain <= bound:
+            return False
+        leaf.split_feature = feature
+        leaf.split_value = value
+        feature_name = self.features[feature]
+        if feature_name == "hasAge":
+            leaf.children = {False: self._create_node(leaf.conditions + [(feature_name, "<=", value)]),
+                             True: self._create_node(leaf.conditions + [(feature_name, ">", value)])}
+        else:
+            leaf.children = {False: self._create_node(leaf.conditions + [(feature_name, "!=", value)]),
+                             True: self._create_node(leaf.conditions + [(feature_name, "==", value)])}
+        for record, count in leaf.records.items():
+            child = leaf.get_child(record, feature_name == "hasAge")
+            child.update(record, count, self._get_leaf_features(child))
+        for child in leaf.children.values():
+            if child.get_records_num() >= HOEFFDING_GRACE_PERIOD or not bounded:
+                self._attempt_split(child, bounded)
+        leaf.records = Counter()
+        leaf.class_counts = Counter()
+        leaf.negations_counts = Counter()
+        leaf.features_counts = dict()
+        return True
+
+    def _update_tree(self, record, count):
+        """ Passing the record from the root to its leaf and adding it to the leaf (or removing it, if the count is
+         negative); the nodes on the path are marked as changed if the leaf was split or its rules have changed - its
+         action or the combinations of its negated features' values (the first record with the combination is added
+         or the last one is removed) """
+        node = self.model
+        path = [node]
+        while node.split_feature is not None:
+            node = node.get_child(record, self.features[node.split_feature] == "hasAge")
+            path.append(node)
+        previous_action = node.get_action()
+        negations = node.get_negations(record)
+        had_negations = negations in node.negations_counts
+        split = self._add_to_leaf(node, record, count)
+        if split or node.changed or node.get_action() != previous_action or \
+                (negations in node.negations_counts) != had_negations:
+            for n in path:
+                n.changed = True
+
+    @traced("train_model")
+    def train_model(self):
+        """ Updating the Hoeffding tree with the changed records - the previous record of each changed situation is
+         forgotten and its new one is learnt (the tree is built from all the records of the dataset at the first
+         training, after every 'rebuild_period' trainings and if the changes are not known) """
+        super().train_model()
+        self.trainings_count += 1
+        if self.model is None or self.changed_records is None or \
+                (self.rebuild_period > 0 and self.trainings_count % self.rebuild_period == 0):
+            # the tree is grown greedily from all the records, like the batch-trained trees
+            print("Building the Hoeffding tree from all the records...")
+            with tracer.span("hoeffding.build"):
+                self.learnt_records = dict(zip(self.dataset["Id"], self.dataset[self.features + ["takenAction"]]
+                                               .itertuples(index=False, name=None)))
+                self.model = self._create_node([])
+                features = self._get_leaf_features(self.model)
+                for record, count in Counter(self.learnt_records.values()).items():
+                    self.model.update(record, count, features)
+                self._attempt_split(self.model, bounded=False)
+        else:
+            with tracer.span("hoeffding.update", records=len(self.changed_records)):
+                for name, record in self.changed_records.items():
+                    # the records read from the history store are labelled like the ones of the dataset
+                    if record is not None:
+                        record = record[:-1] + (self.action_labels.get(record[-1], record[-1]),)
+                    learnt_record = self.learnt_records.pop(name, None)
+                    if learnt_record == record:
+                        if record is not None:
+                            self.learnt_records[name] = record
+                        continue
+                    if learnt_record is not None:
+                        self._update_tree(learnt_record, -1)
+                    if record is not None:
+                        self._update_tree(record, 1)
+                        self.learnt_records[name] = record
+        self.changed_records = dict()
+
+    def _write_rules(self, leaf):
+        """ Inference rules (in the text form) for the leaf's conditions and action; the negated conditions are
+         replaced by the values the leaf's records have (one rule for each combination of them, like in the parsing of
+         scikit-learn's rules) and the conditions about the user's properties are skipped if the rule refers to
+         the specific user """
+        negated_features = [self.features[f] for f in leaf.negated_features]
+        rules_swrl = []
+        for values in leaf.negations_counts:
+            negations = dict(zip(negated_features, values))
+            conditions = [(f, "==", negations.pop(f)) if comparison == "!=" else (f, comparison, v)
+                          for f, comparison, v in leaf.conditions if comparison != "!=" or f in negations]
+            rules_swrl.append(self._write_rule(conditions, leaf.get_action()))
+        return rules_swrl
+
+    def _write_rule(self, conditions, action):
+        """ Inference rule (in the text form) for the conditions and the action """
+        specific_user = any(f == "hadUser" for f, _, _ in conditions)
+        body = ["Situation(?s)"]
+        for feature, comparison, value in conditions:
+            if feature in self.user_features:
+                if specific_user:
+                    continue
+                if "hadUser(?s, ?u)" not in body:
+                    body += ["User(?u)", "hadUser(?s, ?u)"]
+            if feature == "hasAge":
+                if "hasAge(?u, ?a)" not in body:
+                    body.append("hasAge(?u, ?a)")
+                body.append(f"lessThan(?a, {value + 1})" if comparison == "<=" else f"greaterThan(?a, {value})")
+            elif feature == "hasGender":
+                body.append(f"hasGender(?u, {'true' if value == 'female' else 'false'})")
+            else:
+                body.append(f"{feature}({'?u' if feature in self.user_features else '?s'}, {value})")
+        return ", ".join(body) + f" -> takenAction(?s, {action})"
+
+    def _get_subtree_rules(self, node):
+        """ Inference rules of the subtree (the ones of the unchanged subtrees are not written again) """
+        if node.changed:
+            if node.split_feature is None:
+                node.rules_swrl = self._write_rules(node)
+                self.rewritten_leaves_num += 1
+            else:
+                node.rules_swrl = [r for c in node.children.values() for r in self._get_subtree_rules(c)]
+            node.changed = False
+        return node.rules_swrl
+
+    @traced("get_swrl_rules")
+    def get_swrl_rules(self):
+        """ Parsing the Hoeffding tree's leaves to inference rules; returns the list of the rules (in the text form),
+         without putting them in the ontology """
+        self.rewritten_leaves_num = 0
+        rules_swrl = list(dict.fromkeys(self._get_subtree_rules(self.model)))
+        print(f"Rules written again for the changed leaves: {self.rewritten_leaves_num}")
+        return rules_swrl
+
+    def _get_leaves(self, node):
+        """ Leaves of the subtree """
+        if node.split_feature is None:
+            return [node]
+        return [l for c in node.children.values() for l in self._get_leaves(c)]
+
+    @traced("verify_learnt_records")
+    def verify_learnt_records(self):
+        """ Comparing the records learnt by the tree (e.g. the ones updated only with the changed records) with
+         the records of the dataset and of the tree's leaves; returns True if they are the same """
+        dataset_records = dict(zip(self.dataset["Id"], self.dataset[self.features + ["takenAction"]]
+                                   .itertuples(index=False, name=None)))
+        leaves_records = Counter()
+        for l in self._get_leaves(self.model):
+            leaves_records.update(l.records)
+        return self.learnt_records == dataset_records and leaves_records == Counter(self.learnt_records.values())
+
+    @traced("verify_rules")
+    def verify_rules(self, rules_swrl):
+        """ Comparing the rules (e.g. the ones written again only for the changed leaves) with the rules written for
+         all the leaves of the tree; returns True if they are the same """
+        return set(rules_swrl) == {r for l in self._get_leaves(self.model) for r in self._write_rules(l)}
+
+
+# inductors available for the system, keyed by 'rules_inductor_type' (their backends are imported only for the training)
+RULES_INDUCTORS = {"sklearn": RulesInductorSklearn, "chefboost": RulesInductorChefboost,
+                   "hoeffding": RulesInductorHoeffding}
+
+
+def register_rules_inductor(rules_inductor_type, rules_inductor_class):
+    """ Making the new inductor available for the system under the given type """
+    RULES_INDUCTORS[rules_inductor_type] = rules_inductor_class
+
+
+def get_rules_inductor_class(rules_inductor_type):
+    """ Getting the class of the inductor registered under the given type """
+    if rules_inductor_type not in RULES_INDUCTORS:
+        raise ValueError(f"Unrecognized Rules Inductor's name: '{rules_inductor_type}'; "
+                         f"Accepted values: {list(RULES_INDUCTORS)}")
+    return RULES_INDUCTORS[rules_inductor_type]
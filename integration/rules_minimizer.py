@@ -0,0 +1,187 @@
+from owlready2 import *
+import re
+
+
+# atoms of the rule (predicate and its arguments)
+ATOM_PATTERN = re.compile(r"(\w+)\(([^()]*)\)")
+# variables of the situation, its user and the user's age (as used by the inductors)
+SITUATION_VARIABLE = "?s"
+USER_VARIABLE = "?u"
+AGE_VARIABLE = "?a"
+# atoms binding the variables - they do not constrain the situation by themselves
+STRUCTURAL_ATOMS = ["Situation(?s)", "User(?u)", "hadUser(?s, ?u)", "hasAge(?u, ?a)"]
+# comparisons of the built-ins with the constant - (lower bound's shift, upper bound's shift) of the exclusive interval
+# of the age, e.g. 'lessThanOrEqual(?a, 30)' is the same as 'lessThan(?a, 31)' (the ages are integers)
+AGE_COMPARISONS = {"lessThan": (None, 0), "lessThanOrEqual": (None, 1),
+                   "greaterThan": (0, None), "greaterThanOrEqual": (-1, None)}
+# order of the properties in the canonical rules (the other ones go after them, by the name)
+PROPERTIES_ORDER = ["hadUser", "hadMood", "wasWeather", "wasTime", "hasPersonality", "hasGender"]
+# interval of the age that does not constrain it
+UNBOUNDED = (float("-inf"), float("inf"))
+
+
+class RulesMinimizer:
+    """ Stage between the induction and putting the rules in the ontology, which shrinks the set of the inference
+     rules (in the text form) without changing the actions they infer: the rules' bodies are put in the canonical form
+     (so the repeated rules are found by their hashes), the rules subsumed by the more general ones with the same head
+     are dropped and the sibling rules that differ only in the value of one functional property are merged, if
+     together they cover all the values the ontology allows (all the individuals of the property's range or both
+     genders) - the property is then left out of the merged rule; the sibling rules with the adjacent intervals of
+     the user's age are merged as well; the rules of other forms are kept as they are """
+    def __init__(self, onto):
+        self.onto = onto  # the ontology the rules are meant for
+        self.values_cache = dict()  # property's name -> all its values (None if they are not known)
+        self.induced_rules_num = 0  # number of the rules given to the last minimization
+        self.minimized_rules_num = 0  # number of the rules left after the last minimization
+
+    def _is_functional(self, predicate):
+        """ Checking if the predicate is the functional property of the ontology """
+        prop = self.onto[predicate]
+        return isinstance(prop, PropertyClass) and FunctionalProperty in prop.is_a
+
+    def _get_values(self, predicate):
+        """ All the values the property can take, as they are written in the rules (None if they are not known) """
+        if predicate not in self.values_cache:
+            prop = self.onto[predicate]
+            values = None
+            if len(prop.range) == 1:
+                if prop.range[0] is bool:
+                    values = frozenset(["true", "false"])
+                elif isinstance(prop.range[0], ThingClass):
+                    values = frozenset(i.name for i in prop.range[0].instances())
+            self.values_cache[predicate] = values
+        return self.values_cache[predicate]
+
+    def _parse_rule(self, rule_swrl):
+        """ Splitting the rule into its head, the set of its conditions - (variable, functional property, value) -
+         and the interval of the user's age (exclusive bounds); returns None if the rule has other elements and False
+         if the rule can never be applied (e.g. it requires two different moods) """
+        body, _, head = rule_swrl.partition(" -> ")
+        atoms = ATOM_PATTERN.findall(body)
+        if ", ".join(f"{p}({a})" for p, a in atoms) != body or ATOM_PATTERN.fullmatch(head) is None:
+            return None
+        conditions = dict()  # (variable, property) -> value
+        lower, upper = UNBOUNDED
+        for predicate, args in atoms:
+            if f"{predicate}({args})" in STRUCTURAL_ATOMS:
+                continue
+            args = args.split(", ")
+            if len(args) != 2:
+                return None
+            # the comparisons of the age
+            if predicate in AGE_COMPARISONS and args[0] == AGE_VARIABLE and re.fullmatch(r"-?\d+", args[1]):
+                lower_shift, upper_shift = AGE_COMPARISONS[predicate]
+                if lower_shift is not None:
+                    lower = max(lower, int(args[1]) + lower_shift)
+                else:
+                    upper = min(upper, int(args[1]) + upper_shift)
+            # the values of the situation's and the user's functional properties
+            elif args[0] in [SITUATION_VARIABLE, USER_VARIABLE] and not args[1].startswith("?") and \
+                    self._is_functional(predicate):
+                if conditions.setdefault((args[0], predicate), args[1]) != args[1]:
+                    return False
+            else:
+                return None
+        # no integer age fits the interval
+        if upper - lower <= 1:
+            return False
+        return head, frozenset((v, p, value) for (v, p), value in conditions.items()), (lower, upper)
+
+    @staticmethod
+    def _subsumes(general_rule, rule):
+        """ Checking if the general rule is applied to every situation the other rule is applied to (with the same
+         head) """
+        return general_rule[0] == rule[0] and general_rule[1] <= rule[1] and \
+            general_rule[2][0] <= rule[2][0] and general_rule[2][1] >= rule[2][1]
+
+    def _remove_subsumed(self, rules):
+        """ Dropping the rules subsumed by the other ones """
+        heads_rules = dict()  # head -> its rules
+        for r in rules:
+            heads_rules.setdefault(r[0], []).append(r)
+        kept_rules = set()
+        for head_rules in heads_rules.values():
+            # only the rules with fewer (or as many) conditions can subsume the rule
+            head_rules.sort(key=lambda k: len(k[1]))
+            for r in head_rules:
+                if not any(g is not r and self._subsumes(g, r) for g in head_rules
+                           if len(g[1]) <= len(r[1])):
+                    kept_rules.add(r)
+        return kept_rules
+
+    def _merge_siblings(self, rules):
+        """ Rules made by merging the sibling rules (the ones that differ only in the value of one property or only in
+         the interval of the age) """
+        merged_rules = set()
+        # the values of the property the siblings differ in, by the rest of their elements
+        siblings = dict()
+        for head, conditions, interval in rules:
+            for c in conditions:
+                siblings.setdefault((head, conditions - {c}, interval, c[1]), set()).add(c[2])
+        for (head, other_conditions, interval, predicate), values in siblings.items():
+            all_values = self._get_values(predicate)
+            if all_values is not None and values >= all_values:
+                merged_rules.add((head, other_conditions, interval))
+        # the intervals of the age, by the rest of the siblings' elements
+        intervals = dict()
+        for head, conditions, interval in rules:
+            intervals.setdefault((head, conditions), []).append(interval)
+        for (head, conditions), head_intervals in intervals.items():
+            head_intervals.sort()
+            lower, upper = head_intervals[0]
+            for next_lower, next_upper in head_intervals[1:]:
+                # the intervals overlap or no integer age lies between them
+                if next_lower < upper:
+                    upper = max(upper, next_upper)
+                else:
+                    merged_rules.add((head, conditions, (lower, upper)))
+                    lower, upper = next_lower, next_upper
+            merged_rules.add((head, conditions, (lower, upper)))
+        return merged_rules
+
+    @staticmethod
+    def _write_rule(rule):
+        """ Canonical text form of the rule (the user's atoms are added only if they are needed) """
+        head, conditions, (lower, upper) = rule
+
+        def sort_key(c):
+            """ Position of the condition in the rule's body """
+            return (PROPERTIES_ORDER.index(c[1]) if c[1] in PROPERTIES_ORDER else len(PROPERTIES_ORDER)), c[1], c[2]
+
+        atoms = ["Situation(?s)"] + [f"{p}({v}, {value})" for v, p, value in sorted(conditions, key=sort_key)
+                                     if v == SITUATION_VARIABLE]
+        user_atoms = [f"{p}({v}, {value})" for v, p, value in sorted(conditions, key=sort_key) if v == USER_VARIABLE]
+        if (lower, upper) != UNBOUNDED:
+            user_atoms.append("hasAge(?u, ?a)")
+            if lower != UNBOUNDED[0]:
+                user_atoms.append(f"greaterThan(?a, {lower})")
+            if upper != UNBOUNDED[1]:
+                user_atoms.append(f"lessThan(?a, {upper})")
+        if len(user_atoms) > 0:
+            atoms += ["User(?u)", "hadUser(?s, ?u)"] + user_atoms
+        return ", ".join(atoms) + " -> " + head
+
+    def minimize(self, rules_swrl):
+        """ Minimizing the set of the inference rules (in the text form); returns the list of the rules left """
+        # the values of the properties are read again, since the ontology might have changed
+        self.values_cache = dict()
+        rules = set()  # the parsed rules (without repeats)
+        other_rules = dict()  # the rules that cannot be parsed (kept in the order they were given in)
+        for rule_swrl in rules_swrl:
+            rule = self._parse_rule(rule_swrl)
+            if rule is None:
+                other_rules[rule_swrl] = None
+            elif rule is not False:
+                rules.add(rule)
+        rules = self._remove_subsumed(rules)
+        # merging the siblings until no new rule (not subsumed by the ones already found) can be made
+        while True:
+            merged_rules = {m for m in self._merge_siblings(rules)
+                            if not any(self._subsumes(r, m) for r in rules)}
+            if len(merged_rules) == 0:
+                break
+            rules = self._remove_subsumed(rules | merged_rules)
+        minimized_rules = sorted(self._write_rule(r) for r in rules) + list(other_rules)
+        self.induced_rules_num = len(rules_swrl)
+        self.minimized_rules_num = len(minimized_rules)
+        return minimized_rules
@@ -0,0 +1,97 @@
+from .reasoner_worker import ReasonerWorker
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ShardedReasoner:
+    """ World of the situations partitioned by their users into the shards - separate worlds, each one kept by its own
+     reasoner worker (see 'ReasonerWorker'); the TBox, the inference rules and the individuals they refer to are
+     replicated in all of them, while the situations of the user (the previous ones and the new ones) are kept only in
+     the user's shard, so each reasoning processes the history of the shard's users instead of the whole one;
+     the shards reason at the same time (on separate cores, if there are free ones) and the main ontology still holds
+     the merged history used for the learning """
+    def __init__(self, onto, index, reasoner_type, shards_num):
+        self.onto = onto  # the ontology with the whole knowledge
+        self.index = index  # indexes over the ontology's individuals (used to find the previous situations of the user)
+        self.shards = [ReasonerWorker(onto, reasoner_type) for _ in range(shards_num)]  # workers of the shards
+        # threads waiting for the workers (the main ontology is used only by the calling thread)
+        self.executor = ThreadPoolExecutor(max_workers=shards_num)
+        self.users_shards = dict()  # user's IRI -> index of the user's shard
+        self.shards_users = [[] for _ in range(shards_num)]  # users assigned to each shard
+        # number of each worker's restarts the shard's history was sent after (the restarted worker starts without it)
+        self.shards_restarts = [0] * shards_num
+        self.shards_situations_count = [0] * shards_num  # number of the situations reasoned about in each shard
+
+    @property
+    def worker_time(self):
+        """ Total time spent waiting for the shards' workers """
+        return sum(s.worker_time for s in self.shards)
+
+    @property
+    def restarts_count(self):
+        """ Number of the shards' workers restarts after the crashes """
+        return sum(s.restarts_count for s in self.shards)
+
+    def _get_shard_id(self, user):
+        """ Index of the shard responsible for the user (the new user is assigned to the shard with the fewest users) """
+        if user.iri not in self.users_shards:
+            shard_id = min(range(len(self.shards)), key=lambda i: len(self.shards_users[i]))
+            self.users_shards[user.iri] = shard_id
+            self.shards_users[shard_id].append(user)
+        return self.users_shards[user.iri]
+
+    def _describe_history(self, users, skipped_situations):
+        """ Descriptions of the previous situations of the users (without their actions), except for the skipped ones """
+        skipped_names = {s.name for s in skipped_situations}
+        situations = [s for u in users for s in self.index.get_user_situations(u) if s.name not in skipped_names]
+        return ReasonerWorker.describe_situations(situations)[1] if len(situations) > 0 else []
+
+    @staticmethod
+    def _classify_in_shard(shard, history_descriptions, situations_iris, descriptions):
+        """ Sending the missing history to the shard's worker and reasoning over the shard with the new situations (they
+         are kept in the shard afterwards) """
+        if len(history_descriptions) > 0:
+            shard.add_described(history_descriptions)
+        return shard.classify_described(situations_iris, descriptions, keep_situations=True)
+
+    def sync_rules(self, rules):
+        """ Sending the current inference rules to all the shards at once (they are described only once) """
+        rules = list(rules)
+        rules_texts, descriptions = ReasonerWorker.describe_rules(rules)
+        futures = [self.executor.submit(s.sync_described_rules, rules, rules_texts, descriptions) for s in self.shards]
+        for f in futures:
+            f.result()
+
+    def classify(self, situations, sync_reasoner=None):
+        """ Routing the situations to the shards of their users and reasoning over the shards at the same time (the
+         previous situations of the users new to the shard are sent with them); returns the lists of actions inferred
+         for each situation (as the individuals of the main ontology) """
+        shards_situations = dict()  # shard's index -> indexes of its situations
+        shards_new_users = dict()  # shard's index -> users assigned to it now
+        for i, s in enumerate(situations):
+            if s.hadUser.iri not in self.users_shards:
+                shards_new_users.setdefault(self._get_shard_id(s.hadUser), []).append(s.hadUser)
+            shards_situations.setdefault(self._get_shard_id(s.hadUser), []).append(i)
+        futures = dict()
+        for shard_id, situations_ids in shards_situations.items():
+            shard = self.shards[shard_id]
+            shard_situations = [situations[i] for i in situations_ids]
+            # the whole history of the shard is sent again after its worker's restart
+            if shard.restarts_count != self.shards_restarts[shard_id]:
+                self.shards_restarts[shard_id] = shard.restarts_count
+                history_descriptions = self._describe_history(self.shards_users[shard_id], shard_situations)
+            else:
+                history_descriptions = self._describe_history(shards_new_users.get(shard_id, []), shard_situations)
+            self.shards_situations_count[shard_id] += len(situations_ids)
+            futures[shard_id] = self.executor.submit(self._classify_in_shard, shard, history_descriptions,
+                                                     *ReasonerWorker.describe_situations(shard_situations))
+        inferred_actions = [None] * len(situations)
+        for shard_id, situations_ids in shards_situations.items():
+            for i, actions in zip(situations_ids, futures[shard_id].result()):
+                inferred_actions[i] = [self.onto.world[a] for a in actions]
+        return inferred_actions
+
+    def stop(self):
+        """ Stopping the workers of all the shards """
+        for s in self.shards:
+            s.stop()
+        self.executor.shutdown(wait=True)
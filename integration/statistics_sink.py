@@ -0,0 +1,102 @@
+import json
+import os
+import queue
+import threading
+from time import monotonic
+
+
+def _to_json_value(value):
+    """ Converting the NumPy scalars (e.g. the results of the computations on the arrays) to the Python ones """
+    return value.item()
+
+
+class StatisticsSink:
+    """ Append-only stream of the statistics' events, saved to the file as JSON lines (one event per line);
+     the events are buffered and written by the background thread (flushed every 'flush_interval' seconds), so
+     the system keeps in memory only the last values and the totals of the statistics """
+    def __init__(self, file_path, flush_interval=1.0):
+        self.file_path = file_path  # path to the file with the events
+        self.flush_interval = flush_interval  # maximum time (in seconds) the events wait in the buffer
+        self.queue = queue.Queue()  # events waiting for the writer
+        self.last_values = dict()  # last values of the statistics (for each type of the events)
+        self.totals = dict()  # sums of the statistics (for each type of the events)
+        self.counts = dict()  # number of the recorded events (for each type of the events)
+        # each analysis starts with the new stream
+        open(self.file_path, 'w').close()
+        self.writer = threading.Thread(target=self._write_events, daemon=True)
+        self.writer.start()
+
+    def record(self, event_type, **values):
+        """ Recording the event of the given type (e.g. 'observation', 'learning') with the values of the statistics """
+        last_values = self.last_values.setdefault(event_type, dict())
+        totals = self.totals.setdefault(event_type, dict())
+        for k, v in values.items():
+            last_values[k] = v
+            totals[k] = totals.get(k, 0) + v
+        self.counts[event_type] = self.counts.get(event_type, 0) + 1
+        self.queue.put({"type": event_type, **values})
+
+    def get_last(self, event_type, stat_name, default=0):
+        """ Last recorded value of the statistic """
+        return self.last_values.get(event_type, dict()).get(stat_name, default)
+
+    def get_total(self, event_type, stat_name):
+        """ Sum of all the recorded values of the statistic """
+        return self.totals.get(event_type, dict()).get(stat_name, 0)
+
+    def get_count(self, event_type):
+        """ Number of the recorded events of the given type """
+        return self.counts.get(event_type, 0)
+
+    def _write_events(self):
+        """ Loop of the writer - the events gathered during the flush interval are appended to the file at once """
+        with open(self.file_path, 'a') as f:
+            closing = False
+            while not closing:
+                lines = []
+                deadline = monotonic() + self.flush_interval
+                while True:
+                    timeout = deadline - monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        event = self.queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    # 'None' closes the stream
+                    if event is None:
+                        closing = True
+                        break
+                    lines.append(json.dumps(event, default=_to_json_value) + "\n")
+                if len(lines) > 0:
+                    f.writelines(lines)
+                    f.flush()
+
+    def close(self):
+        """ Writing the remaining events and stopping the writer """
+        self.queue.put(None)
+        self.writer.join()
+
+
+class StatisticsReader:
+    """ Reader following the stream of the statistics' events (like 'tail -f') - each reading returns only the events
+     written since the previous one """
+    def __init__(self, file_path):
+        self.file_path = file_path  # path to the file with the events
+        self.offset = 0  # position in the file after the last read event
+        self.restarts_count = 0  # number of times the stream was started again (and read from the beginning)
+
+    def read_new(self):
+        """ Reading the new events (the line that is still being written is left for the next reading) """
+        if not os.path.exists(self.file_path):
+            return []
+        with open(self.file_path, 'rb') as f:
+            # the stream was started again (the new analysis)
+            if os.fstat(f.fileno()).st_size < self.offset:
+                self.offset = 0
+                self.restarts_count += 1
+            f.seek(self.offset)
+            data = f.read()
+        complete_length = data.rfind(b"\n") + 1
+        self.offset += complete_length
+        return [json.loads(line) for line in data[:complete_length].splitlines() if line]
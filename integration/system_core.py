@@ -1,41 +1,70 @@
-from .rules_induction import RulesInductorSklearn, RulesInductorChefboost
+from .rules_induction import get_rules_inductor_class
+from .feedback_oracles import InteractiveFeedbackOracle
+from .rules_engine import CompiledRulesEngine
+from .rules_minimizer import RulesMinimizer
+from .reasoning_module import ReasoningModule
+from .reasoner_worker import ReasonerWorker
+from .sharded_reasoner import ShardedReasoner
+from .ontology_index import OntologyIndex
+from .classification_cache import ClassificationCache
+from .background_retrainer import BackgroundRetrainer
+from .retraining_scheduler import RetrainingScheduler
+from .statistics_sink import StatisticsSink
+from .tracing import tracer, traced
 from owlready2 import *
 import os
 import json
-import pandas as pd
 from time import time, process_time
 import numpy as np
-from chefboost import Chefboost as chef
 
 
 ONTO = "jp_masters_project.owl"
 DEFAULT_LEARNING_ALGORITHM = "sklearn"
 DEFAULT_REASONER = "pellet"
+DEFAULT_RULES_ENGINE_MODE = "off"
+DEFAULT_REASONING_SCOPE = "world"
+DEFAULT_CACHE_SIZE = 0
 KNOWLEDGE_FOLDER = "knowledge_folder"
 RESULTS_FOLDER = "results"
 DEFAULT_DATASET = "actions_taken.csv"
-DEFAULT_RESULTS_FILE = "analysis_results.json"
+DEFAULT_RESULTS_FILE = "analysis_results.jsonl"
+DEFAULT_DECISIONS_FILE = "retraining_decisions.json"
+DEFAULT_TRACE_FILE = "trace.json"
 
 
 class ReasoningAndLearningSystemPrototype:
     """ The representation of the system's main core """
-    def __init__(self, ask_rate=0.1):
+    def __init__(self, ask_rate=0.1, feedback_oracle=None, retraining_scheduler=None):
         self.onto = None  # the ontology representing the main knowledge
+        self.quadstore = None  # path to the SQLite quadstore keeping the ontology (None - the ontology is in memory)
+        self.index = None  # in-memory indexes over the ontology's individuals (situations, actions)
         self.rules_inductor = None  # chosen inductor responsible for machine learning process
         self.sync_reasoner = None  # function, activating the chosen reasoner
+        self.rules_engine = None  # in-process engine evaluating the compiled inference rules (fast path)
+        self.rules_minimizer = None  # stage shrinking the set of the new inference rules (None - they are used as induced)
+        self.rules_engine_mode = DEFAULT_RULES_ENGINE_MODE  # the way the rules engine is used
+        # module of the ontology, used to reason only about the new situation (or the world divided into the users' shards)
+        self.reasoning_module = None
+        self.classification_cache = None  # cache of the reasoning's results for the situations' features
+        self.background_retrainer = None  # worker process training the new inference rules in the background
+        self.rules_generation = 0  # number of the rule sets put in the ontology so far
         self.ask_rate = ask_rate  # probability of activating the 'ask the user' procedure
         self.rng = None  # random number generator for the system
         self.backup_memory = dict()  # backup memory with saved classification results
-        # set of statistics measured during the analysis
-        self.statistics = {
-            "satisfaction_growth": [0],
-            "reasoning_count_growth": [0],
-            "learning_count_growth": [0],
-            "asking_count_growth": [0],
-            "exec_time": [0],
-            "rules_num": [0],
-            "average_rule_body_length": [0]
-        }
+        self.pending_situations = []  # situations added to the ontology that are still waiting for the classification
+        self.pending_stale = False  # whether or not the reasoning results of the pending situations are outdated
+        # situations whose records in the dataset need to be parsed again at the next learning (name -> situation)
+        self.changed_situations = dict()
+        # situations whose actions are not confirmed by the feedback yet (the other observations may be classified in
+        # the meantime, e.g. by the classification service), so they are left out of the learning (name -> situation)
+        self.unconfirmed_situations = dict()
+        self.dataset_verification = False  # whether or not the updated dataset is compared with the fully parsed one
+        # oracle answering the system's questions (by default - the actual user, via the standard input)
+        self.feedback_oracle = feedback_oracle if feedback_oracle is not None else InteractiveFeedbackOracle()
+        # scheduler deciding when the inference rules are retrained (by default - after every 10th situation)
+        self.retraining_scheduler = retraining_scheduler if retraining_scheduler is not None else RetrainingScheduler()
+        # stream of the statistics measured during the analysis (the events of the observations and the learnings)
+        self.statistics = None
 
     @staticmethod
     def action_roleplay(action_name):
@@ -78,21 +107,52 @@ class ReasoningAndLearningSystemPrototype:
             return f"'Opening the '{act_name}' playlist. Now playing...'"
 
     def load_components(self, onto_name, rules_inductor_type=DEFAULT_LEARNING_ALGORITHM, reasoner_type=DEFAULT_REASONER,
-                        random_state=None):
-        """ This method is used to load all the necessary components for the system """
+                        random_state=None, rules_engine_mode=DEFAULT_RULES_ENGINE_MODE,
+                        reasoning_scope=DEFAULT_REASONING_SCOPE, reasoner_worker=False, cache_size=DEFAULT_CACHE_SIZE,
+                        background_learning=False, tracing=False, quadstore=None, reasoning_shards=1,
+                        dataset_verification=False, rules_minimization=False):
+        """ This method is used to load all the necessary components for the system;
+         rules engine's modes: 'off' - only the reasoner is used, 'fast' - the compiled rules engine is used before
+         the reasoner (which is activated only if the engine cannot decide), 'verify' - both of them are used and
+         the engine's results are compared with the reasoner's ones;
+         reasoning scopes: 'world' - the reasoner works on the whole ontology, 'module' - the reasoner works only on
+         the module of the ontology, relevant to the new situation (the module and the Pellet reasoner's JVM can be kept
+         warm in the separate, long-lived process - 'reasoner_worker', so no JVM is launched for the reasoning);
+         cache size: maximum number of the reasoning's results remembered for the situations' features (0 - no cache);
+         background learning: the regular refresh of the inference rules is done in the separate process (the system
+         keeps using the previous rules until the new ones are ready);
+         tracing: the time of each phase of the system's work is recorded (and saved in the 'Chrome trace' format);
+         quadstore: name of the SQLite file keeping the ontology - it is created from the base ontology at the first
+         start and reopened (without parsing) at the next ones, each classified situation and change of the rules is
+         committed to it (None - the ontology is kept in memory and saved only with 'save_onto');
+         reasoning shards: number of the parts the world is divided into by the situations' users (only with
+         the 'world' reasoning scope and Pellet) - each shard keeps only its users' situations and has its own reasoner
+         worker, the new situation is reasoned about in its user's shard and the shards reason at the same time;
+         dataset verification: the dataset, updated at each learning only with the changed situations, is compared
+         with the one parsed from the whole history (and replaced by it if they differ), the incremental inductor's
+         tree is compared with the dataset - its learnt records (in the background worker too) and its rules, written
+         again only for the changed leaves (the tree is built again if they differ);
+         rules minimization: the repeated, subsumed and mergeable inference rules are removed before they are put in
+         the ontology (the actions they infer stay the same) """
         print(f"Welcome to the Reasoning And Learning System's Prototype!")
+        # starting the tracing of the system's phases
+        if tracing:
+            tracer.enable()
+        # starting the stream of the statistics
+        self.statistics = StatisticsSink(os.path.join(RESULTS_FOLDER, DEFAULT_RESULTS_FILE))
         # setting seed for 'local' random number generator
         self.rng = np.random.default_rng(random_state)
-        # loading base ontology
-        self.onto = get_ontology("file://" + os.path.join(KNOWLEDGE_FOLDER, onto_name)).load()
-        # setting the python learning method for the system
-        if rules_inductor_type == "sklearn":
-            self.rules_inductor = RulesInductorSklearn(self.onto)
-        elif rules_inductor_type == "chefboost":
-            self.rules_inductor = RulesInductorChefboost(self.onto)
+        # loading base ontology (or reopening the quadstore with the ontology)
+        if quadstore is not None:
+            self.onto = self._open_quadstore(onto_name, quadstore)
         else:
-            raise ValueError(f"Unrecognized Rules Inductor's name: '{rules_inductor_type}'; "
-                             f"Accepted values: ['sklearn', 'chefboost']")
+            self.onto = get_ontology("file://" + os.path.join(KNOWLEDGE_FOLDER, onto_name)).load()
+        # setting the python learning method for the system (its backend is imported only for the training)
+        self.rules_inductor = get_rules_inductor_class(rules_inductor_type)(self.onto)
+        self.rules_inductor.restore_swrl_rules()
+        self.dataset_verification = dataset_verification
+        if rules_minimization:
+            self.rules_minimizer = RulesMinimizer(self.onto)
         # setting the reasoner for the system
         if reasoner_type == "pellet":
             self.sync_reasoner = sync_reasoner_pellet
@@ -101,70 +161,343 @@ class ReasoningAndLearningSystemPrototype:
         else:
             raise ValueError(f"Unrecognized reasoner's name: '{reasoner_type}'; "
                              f"Accepted values: ['pellet', 'hermit']")
+        # setting the rules engine for the system
+        if rules_engine_mode in ["fast", "verify"]:
+            self.rules_engine = CompiledRulesEngine()
+            self.rules_engine.compile(self.onto.rules())
+        elif rules_engine_mode != "off":
+            raise ValueError(f"Unrecognized rules engine's mode: '{rules_engine_mode}'; "
+                             f"Accepted values: ['off', 'fast', 'verify']")
+        self.rules_engine_mode = rules_engine_mode
+        # indexing the ontology's individuals
+        self.index = OntologyIndex(self.onto)
+        # setting the scope of the reasoning
+        if reasoning_scope == "module":
+            if reasoning_shards > 1:
+                raise ValueError("Reasoning shards can be used only with the 'world' reasoning scope")
+            if reasoner_worker:
+                self.reasoning_module = ReasonerWorker(self.onto, reasoner_type)
+            else:
+                self.reasoning_module = ReasoningModule(self.onto)
+            self.reasoning_module.sync_rules(self.onto.rules())
+        elif reasoning_scope != "world":
+            raise ValueError(f"Unrecognized reasoning scope: '{reasoning_scope}'; "
+                             f"Accepted values: ['world', 'module']")
+        elif reasoner_worker:
+            raise ValueError("Reasoner worker can be used only with the 'module' reasoning scope")
+        elif reasoning_shards > 1:
+            # the world divided into the shards of the users, each one with its own reasoner worker
+            self.reasoning_module = ShardedReasoner(self.onto, self.index, reasoner_type, reasoning_shards)
+            self.reasoning_module.sync_rules(self.onto.rules())
+        # setting the cache of the reasoning's results
+        if cache_size > 0:
+            self.classification_cache = ClassificationCache(cache_size)
+        # setting the background learning
+        if background_learning:
+            self.background_retrainer = BackgroundRetrainer(os.path.join(KNOWLEDGE_FOLDER, onto_name),
+                                                            type(self.rules_inductor), dataset_verification)
         # saving the information about previous situations and their actions to the backup memory
-        for s in self.onto.Situation.instances():
+        for s in self.index.get_situations():
             self.backup_memory[s.name] = s.takenAction[0]
+            # situations with more than one action need to be fixed before the learning
+            if len(s.takenAction) > 1:
+                self.index.touch_situations([s])
         # system prints out the names of its major components
         print(f"Base Ontology: {self.onto.base_iri};\n"
               f"Reasoning engine: {reasoner_type.capitalize()};\n"
-              f"Learning method for python: {rules_inductor_type.capitalize()}.")
-        input("Press 'Enter' to proceed with the analysis...")
+              f"Learning method for python: {rules_inductor_type.capitalize()};\n"
+              f"Rules engine's mode: {rules_engine_mode.capitalize()};\n"
+              f"Reasoning scope: {reasoning_scope.capitalize()}{' (reasoner worker)' if reasoner_worker else ''}"
+              f"{f' ({reasoning_shards} shards by the users)' if reasoning_shards > 1 else ''};\n"
+              f"Classification cache's size: {cache_size};\n"
+              f"Background learning: {'On' if background_learning else 'Off'};\n"
+              f"Quadstore: {self.quadstore if self.quadstore is not None else 'Off'}.")
+        self.feedback_oracle.pause("Press 'Enter' to proceed with the analysis...")
         print()
 
+    def _open_quadstore(self, onto_name, quadstore):
+        """ Opening the SQLite quadstore with the ontology - the existing one is reopened without parsing (the situations
+         left unclassified by the interrupted analysis are removed), the new one is filled with the base ontology """
+        self.quadstore = os.path.join(KNOWLEDGE_FOLDER, quadstore)
+        store_exists = os.path.exists(self.quadstore)
+        default_world.set_backend(filename=self.quadstore)
+        if not store_exists:
+            print(f"Creating the quadstore '{self.quadstore}' from the base ontology...")
+            onto = get_ontology("file://" + os.path.join(KNOWLEDGE_FOLDER, onto_name)).load()
+            default_world.save()
+            return onto
+        print(f"Reopening the quadstore '{self.quadstore}'...")
+        # the stored ontology is the one describing the situations
+        onto = next((o for o in default_world.ontologies.values() if o.Situation is not None), None)
+        if onto is None:
+            raise ValueError(f"Quadstore '{self.quadstore}' does not contain the ontology with the situations")
+        unclassified = [s for s in onto.Situation.instances() if len(s.takenAction) == 0]
+        for s in unclassified:
+            destroy_entity(s)
+        if len(unclassified) > 0:
+            print(f"Removed the situations left unclassified: {len(unclassified)}")
+            default_world.save()
+        return onto
+
+    def _commit_changes(self):
+        """ Committing the changes of the ontology to the quadstore (if it is used) """
+        if self.quadstore is not None:
+            self.onto.world.save()
+
     def system_shutdown(self):
         """ System's behaviour during its shutdown """
         # printing out the final values of the statistics
+        stats = self.statistics
         print(f"Statistics for the analysis:\n"
-              f"Users' satisfaction: {self.statistics['satisfaction_growth'][-1] / (len(self.statistics['satisfaction_growth']) - 1)}\n"
-              f"Times reasoning process was executed: {self.statistics['reasoning_count_growth'][-1]}\n"
-              f"Times learning process was executed: {self.statistics['learning_count_growth'][-1]}\n"
-              f"Times system asked users to pick an option themselves: {self.statistics['asking_count_growth'][-1]}\n"
-              f"Average execution time: {sum(self.statistics['exec_time']) / (len(self.statistics['exec_time']) - 1)}\n"
-              f"Number of rules after the last learning process: {self.statistics['rules_num'][-1]}\n"
-              f"Average length of rules' bodies after the last learning process: {self.statistics['average_rule_body_length'][-1]}")
-        # saving results (measured statistics) to .json file
-        stat_file_dir = os.path.join(RESULTS_FOLDER, DEFAULT_RESULTS_FILE)
-        with open(stat_file_dir, 'w') as f:
-            json.dump(self.statistics, f, indent=4)
+              f"Users' satisfaction: {stats.get_last('observation', 'satisfaction_growth') / stats.get_count('observation')}\n"
+              f"Times reasoning process was executed: {stats.get_last('observation', 'reasoning_count_growth')}\n"
+              f"Times learning process was executed: {stats.get_last('observation', 'learning_count_growth')}\n"
+              f"Times system asked users to pick an option themselves: {stats.get_last('observation', 'asking_count_growth')}\n"
+              f"Average execution time: {stats.get_total('observation', 'exec_time') / stats.get_count('observation')}\n"
+              f"Times rules engine decided without the reasoner: {stats.get_last('observation', 'rules_engine_count_growth')}\n"
+              f"Times rules engine disagreed with the reasoner: {stats.get_last('observation', 'rules_engine_disagreements_growth')}\n"
+              f"Total time spent in the reasoner: {stats.get_total('observation', 'reasoner_time')}\n"
+              f"Classification cache's hits/misses/evictions: {stats.get_last('observation', 'cache_hits_growth')}/"
+              f"{stats.get_last('observation', 'cache_misses_growth')}/{stats.get_last('observation', 'cache_evictions_growth')}\n"
+              f"Number of rules after the last learning process: {stats.get_last('learning', 'rules_num')} "
+              f"(induced: {stats.get_last('learning', 'induced_rules_num')})\n"
+              f"Rules added/removed/kept by the learning processes: {stats.get_total('learning', 'rules_added')}/"
+              f"{stats.get_total('learning', 'rules_removed')}/{stats.get_total('learning', 'rules_kept')}\n"
+              f"Average length of rules' bodies after the last learning process: {stats.get_last('learning', 'average_rule_body_length')}")
+        # writing the remaining events of the statistics to .jsonl file
+        stats.close()
+        # saving the decisions of the retraining scheduler to .json file
+        print(f"Retrainings' decisions logged: {len(self.retraining_scheduler.decisions_log)} "
+              f"(CPU time of the retrainings: {self.retraining_scheduler.retrainings_cpu_time})")
+        with open(os.path.join(RESULTS_FOLDER, DEFAULT_DECISIONS_FILE), 'w') as f:
+            json.dump(self.retraining_scheduler.decisions_log, f, indent=4)
+        # saving the spans of the system's phases to .json file (in the 'Chrome trace' format)
+        if tracer.enabled:
+            print("Time spent in the system's phases (total time, number of spans):")
+            for name, (total_time, count) in tracer.get_summary().items():
+                print(f"{name}: {total_time:.3f}s, {count}")
+            tracer.export_chrome_trace(os.path.join(RESULTS_FOLDER, DEFAULT_TRACE_FILE))
+            tracer.disable()
+        # stopping the background learning
+        if self.background_retrainer is not None:
+            print(f"Retrainings finished in the background: {self.background_retrainer.retrainings_count} "
+                  f"(CPU time: {self.background_retrainer.worker_cpu_time})")
+            self.background_retrainer.stop()
+        # committing the last changes of the ontology
+        self._commit_changes()
+        # stopping the reasoner worker (or the workers of the shards)
+        if isinstance(self.reasoning_module, (ReasonerWorker, ShardedReasoner)):
+            print(f"Reasoner worker's restarts after the crashes: {self.reasoning_module.restarts_count}")
+            if isinstance(self.reasoning_module, ShardedReasoner):
+                print(f"Situations reasoned about in each shard: {self.reasoning_module.shards_situations_count}")
+            self.reasoning_module.stop()
         print("Shutting down the Reasoning And Learning System's Prototype! Thank you for your cooperation!...")
 
+    @traced("save_onto")
     def save_onto(self, save_name):
-        """ Saving the modified knowledge (ontology) to the given file """
+        """ Saving the modified knowledge (ontology) to the given file (with the quadstore, it is only an export) """
         save_path = os.path.join(KNOWLEDGE_FOLDER, save_name)
         self.onto.save(file=save_path)
 
-    def execute_reasoning(self):
-        """ Reasoning procedure """
+    @traced("execute_reasoning")
+    def execute_reasoning(self, new_sits):
+        """ Reasoning procedure about the given new situations (the reasoner is invoked once for all of them); returns
+         the list of information for each situation - whether or not the rules engine decided about the situation's
+         actions by itself, whether or not it agreed with the reasoner (None if there was no verification) and
+         the situation's share of the time spent in the reasoner (None instead if the actions were taken from the cache) """
         print("Reasoninng procedure initiated...")
-        with self.onto:
-            self.sync_reasoner(infer_property_values=True)
+        results = []  # (engine_decided, engine_agreed, reasoner_time) for each situation
+        engine_results = []  # (index, situation, actions from the rules engine) for the situations left for the reasoner
+        for i, new_sit in enumerate(new_sits):
+            # the actions inferred before for the situation with the same features (None if they are not cached)
+            cached_actions = self.classification_cache.get(new_sit) if self.classification_cache is not None else None
+            if cached_actions is not None:
+                for a in cached_actions:
+                    if a not in new_sit.takenAction:
+                        new_sit.takenAction.append(a)
+                results.append(None)
+                continue
+            # fast path - getting the actions from the compiled rules (None if the engine cannot decide)
+            engine_actions = None
+            if self.rules_engine is not None:
+                with tracer.span("rules_engine"):
+                    engine_actions = self.rules_engine.classify(new_sit)
+            if engine_actions is not None and self.rules_engine_mode == "fast":
+                for a in engine_actions:
+                    if a not in new_sit.takenAction:
+                        new_sit.takenAction.append(a)
+                results.append((True, None, 0.0))
+            else:
+                engine_results.append((i, new_sit, engine_actions))
+                results.append((False, None, 0.0))
+        self.index.touch_situations(new_sits)
+        if len(engine_results) > 0:
+            reasoned_sits = [r[1] for r in engine_results]
+            reasoner_time = time()
+            # reasoning over the module of the ontology or over the users' shards (the inferred actions are written back
+            # to the new situations)
+            if self.reasoning_module is not None:
+                scope = "shards" if isinstance(self.reasoning_module, ShardedReasoner) else "module"
+                with tracer.span("reasoner", scope=scope, situations=len(reasoned_sits)):
+                    inferred_actions_list = self.reasoning_module.classify(reasoned_sits, self.sync_reasoner)
+                for new_sit, inferred_actions in zip(reasoned_sits, inferred_actions_list):
+                    for a in inferred_actions:
+                        if a not in new_sit.takenAction:
+                            new_sit.takenAction.append(a)
+            else:
+                with tracer.span("reasoner", scope="world", situations=len(reasoned_sits)):
+                    with self.onto:
+                        self.sync_reasoner(infer_property_values=True)
+                # the reasoner could change the actions of any situation in the ontology
+                self.index.touch_situations()
+            reasoner_time = (time() - reasoner_time) / len(reasoned_sits)
+            # comparing the engine's results with the reasoner's ones
+            for i, new_sit, engine_actions in engine_results:
+                engine_agreed = None
+                if engine_actions is not None:
+                    engine_agreed = set(engine_actions) == set(new_sit.takenAction)
+                    if not engine_agreed:
+                        print(f"WARNING: Rules engine's result {[a.name for a in engine_actions]} differs from the "
+                              f"reasoner's one {[a.name for a in new_sit.takenAction]}!")
+                results[i] = (False, engine_agreed, reasoner_time)
+        # remembering the new results
+        if self.classification_cache is not None:
+            for new_sit, result in zip(new_sits, results):
+                if result is not None:
+                    self.classification_cache.put(new_sit, new_sit.takenAction)
         print("Reasoning process complete...")
         print()
+        return results
 
+    def _reset_pending_situations(self):
+        """ The actions of the situations waiting for the classification are not confirmed yet, so they are removed
+         before the rules change (these situations need to be reasoned about again, with the new rules) """
+        for s in self.pending_situations:
+            s.takenAction = []
+            self.changed_situations[s.name] = s
+            self.pending_stale = True
+
+    def _fix_history(self):
+        """ Setting 'main' results for the situations in case some of them got more than one action due to the reasoner
+         (only the situations touched by the reasoner since the last learning are checked) """
+        for s in self.index.pop_touched_situations():
+            if len(s.takenAction) > 1 and s.name in self.backup_memory:
+                s.takenAction = [self.backup_memory[s.name]]
+                self.changed_situations[s.name] = s
+            # the actions of the situations that are not classified yet come only from the reasoner
+            elif s.name not in self.backup_memory:
+                self.changed_situations[s.name] = s
+
+    def _update_dataset(self, skipped_situations=()):
+        """ Updating the inductor's dataset with the situations changed since the previous learning (the whole history
+         is parsed only at the first learning); the history is also saved to the .csv file, just to be safe """
+        self.rules_inductor.get_dataset(DEFAULT_DATASET, skipped_situations=skipped_situations,
+                                        changed_situations=list(self.changed_situations.values()))
+        self.changed_situations = dict()
+        if self.dataset_verification and not self.rules_inductor.verify_dataset(skipped_situations):
+            print("Warning! The updated dataset differs from the parsed history, parsing the whole history...")
+            self.rules_inductor.get_dataset(DEFAULT_DATASET, skipped_situations=skipped_situations)
+        # the incremental model in the worker learns the changes of every update, the ones learnt here too
+        if self.background_retrainer is not None and self.rules_inductor.incremental:
+            self.background_retrainer.add_changed_records(self.rules_inductor.dataset_changes)
+
+    @traced("learn_new_rules")
     def learn_new_rules(self):
         """ Learning procedure """
         print("Learning procedure initiated...")
-        # resetting the previous rules
-        if len(self.rules_inductor.inferred_rules_list) > 0:
-            print("Resetting the rules set...")
-            self.rules_inductor.reset()
-        # setting 'main' results for the situations in case some of them got more than one action due to the reasoner
-        for s in self.onto.Situation.instances():
-            if len(s.takenAction) > 1:
-                s.takenAction = [self.backup_memory[s.name]]
+        learning_cpu_time = process_time()
+        self._reset_pending_situations()
+        self._fix_history()
         print("Parsing the history knowledge to dataframe...")
-        self.rules_inductor.get_dataset()
+        self._update_dataset(skipped_situations=list(self.unconfirmed_situations))
         print("Training the new model...")
         self.rules_inductor.train_model()
         print("Establishing a new set of inference rules...")
-        self.rules_inductor.parse_to_swrl()
-        # saving statistics for the current learning process
-        rules_num, avg_rule_body_len = self.rules_inductor.get_rules_info()
-        self.statistics["rules_num"].append(rules_num)
-        self.statistics["average_rule_body_length"].append(avg_rule_body_len)
+        rules_swrl = self.rules_inductor.get_swrl_rules()
+        if self.dataset_verification and self.rules_inductor.incremental and \
+                not (self.rules_inductor.verify_learnt_records() and self.rules_inductor.verify_rules(rules_swrl)):
+            print("Warning! The updated tree differs from the one learnt from the whole dataset, building it again...")
+            self.rules_inductor.merge_changed_records(None)
+            self.rules_inductor.train_model()
+            rules_swrl = self.rules_inductor.get_swrl_rules()
+        self._swap_rules(rules_swrl)
+        self.retraining_scheduler.record_retraining_cost(process_time() - learning_cpu_time)
         print("Learning process complete...")
         print()
 
+    @traced("request_retraining")
+    def request_retraining(self):
+        """ Learning procedure done in the background - the snapshot of the history is sent to the worker process and
+         the system keeps using the previous rules until the new ones are ready (see '_collect_retraining') """
+        print("Learning procedure initiated in the background...")
+        snapshot_cpu_time = process_time()
+        self._fix_history()
+        # the situations waiting for the classification are not a part of the history yet
+        print("Parsing the history knowledge to dataframe...")
+        self._update_dataset(skipped_situations=[s.name for s in self.pending_situations] +
+                             list(self.unconfirmed_situations))
+        self.retraining_scheduler.record_retraining_cost(process_time() - snapshot_cpu_time)
+        if self.background_retrainer.submit(self.rules_inductor.dataset, self.rules_generation):
+            print("Training the new model in the background...")
+        else:
+            print("Previous training is still in progress, the next one will start right after it...")
+        print()
+
+    def _collect_retraining(self):
+        """ Swapping in the inference rules trained in the background (if they are ready); returns True if the rules
+         were collected """
+        if self.background_retrainer is None:
+            return False
+        retraining_results = self.background_retrainer.collect()
+        if retraining_results is None:
+            return False
+        rules_swrl, generation, cpu_time = retraining_results
+        self.retraining_scheduler.record_retraining_cost(cpu_time)
+        # the rules were learnt again in the meantime (e.g. since the reasoning failed), so these ones are outdated
+        if generation != self.rules_generation:
+            print("Discarding the outdated inference rules trained in the background...")
+        else:
+            print("Swapping in the inference rules trained in the background...")
+            self._reset_pending_situations()
+            self._swap_rules(rules_swrl)
+            print()
+        # starting the retraining that was requested in the meantime
+        if self.background_retrainer.requested_again:
+            self.request_retraining()
+        return True
+
+    @traced("swap_rules")
+    def _swap_rules(self, rules_swrl):
+        """ Replacing the inference rules with the new ones (in the text form) - in the ontology and in all the
+         components using them; only the changed rules are removed or added (the components are left as they are
+         if none of the rules has changed); it happens at once, between the classifications """
+        induced_rules_num = len(rules_swrl)
+        # shrinking the set of the new rules
+        if self.rules_minimizer is not None:
+            with tracer.span("minimize_rules"):
+                rules_swrl = self.rules_minimizer.minimize(rules_swrl)
+            print(f"Minimized the set of the inference rules: {induced_rules_num} -> {len(rules_swrl)}")
+        # replacing only the rules that have changed since the previous learning
+        rules_added, rules_removed, rules_kept = self.rules_inductor.sync_swrl_rules(rules_swrl)
+        print(f"Rules added: {rules_added}, removed: {rules_removed}, kept: {rules_kept}")
+        self.rules_generation += 1
+        if rules_added > 0 or rules_removed > 0:
+            # compiling the new rules for the rules engine
+            if self.rules_engine is not None:
+                self.rules_engine.compile(self.onto.rules())
+            # replacing the rules in the module of the ontology
+            if self.reasoning_module is not None:
+                self.reasoning_module.sync_rules(self.onto.rules())
+            # the cached results were obtained with the previous rules
+            if self.classification_cache is not None:
+                self.classification_cache.invalidate()
+        # saving statistics for the current learning process
+        rules_num, avg_rule_body_len = self.rules_inductor.get_rules_info()
+        self.statistics.record("learning", rules_num=rules_num, average_rule_body_length=avg_rule_body_len,
+                               induced_rules_num=induced_rules_num, rules_added=rules_added,
+                               rules_removed=rules_removed, rules_kept=rules_kept)
+        self._commit_changes()
+
 # An implementation below was created solely for the special experiments and it is not considered as an actual part of the system
 #=======================================================================================================================
     # def learn_new_rules(self):
@@ -193,110 +526,116 @@ class ReasoningAndLearningSystemPrototype:
     #     print()
 #=======================================================================================================================
 
+    @traced("ask_user_directly")
     def ask_user_directly(self):
         """ 'Ask the user' procedure """
         print("Activating the 'Ask for an answer from the user' procedure...\nPossible options:")
-        # getting the sorted list of possible interaction options
-        action_options = sorted(self.onto.Interaction_with_user.instances(), key=lambda k: k.name)
-        action_options = list(dict.fromkeys(action_options))
-        # listing out the options
-        for i, a in enumerate(action_options):
-            print(f"{i} - {a.name}")
-        # awaiting an user to make a choice
-        while True:
-            choice_id = input("Choose one of the above that suits you (put an appropriate ID): ")
-            # making sure that input is valid
-            try:
-                user_choice = action_options[int(choice_id)]
-                break
-            except (ValueError, IndexError):
-                print("WARNING: Invalid input detected! Please try again!")
+        # getting the sorted list of possible interaction options (from the index)
+        action_options = list(self.index.actions_catalog)
+        # awaiting an user (or an oracle) to make a choice
+        user_choice = self.feedback_oracle.choose_action(action_options)
         print(f"Answer affirmative...")
         print()
         return user_choice
 
-# An implementation below was created solely for the special experiments and it is not considered as an actual part of the system
-#=======================================================================================================================
-    # def ask_user_directly(self, wanted_interaction):
-    #     """ 'Ask the user' procedure - alternative take """
-    #     print("Activating the 'Ask for an answer from the user' procedure...")
-    #     user_choice = self.onto.Staying_quiet  # default value, just in case
-    #     # looking for an interaction adequate to the current observation
-    #     for i in self.onto.Interaction_with_user.instances():
-    #         if i.name == wanted_interaction:
-    #             user_choice = i
-    #             break
-    #     return user_choice
-#=======================================================================================================================
+    @staticmethod
+    def _count_reasoning(outcome, reasoning_result, timed=True):
+        """ Adding the reasoning's results (whether the rules engine decided and agreed) to the observation's outcome;
+         the time spent in the reasoner is added only if 'timed' (in the batch, it is added at each reasoning, while
+         the reasoning itself is counted once, with the result the observation is resolved with) """
+        # the actions were taken from the cache, so there was no reasoning
+        if reasoning_result is None:
+            return
+        engine_decided, engine_agreed, reasoner_time = reasoning_result
+        outcome["reasoning_count"] += 1
+        if timed:
+            outcome["reasoner_time"] += reasoner_time
+        outcome["rules_engine_count"] += int(engine_decided)
+        outcome["rules_engine_disagreements"] += int(engine_agreed is False)
 
-    def classify_new_situation(self, sit_dict):
-        """ Actual classification process, taking one observation at a time """
-        # preparing statistics for the current observation's classification
-        reward = 1.0
-        reasoning_count = 0
-        learning_count = 0
-        asking_count = 0
-        exec_time = 0.0
-        # getting new id for the new observation
-        last_sit_id = max(self.onto.Situation.instances(), key=lambda k: int(k.name[1:])).name
-        new_sit_id = "s" + str(int(last_sit_id[1:]) + 1)
+    def _add_new_situation(self, sit_dict):
+        """ Adding the new observation to the ontology as a new situation """
+        # getting new id for the new observation (from the index)
+        new_sit_id = self.index.get_new_situation_name()
         new_sit = self.onto.Situation(new_sit_id, hadUser=sit_dict['User'], hadMood=sit_dict['General_mood'],
                                       wasWeather=sit_dict['Weather'], wasTime=sit_dict['General_time'])
+        self.index.add_situation(new_sit)
+        self.changed_situations[new_sit.name] = new_sit
         print(f"Received a new observation '{new_sit.name}':\nUser - {new_sit.hadUser.name}, "
               f"Mood - {new_sit.hadMood.name}, Weather - {new_sit.wasWeather.name}, Time - {new_sit.wasTime.name}")
-        input("Press 'Enter' to initiate the classification process...")
+        return new_sit
+
+    @traced("classify_new_situation")
+    def classify_new_situation(self, sit_dict):
+        """ Actual classification process, taking one observation at a time; returns the outcome of the classification """
+        latency = time()  # total time of handling the observation (including the feedback)
+        self._collect_retraining()
+        # preparing statistics for the current observation's classification
+        outcome = {"situation": None, "action": None, "was_asked": False, "reward": 1.0, "reasoning_count": 0,
+                   "learning_count": 0, "asking_count": 0, "rules_engine_count": 0, "rules_engine_disagreements": 0,
+                   "reasoner_time": 0.0, "exec_time": 0.0, "latency": 0.0}
+        new_sit = self._add_new_situation(sit_dict)
+        self.feedback_oracle.observe(sit_dict)
+        self.feedback_oracle.pause("Press 'Enter' to initiate the classification process...")
         # classification process
         classif_time = time()
-        self.execute_reasoning()  # first reasoning
-        reasoning_count += 1
+        self._count_reasoning(outcome, self.execute_reasoning([new_sit])[0])  # first reasoning
+        self._resolve_situation(new_sit, outcome, classif_time)
+        outcome["latency"] = time() - latency
+        return outcome
+
+    def _resolve_situation(self, new_sit, outcome, classif_time):
+        """ Second part of the classification process, after the first reasoning about the new situation - the learning
+         and the asking procedures (if reasoning fails), checking the correctness of the results and saving them """
+        self.unconfirmed_situations[new_sit.name] = new_sit
         # side variables controlling the procedures
         learning_done = False
-        was_asked = False
+        covered = len(new_sit.takenAction) > 0  # whether or not the rules gave any result
+        rejected = False  # whether or not the user rejected any result
         # if reasoning fails
         while len(new_sit.takenAction) == 0:
             print("System could not assign any action for the current situation...")
-            # 'ask the user' procedure ("last resort")
-            if learning_done or self.rng.random() <= self.ask_rate:
+            # 'ask the user' procedure ("last resort"; also if the scheduler does not allow the learning)
+            if learning_done or self.rng.random() <= self.ask_rate or \
+               not self.retraining_scheduler.should_retrain(on_demand=True):
                 classif_time = time() - classif_time
-                exec_time += classif_time
+                outcome["exec_time"] += classif_time
                 chosen_action = self.ask_user_directly()
-                was_asked = True
-                asking_count += 1
-                reward -= 0.66  # punishment for the need to ask an user
+                outcome["was_asked"] = True
+                outcome["asking_count"] += 1
+                outcome["reward"] -= 0.66  # punishment for the need to ask an user
                 classif_time = time()
                 new_sit.takenAction.append(chosen_action)
             # learning procedure (most desirable)
             else:
                 self.learn_new_rules()
-                learning_count += 1
+                outcome["learning_count"] += 1
                 learning_done = True
-                self.execute_reasoning()  # second reasoning
-                reasoning_count += 1
+                self._count_reasoning(outcome, self.execute_reasoning([new_sit])[0])  # second reasoning
         # checking the results of the classification (multiple results possible)
         new_sit.takenAction = sorted(new_sit.takenAction, key=lambda k: k.name)
         # removing potential duplicates
         new_sit.takenAction = list(dict.fromkeys(new_sit.takenAction))
         actions_num = len(new_sit.takenAction)
         classif_time = time() - classif_time
-        exec_time += classif_time
+        outcome["exec_time"] += classif_time
         # checking the correctness of the results
         while True:
             # picking one of the gained results
             pick = self.rng.choice(new_sit.takenAction)
             print("Prompt:", self.action_roleplay(pick.name))
-            # asking for affirmation (input needs to be valid)
-            while True:
-                try:
-                    satisfaction = input("Do you accept this result? Yes (Y) / No (N): ").upper()
-                    if satisfaction not in ["Y", "N"]:
-                        raise ValueError("WARNING: Invalid input detected! Please try again!")
-                    break
-                except ValueError as e:
-                    print(e)
-            if satisfaction == "N":
+            # asking for affirmation
+            with tracer.span("accept_action"):
+                accepted = self.feedback_oracle.accept_action(pick)
+            if not accepted:
                 print("Affirmative. Removing the result from the found possibilities...")
-                if not was_asked:
-                    reward -= 1 / actions_num  # punishment for the wrong result (if it was via learning or reasoning)
+                rejected = True
+                # the rejected result cannot be given again for the same features
+                if self.classification_cache is not None:
+                    self.classification_cache.invalidate(new_sit)
+                if not outcome["was_asked"]:
+                    # punishment for the wrong result (if it was via learning or reasoning)
+                    outcome["reward"] -= 1 / actions_num
                 new_sit.takenAction.remove(pick)
             else:
                 break
@@ -304,27 +643,114 @@ class ReasoningAndLearningSystemPrototype:
             if len(new_sit.takenAction) == 0:
                 print("All the previous possibilities have been removed!")
                 chosen_action = self.ask_user_directly()
-                was_asked = True
-                asking_count += 1
+                outcome["was_asked"] = True
+                outcome["asking_count"] += 1
                 new_sit.takenAction.append(chosen_action)
         print(f"Affirmative. Saving action '{pick.name}' for the situation '{new_sit.name}'...")
         new_sit.takenAction = [pick]
         self.backup_memory[new_sit.name] = pick
-        # regular reset of the inference rules after the 10th situation checked
-        if len(self.onto.Situation.instances()) % 10 == 0:
+        self.changed_situations[new_sit.name] = new_sit
+        del self.unconfirmed_situations[new_sit.name]
+        # regular reset of the inference rules, when the scheduler decides so (not counting the situations that are
+        # still waiting for the classification or the feedback)
+        self.retraining_scheduler.observe({"history_size": self.index.get_situations_count() - len(self.pending_situations)
+                                           - len(self.unconfirmed_situations), "rejected": rejected, "covered": covered})
+        if self.retraining_scheduler.should_retrain():
             refresh_time = time()
             print("Refreshing the inference rules after the history expansion...")
-            self.learn_new_rules()
-            learning_count += 1
+            if self.background_retrainer is not None:
+                self.request_retraining()
+            else:
+                self.learn_new_rules()
+            outcome["learning_count"] += 1
             refresh_time = time() - refresh_time
-            exec_time += refresh_time
-        # saving statistics to the systems variable/dictionary
-        for k, v in zip(["satisfaction_growth", "reasoning_count_growth", "learning_count_growth", "asking_count_growth", "exec_time"],
-                        [reward, reasoning_count, learning_count, asking_count, exec_time]):
-            if k != "exec_time":
-                v = v + self.statistics[k][-1]
-            self.statistics[k].append(v)
+            outcome["exec_time"] += refresh_time
+        # saving statistics to the stream of the statistics' events
+        observation_stats = dict()
+        for k, v in zip(["satisfaction_growth", "reasoning_count_growth", "learning_count_growth", "asking_count_growth", "exec_time",
+                         "rules_engine_count_growth", "rules_engine_disagreements_growth", "reasoner_time"],
+                        [outcome["reward"], outcome["reasoning_count"], outcome["learning_count"], outcome["asking_count"],
+                         outcome["exec_time"], outcome["rules_engine_count"], outcome["rules_engine_disagreements"],
+                         outcome["reasoner_time"]]):
+            if k not in ["exec_time", "reasoner_time"]:
+                v = v + self.statistics.get_last("observation", k)
+            observation_stats[k] = v
+        # saving the counters of the classification cache
+        cache = self.classification_cache
+        for k, v in zip(["cache_hits_growth", "cache_misses_growth", "cache_evictions_growth", "cache_invalidations_growth"],
+                        [cache.hits, cache.misses, cache.evictions, cache.invalidations] if cache is not None else [0] * 4):
+            observation_stats[k] = v
+        self.statistics.record("observation", **observation_stats)
+        self._commit_changes()
         print()
+        outcome["situation"] = new_sit.name
+        outcome["action"] = pick.name
+
+    @traced("classify_pending_batch")
+    def classify_pending_batch(self, sit_dicts):
+        """ Batch classification process - all the observations are added to the ontology as situations and the reasoner
+         is invoked once for all of them; then the remaining procedures are done for each situation separately
+         (requires a non-interactive feedback oracle); returns the list of outcomes """
+        if isinstance(self.feedback_oracle, InteractiveFeedbackOracle):
+            raise ValueError("Batch classification requires a non-interactive feedback oracle")
+        latency = time()  # start of handling the batch (each observation's latency lasts until its resolution)
+        outcomes = []
+        new_sits = []
+        reasoning_results = dict()  # situation's name -> result of its last reasoning
+        for sit_dict in sit_dicts:
+            outcomes.append({"situation": None, "action": None, "was_asked": False, "reward": 1.0,
+                             "reasoning_count": 0, "learning_count": 0, "asking_count": 0, "rules_engine_count": 0,
+                             "rules_engine_disagreements": 0, "reasoner_time": 0.0, "exec_time": 0.0, "latency": 0.0})
+            new_sits.append(self._add_new_situation(sit_dict))
+        self.pending_situations = list(new_sits)
+        self.pending_stale = True
+        for i, (sit_dict, new_sit, outcome) in enumerate(zip(sit_dicts, new_sits, outcomes)):
+            self.feedback_oracle.observe(sit_dict)
+            self._collect_retraining()
+            # (re)reasoning about all the situations waiting for the classification at once (it is needed at the beginning
+            # and after every learning process, since the results were obtained with the previous rules);
+            # the time of each reasoning is shared equally between the situations
+            if self.pending_stale:
+                share = 1 / len(self.pending_situations)
+                classif_time = time()
+                pending_results = self.execute_reasoning(self.pending_situations)
+                classif_time = (time() - classif_time) * share
+                for j, (pending_sit, reasoning_result) in enumerate(zip(self.pending_situations, pending_results)):
+                    outcomes[i + j]["exec_time"] += classif_time
+                    if reasoning_result is not None:
+                        outcomes[i + j]["reasoner_time"] += reasoning_result[2]
+                    reasoning_results[pending_sit.name] = reasoning_result
+                self.pending_stale = False
+            # the reasoning is counted once, with the result the situation is resolved with
+            self._count_reasoning(outcome, reasoning_results[new_sit.name], timed=False)
+            # the current situation is not waiting anymore
+            self.pending_situations.remove(new_sit)
+            self._resolve_situation(new_sit, outcome, time())
+            outcome["latency"] = time() - latency
+        return outcomes
+
+    def classify_stream(self, situations, batch_size=1):
+        """ Non-interactive classification of the stream of observations (requires a non-interactive feedback oracle);
+         generator, returning the outcome of each classification as soon as it is done; the observations can be
+         classified in batches of the given size (one reasoner invocation per batch) """
+        if isinstance(self.feedback_oracle, InteractiveFeedbackOracle):
+            raise ValueError("Classification of the stream of observations requires a non-interactive feedback oracle")
+        batch = []
+        for sit_dict in situations:
+            batch.append(sit_dict)
+            if len(batch) == batch_size:
+                if batch_size == 1:
+                    yield self.classify_new_situation(sit_dict)
+                else:
+                    yield from self.classify_pending_batch(batch)
+                batch = []
+        if len(batch) > 0:
+            yield from self.classify_pending_batch(batch)
+
+    def classify_batch(self, situations):
+        """ Non-interactive classification of the batch of observations (one reasoner invocation for all of them);
+         returns the list of outcomes """
+        return self.classify_pending_batch(list(situations))
 
 # An implementation below was created solely for the special experiments and it is not considered as an actual part of the system
 #=======================================================================================================================
@@ -0,0 +1,98 @@
+import functools
+import json
+import os
+import threading
+from time import perf_counter
+
+
+class _NullSpan:
+    """ Span that does nothing, returned when the tracing is disabled (so the disabled tracing costs almost nothing) """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """ Span measuring the time of the single phase; the spans opened inside of it become its children """
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer  # tracer saving the span
+        self.name = name  # name of the phase
+        self.args = args  # additional information about the phase
+        self.start = None  # time of opening the span
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.add_event(self.name, self.start, perf_counter(), self.args)
+        return False
+
+
+class Tracer:
+    """ Tracer of the system's phases; the spans (phases with their start and duration) can be exported to the file
+     in the 'Chrome trace' format (e.g. for 'chrome://tracing' or 'Perfetto') """
+    def __init__(self, enabled=False):
+        self.enabled = enabled  # whether or not the spans are recorded
+        self.origin = perf_counter()  # the beginning of the trace
+        self.events = []  # recorded spans (as the 'Chrome trace' events)
+
+    def enable(self):
+        """ Starting the recording of the spans (the previous ones are forgotten) """
+        self.enabled = True
+        self.origin = perf_counter()
+        self.events = []
+
+    def disable(self):
+        """ Stopping the recording of the spans """
+        self.enabled = False
+
+    def span(self, name, **args):
+        """ Context manager measuring the phase with the given name ('with tracer.span("phase"): ...') """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def add_event(self, name, start, end, args=None):
+        """ Saving the finished span (times from 'perf_counter') """
+        self.events.append({"name": name, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6,
+                            "pid": os.getpid(), "tid": threading.get_ident(), "args": args if args else {}})
+
+    def get_summary(self):
+        """ Total time (in seconds) and number of the spans for each phase, starting from the longest """
+        summary = dict()
+        for e in self.events:
+            total_time, count = summary.get(e["name"], (0.0, 0))
+            summary[e["name"]] = (total_time + e["dur"] / 1e6, count + 1)
+        return dict(sorted(summary.items(), key=lambda k: k[1][0], reverse=True))
+
+    def export_chrome_trace(self, file_path):
+        """ Saving the recorded spans to the .json file in the 'Chrome trace' format """
+        with open(file_path, 'w') as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+# tracer shared by all the system's components (disabled by default)
+tracer = Tracer()
+
+
+def traced(name):
+    """ Decorator measuring each call of the function as the span with the given name """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with _Span(tracer, name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -4,7 +4,7 @@ import os
 import pandas as pd
 from time import time
 import json
-from chefboost import Chefboost as chef
+import importlib.util
 from sklearn.model_selection import train_test_split
 
 
@@ -29,6 +29,8 @@ if __name__ == "__main__":
         rules_inductor = RulesInductorSklearn(onto)
     else:
         rules_inductor = RulesInductorChefboost(onto)
+    # the rules are saved to the files (their .json file and chefboost's decision function are used below)
+    rules_inductor.export_rules = True
     # setting dataset to the rule inductor
     rules_inductor.dataset = X_train
     # training the model
@@ -37,8 +39,12 @@ if __name__ == "__main__":
     if RULES_INDUCTOR_TYPE == "sklearn":
         evaluation = rules_inductor.model.score(X_test, y_test)
     else:
-        X_test["takenAction"] = y_test
-        evaluation = chef.evaluate(rules_inductor.model, X_test, target_label="takenAction", task="test")
+        rules_spec = importlib.util.spec_from_file_location(
+            "chefboost_rules", os.path.join(KNOWLEDGE_FOLDER, rules_inductor.wanted_rules_file + ".py"))
+        rules_module = importlib.util.module_from_spec(rules_spec)
+        rules_spec.loader.exec_module(rules_module)
+        predictions = [rules_module.findDecision(row) for row in X_test.values.tolist()]
+        evaluation = (pd.Series(predictions, index=y_test.index) == y_test).mean()
     total_time = time() - total_time
     # getting information about tree's depth and number of leaves
     with open(os.path.join(KNOWLEDGE_FOLDER, rules_inductor.wanted_rules_file + ".json")) as f:
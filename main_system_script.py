@@ -1,7 +1,6 @@
 from integration.system_core import ReasoningAndLearningSystemPrototype
+from integration.feedback_oracles import CsvFeedbackOracle
 from other_functions.situations_generator import random_situations_generator
-from other_functions.results_visualizer import *
-import pandas as pd
 import os
 
 
@@ -10,37 +9,77 @@ ONTO_SAVE = "jp_masters_final.owl"
 KNOWLEDGE_FOLDER = "knowledge_folder"
 RULES_INDUCTOR_TYPE = "chefboost"
 REASONER_TYPE = "pellet"
+# 'off' - only the reasoner is used, 'fast'/'verify' - the compiled rules engine is used before the reasoner
+RULES_ENGINE_MODE = "off"
+# 'world' - the reasoner works on the whole ontology, 'module' - only on the module relevant to the new situation
+REASONING_SCOPE = "world"
+# keeping the module and the Pellet reasoner's JVM warm in the separate, long-lived process (only with the 'module'
+# reasoning scope and Pellet; the JVM is loaded with JPype)
+REASONER_WORKER = False
+# maximum number of the reasoning's results remembered for the situations' features (0 - no cache)
+CACHE_SIZE = 0
+# refreshing the inference rules in the separate process (the previous rules are used in the meantime)
+BACKGROUND_LEARNING = False
+# recording the time of the system's phases (saved to 'results/trace.json' in the 'Chrome trace' format)
+TRACING = False
+# SQLite file keeping the ontology between the runs, committed after each situation (None - the ontology is loaded
+# from .owl file at each start and saved to 'ONTO_SAVE' at the end)
+QUADSTORE = None
+# comparing the dataset updated at each learning (only with the changed situations) with the fully parsed history
+DATASET_VERIFICATION = False
+# removing the repeated, subsumed and mergeable inference rules before they are put in the ontology
+RULES_MINIMIZATION = False
+# drawing the plots of the statistics after the analysis (the plotting backend is imported only then)
+VISUALISE = True
 SYSTEM_RANDOM_STATE = 100
 GENERATOR_RANDOM_STATE = 100
 SITUATIONS_NUMBER = 50
+# 'interactive' - the user answers the system's questions; 'replay' - the answers are replayed from the 'test dataset'
+FEEDBACK_TYPE = "interactive"
+REPLAY_FIRST_ROW = 20
+# number of the replayed observations that are reasoned about at once (1 - one observation at a time)
+REPLAY_BATCH_SIZE = 1
 
 
 if __name__ == "__main__":
     # initiating the system
-    ral_sys = ReasoningAndLearningSystemPrototype()
+    if FEEDBACK_TYPE == "replay":
+        # getting wanted interactions from the 'test dataset'
+        ral_sys = ReasoningAndLearningSystemPrototype(feedback_oracle=CsvFeedbackOracle(first_row=REPLAY_FIRST_ROW))
+    else:
+        ral_sys = ReasoningAndLearningSystemPrototype()
     # loading the components
     ral_sys.load_components(ONTO_NAME, rules_inductor_type=RULES_INDUCTOR_TYPE, reasoner_type=REASONER_TYPE,
-                            random_state=SYSTEM_RANDOM_STATE)
-    # generating a data sample
-    random_samples = random_situations_generator(ral_sys.onto, random_state=GENERATOR_RANDOM_STATE)
-    # getting wanted interactions from the 'test dataset'
-    # test_set = pd.read_csv(os.path.join(KNOWLEDGE_FOLDER, "actions_test.csv"), sep=';')
-    # test_set = test_set[20:]["takenAction"]
-    # i = 20  # observation index
-    # classification of the generated observations
-    for _ in range(SITUATIONS_NUMBER):
-        new_sit = next(random_samples)
-        # wanted_interaction = test_set[i]
-        ral_sys.classify_new_situation(new_sit)
-        # i += 1
+                            random_state=SYSTEM_RANDOM_STATE, rules_engine_mode=RULES_ENGINE_MODE,
+                            reasoning_scope=REASONING_SCOPE, reasoner_worker=REASONER_WORKER,
+                            cache_size=CACHE_SIZE, background_learning=BACKGROUND_LEARNING,
+                            tracing=TRACING, quadstore=QUADSTORE, dataset_verification=DATASET_VERIFICATION,
+                            rules_minimization=RULES_MINIMIZATION)
+    if FEEDBACK_TYPE == "replay":
+        # replaying the observations from the 'test dataset' without any prompts
+        replayed_samples = ral_sys.feedback_oracle.get_situations(ral_sys.onto)
+        for outcome in ral_sys.classify_stream(replayed_samples, batch_size=REPLAY_BATCH_SIZE):
+            print(f"Outcome for '{outcome['situation']}': {outcome['action']} (latency: {outcome['latency']:.3f}s)")
+    else:
+        # generating a data sample
+        random_samples = random_situations_generator(ral_sys.onto, random_state=GENERATOR_RANDOM_STATE)
+        # classification of the generated observations
+        for _ in range(SITUATIONS_NUMBER):
+            new_sit = next(random_samples)
+            ral_sys.classify_new_situation(new_sit)
     # system shutdown (saving the statistics to .json)
     ral_sys.system_shutdown()
     # visualising the results
-    visualise_stats("satisfaction_growth", "satisfaction_growth.png",
-                    "Users' absolute satisfaction growth", "Users' satisfaction")
-    visualise_stats("exec_time", "execution_time.png",
-                    "Classification's execution time change", "Execution time")
-    visualise_protocols_count_growth()
-    visualise_rules_info_growth()
-    # saving ontology to another file
-    ral_sys.save_onto(ONTO_SAVE)
+    if VISUALISE:
+        from other_functions.results_visualizer import visualise_stats, visualise_protocols_count_growth, \
+            visualise_rules_info_growth, visualise_rules_changes
+        visualise_stats("satisfaction_growth", "satisfaction_growth.png",
+                        "Users' absolute satisfaction growth", "Users' satisfaction")
+        visualise_stats("exec_time", "execution_time.png",
+                        "Classification's execution time change", "Execution time")
+        visualise_protocols_count_growth()
+        visualise_rules_info_growth()
+        visualise_rules_changes()
+    # saving ontology to another file (the quadstore is exported offline - 'other_functions/quadstore_export.py')
+    if QUADSTORE is None:
+        ral_sys.save_onto(ONTO_SAVE)
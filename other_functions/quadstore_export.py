@@ -0,0 +1,32 @@
+from owlready2 import *
+import argparse
+import os
+
+
+KNOWLEDGE_FOLDER = "knowledge_folder"
+DEFAULT_QUADSTORE = "jp_masters_store.sqlite3"
+DEFAULT_EXPORT = "jp_masters_final.owl"
+
+
+def export_quadstore(quadstore_path, save_path, file_format="rdfxml"):
+    """ Exporting the ontology kept in the SQLite quadstore to the file - it is done offline (the system should not
+     be using the quadstore at the same time) """
+    world = World(filename=quadstore_path)
+    # the stored ontology is the one describing the situations
+    onto = next((o for o in world.ontologies.values() if o.Situation is not None), None)
+    if onto is None:
+        raise ValueError(f"Quadstore '{quadstore_path}' does not contain the ontology with the situations")
+    onto.save(file=save_path, format=file_format)
+    world.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export of the ontology kept in the system's SQLite quadstore")
+    parser.add_argument("--quadstore", default=DEFAULT_QUADSTORE, help="name of the quadstore in the knowledge folder")
+    parser.add_argument("--output", default=DEFAULT_EXPORT, help="name of the exported file in the knowledge folder")
+    parser.add_argument("--format", default="rdfxml", choices=["rdfxml", "ntriples"])
+    args = parser.parse_args()
+    os.chdir("..")
+    export_quadstore(os.path.join(KNOWLEDGE_FOLDER, args.quadstore), os.path.join(KNOWLEDGE_FOLDER, args.output),
+                     args.format)
+    print(f"Ontology exported to: {os.path.join(KNOWLEDGE_FOLDER, args.output)}")
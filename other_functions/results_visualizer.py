@@ -1,16 +1,44 @@
-import json
+from integration.statistics_sink import StatisticsReader
 import os
 import numpy as np
 import matplotlib.pyplot as plt
 
 
 RESULTS_FOLDER = "results"
-DEFAULT_RESULTS_FILE = "analysis_results.json"
+DEFAULT_RESULTS_FILE = "analysis_results.jsonl"
+# statistics saved with the events of each type
+EVENTS_STATS = {"observation": ["satisfaction_growth", "reasoning_count_growth", "learning_count_growth",
+                                "asking_count_growth", "exec_time", "rules_engine_count_growth",
+                                "rules_engine_disagreements_growth", "reasoner_time", "cache_hits_growth",
+                                "cache_misses_growth", "cache_evictions_growth", "cache_invalidations_growth"],
+                "learning": ["rules_num", "average_rule_body_length", "rules_added", "rules_removed", "rules_kept"]}
+
+# reader following the stream of the statistics and the series read from it so far
+_reader = None
+_results = None
+
+
+def read_results(results_file=DEFAULT_RESULTS_FILE):
+    """ Reading the statistics' series from the stream of the events; only the events written since the previous call
+     are read (the series start with 0, like before the first observation) """
+    global _reader, _results
+    results_path = os.path.join(RESULTS_FOLDER, results_file)
+    if _reader is None or _reader.file_path != results_path:
+        _reader = StatisticsReader(results_path)
+        _results = None
+    restarts_count = _reader.restarts_count
+    events = _reader.read_new()
+    # the series are read from the beginning (also when the stream was started again by the new analysis)
+    if _results is None or _reader.restarts_count != restarts_count:
+        _results = {k: [0] for stats in EVENTS_STATS.values() for k in stats}
+    for event in events:
+        for k in EVENTS_STATS.get(event["type"], []):
+            _results[k].append(event[k])
+    return _results
 
 
 def visualise_stats(stat_name, save_file, my_title, my_ylabel):
-    with open(os.path.join(RESULTS_FOLDER, DEFAULT_RESULTS_FILE), 'r') as f:
-        results = json.load(f)
+    results = read_results()
     x = list(range(0, len(results[stat_name])))
     plt.plot(x, results[stat_name])
     plt.title(my_title)
@@ -22,8 +50,7 @@ def visualise_stats(stat_name, save_file, my_title, my_ylabel):
 
 
 def visualise_protocols_count_growth():
-    with open(os.path.join(RESULTS_FOLDER, DEFAULT_RESULTS_FILE), 'r') as f:
-        results = json.load(f)
+    results = read_results()
     for r in ["reasoning_count_growth", "learning_count_growth", "asking_count_growth"]:
         x = list(range(0, len(results[r])))
         plt.plot(x, results[r])
@@ -37,8 +64,7 @@ def visualise_protocols_count_growth():
 
 
 def visualise_rules_info_growth():
-    with open(os.path.join(RESULTS_FOLDER, DEFAULT_RESULTS_FILE), 'r') as f:
-        results = json.load(f)
+    results = read_results()
     for i, r in enumerate(zip(["rules_num", "average_rule_body_length"],
                               ["Number of learnt rules growth", "Avg. rule body length growth"],
                               ["Learnt rules count", "Average rule length"])):
@@ -51,3 +77,21 @@ def visualise_rules_info_growth():
     plt.tight_layout()
     plt.savefig(os.path.join(RESULTS_FOLDER, "rules_info_count.png"))
     plt.clf()
+
+
+def visualise_rules_changes():
+    results = read_results()
+    # the first values of the series are the starting zeros
+    kept = np.array(results["rules_kept"][1:])
+    added = np.array(results["rules_added"][1:])
+    removed = np.array(results["rules_removed"][1:])
+    x = np.arange(1, len(kept) + 1)
+    plt.bar(x, kept, color="tab:gray")
+    plt.bar(x, added, bottom=kept, color="tab:green")
+    plt.bar(x, -removed, color="tab:red")
+    plt.title("Inference rules changed by the learning")
+    plt.xlabel("Instances of learning's activation")
+    plt.ylabel("Rules count")
+    plt.legend(["kept", "added", "removed"])
+    plt.savefig(os.path.join(RESULTS_FOLDER, "rules_changes.png"))
+    plt.clf()
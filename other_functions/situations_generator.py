@@ -3,20 +3,144 @@ import os
 import numpy as np
 
 
+# classes describing the situation (in the order of the generated batch's columns)
+SITUATION_CLASSES = ["User", "General_mood", "Weather", "General_time"]
+# hours of the day (from, to) covered by the individuals of 'General_time'
+TIMES_OF_DAY_HOURS = {"Night": (0, 6), "Morning": (6, 11), "Noon": (11, 13), "Afternoon": (13, 17),
+                      "Dinner_time": (17, 20), "Evening": (20, 24)}
+
+
 def random_situations_generator(onto, random_state=None):
     """ An infinite random situations generator for the project's ontology """
     rng = np.random.default_rng(random_state)  # setting the random number generator
+    # the individuals are listed only once
+    individuals = {v.name: v.instances() for v in [onto.User, onto.General_mood, onto.Weather, onto.General_time]}
     # infinite generator
     while True:
         situation = dict()
-        for v in [onto.User, onto.General_mood, onto.Weather, onto.General_time]:
-            situation[v.name] = rng.choice(v.instances())
+        for name, v_individuals in individuals.items():
+            situation[name] = rng.choice(v_individuals)
         yield situation
 
 
+class SituationsBatchGenerator:
+    """ Generator of the large batches of the situations, coded as the NumPy arrays of the individuals' indexes
+     (the columns from 'SITUATION_CLASSES' and 'timestamp' - seconds from the start); the traffic can be skewed:
+     Zipf distribution over the users, the times of the day following the timestamps, bursty arrivals and
+     the recurring identical situations; the consecutive batches continue the same traffic """
+    def __init__(self, onto, zipf_exponent=0.0, time_correlation=0.0, burst_share=0.0, burst_factor=10.0,
+                 mean_burst_length=20, repeat_rate=0.0, repeat_window=1000, mean_interval=60.0, start_hour=0,
+                 random_state=None):
+        self.rng = np.random.default_rng(random_state)  # setting the random number generator
+        # individuals of each class (listed once, sorted by names, so the codes do not depend on the ontology's order)
+        self.catalog = {c: sorted(onto[c].instances(), key=lambda k: k.name) for c in SITUATION_CLASSES}
+        self.time_correlation = time_correlation  # share of the situations whose time follows the timestamp
+        self.burst_share = burst_share  # share of the arrivals' episodes that are bursts
+        self.burst_factor = burst_factor  # how many times faster the situations arrive during the burst
+        self.mean_burst_length = mean_burst_length  # mean number of the situations in one arrivals' episode
+        self.repeat_rate = repeat_rate  # share of the situations that repeat the features of the earlier ones
+        self.repeat_window = repeat_window  # number of the recent situations that can be repeated
+        self.mean_interval = mean_interval  # mean number of seconds between the situations (outside the bursts)
+        # probabilities of the users (Zipf with the given exponent over the randomly ranked users; 0 - uniform)
+        ranks = self.rng.permutation(len(self.catalog["User"])) + 1
+        users_weights = 1.0 / ranks.astype(float) ** zipf_exponent
+        self.users_probabilities = users_weights / users_weights.sum()
+        # index of the time of the day for each hour (-1 if no individual covers the hour)
+        times_names = [t.name for t in self.catalog["General_time"]]
+        self.hours_times = np.full(24, -1)
+        for name, (hour_from, hour_to) in TIMES_OF_DAY_HOURS.items():
+            if name in times_names:
+                self.hours_times[hour_from:hour_to] = times_names.index(name)
+        self.clock = start_hour * 3600.0  # time of the last generated situation (in seconds)
+        self.recent = {c: np.empty(0, dtype=np.int32) for c in SITUATION_CLASSES}  # the situations to repeat
+
+    def _get_intervals(self, situations_num):
+        """ Intervals between the arrivals - the episodes of the normal traffic and of the bursts, with
+         the exponential intervals inside of them """
+        # drawing enough episodes (with the geometric lengths) to cover all the situations
+        episodes_num = max(1, 2 * situations_num // self.mean_burst_length + 1)
+        lengths = self.rng.geometric(1.0 / self.mean_burst_length, size=episodes_num)
+        while lengths.sum() < situations_num:
+            lengths = np.concatenate([lengths, self.rng.geometric(1.0 / self.mean_burst_length, size=episodes_num)])
+        bursts = self.rng.random(len(lengths)) < self.burst_share
+        in_burst = np.repeat(bursts, lengths)[:situations_num]
+        scales = np.where(in_burst, self.mean_interval / self.burst_factor, self.mean_interval)
+        return self.rng.exponential(scales)
+
+    def generate(self, situations_num):
+        """ Generating the next batch of the given number of the situations (dictionary of the arrays) """
+        batch = dict()
+        batch["User"] = self.rng.choice(len(self.catalog["User"]), size=situations_num,
+                                        p=self.users_probabilities).astype(np.int32)
+        for c in ["General_mood", "Weather", "General_time"]:
+            batch[c] = self.rng.integers(len(self.catalog[c]), size=situations_num, dtype=np.int32)
+        # arrivals' times
+        batch["timestamp"] = self.clock + np.cumsum(self._get_intervals(situations_num))
+        self.clock = batch["timestamp"][-1] if situations_num > 0 else self.clock
+        # the time of the day following the timestamp (if the ontology has the individual for the hour)
+        hours_times = self.hours_times[(batch["timestamp"] // 3600 % 24).astype(int)]
+        correlated = (self.rng.random(situations_num) < self.time_correlation) & (hours_times >= 0)
+        batch["General_time"][correlated] = hours_times[correlated]
+        # recurring situations - copying the features of the earlier ones (also from the previous batches)
+        recent_num = len(self.recent["User"])
+        positions = np.arange(situations_num) + recent_num
+        sources = positions.copy()
+        repeated = self.rng.random(situations_num) < self.repeat_rate
+        lowest = np.maximum(positions - self.repeat_window, 0)
+        repeated &= positions > 0
+        sources[repeated] = self.rng.integers(lowest[repeated], positions[repeated])
+        # resolving the chains of the copies (the copy of the copy points to the original)
+        sources = np.concatenate([np.arange(recent_num), sources])
+        while True:
+            next_sources = sources[sources]
+            if np.array_equal(next_sources, sources):
+                break
+            sources = next_sources
+        for c in SITUATION_CLASSES:
+            features = np.concatenate([self.recent[c], batch[c]])[sources]
+            batch[c] = features[recent_num:]
+            self.recent[c] = features[-self.repeat_window:]
+        return batch
+
+    def to_situations(self, batch):
+        """ Decoding the batch to the situations (dictionaries of the individuals, like the ones from
+         'random_situations_generator') """
+        columns = [[self.catalog[c][i] for i in batch[c]] for c in SITUATION_CLASSES]
+        for features in zip(*columns):
+            yield dict(zip(SITUATION_CLASSES, features))
+
+    def save_batches(self, file_path, situations_num, batch_size=100000):
+        """ Generating the given number of the situations (in the batches) and saving them to .npz file for
+         the replay (with the names of the individuals) """
+        batches = [self.generate(min(batch_size, situations_num - i)) for i in range(0, situations_num, batch_size)]
+        arrays = {c: np.concatenate([b[c] for b in batches]) for c in SITUATION_CLASSES + ["timestamp"]}
+        for c in SITUATION_CLASSES:
+            arrays[f"{c}_names"] = np.array([i.name for i in self.catalog[c]])
+        np.savez_compressed(file_path, **arrays)
+
+
+def replay_situations(onto, file_path):
+    """ Generator of the situations saved to .npz file by 'SituationsBatchGenerator' (the individuals are found
+     by their names in the given ontology) """
+    arrays = np.load(file_path)
+    columns = []
+    for c in SITUATION_CLASSES:
+        individuals = [onto[name] for name in arrays[f"{c}_names"]]
+        columns.append([individuals[i] for i in arrays[c]])
+    for features in zip(*columns):
+        yield dict(zip(SITUATION_CLASSES, features))
+
+
 if __name__ == "__main__":
     my_onto_path = os.path.join("..", "knowledge_folder", "jp_masters_project.owl")
     onto = get_ontology("file://" + my_onto_path).load()
     sit_gen = random_situations_generator(onto, 100)
     for i in range(50):
         print(next(sit_gen))
+    # the skewed traffic for the load tests
+    batch_gen = SituationsBatchGenerator(onto, zipf_exponent=1.2, time_correlation=0.9, burst_share=0.2,
+                                         repeat_rate=0.3, random_state=100)
+    situations_batch = batch_gen.generate(1000000)
+    print(np.bincount(situations_batch["User"]), np.bincount(situations_batch["General_time"]))
+    for situation in list(batch_gen.to_situations(batch_gen.generate(5))):
+        print(situation)
@@ -0,0 +1,70 @@
+from owlready2 import *
+import os
+import numpy as np
+
+
+KNOWLEDGE_FOLDER = "knowledge_folder"
+BASE_ONTO = "jp_masters_project.owl"
+
+
+def _get_individuals(onto, onto_class, number, prefix, rng):
+    """ Getting the given number of the class' individuals (the ones from the base ontology are used first and
+     the missing ones are created) """
+    individuals = sorted(set(onto_class.instances()), key=lambda k: k.name)[:number]
+    for i in range(len(individuals), number):
+        new_individual = onto_class(f"{prefix}_{i + 1}", namespace=onto)
+        # users need their own properties
+        if onto_class is onto.User:
+            new_individual.hasPersonality = rng.choice(sorted(onto.Personality_type.instances(), key=lambda k: k.name))
+            new_individual.hasGender = bool(rng.integers(2))
+            new_individual.hasAge = int(rng.integers(16, 80))
+        individuals.append(new_individual)
+    return individuals
+
+
+def build_synthetic_ontology(situations_num, users_num=14, moods_num=7, weathers_num=6, times_num=6, actions_num=22,
+                             noise=0.1, random_state=None, save_path=None, base_onto=BASE_ONTO):
+    """ Building the synthetic version of the project's ontology (in its own world) - the TBox of the base ontology
+     with the given numbers of the users, moods, weathers, times, actions and situations (the base ontology's
+     situations and rules are removed); the situations' actions follow the hidden pattern (depending on the user's
+     personality, the mood and the time), except for the given share of the random ones (noise) """
+    rng = np.random.default_rng(random_state)  # setting the random number generator
+    world = World()
+    onto = world.get_ontology("file://" + os.path.join(KNOWLEDGE_FOLDER, base_onto)).load()
+    with onto:
+        # removing the base ontology's history and rules
+        for s in list(onto.Situation.instances()):
+            destroy_entity(s)
+        for r in list(onto.rules()):
+            destroy_entity(r)
+        # getting the individuals describing the situations
+        users = _get_individuals(onto, onto.User, users_num, "Synthetic_user", rng)
+        moods = _get_individuals(onto, onto.General_mood, moods_num, "Synthetic_mood", rng)
+        weathers = _get_individuals(onto, onto.Weather, weathers_num, "Synthetic_weather", rng)
+        times = _get_individuals(onto, onto.General_time, times_num, "Synthetic_time", rng)
+        actions = _get_individuals(onto, onto.Interaction_with_user, actions_num, "Synthetic_action", rng)
+        personalities = sorted(onto.Personality_type.instances(), key=lambda k: k.name)
+        users_personalities = np.array([personalities.index(u.hasPersonality) for u in users])
+        # drawing the features of all the situations at once
+        users_ids = rng.integers(len(users), size=situations_num)
+        moods_ids = rng.integers(len(moods), size=situations_num)
+        weathers_ids = rng.integers(len(weathers), size=situations_num)
+        times_ids = rng.integers(len(times), size=situations_num)
+        # the hidden pattern of the actions (with the noise)
+        actions_ids = (users_personalities[users_ids] * 7 + moods_ids * 5 + times_ids * 3) % len(actions)
+        noisy = rng.random(situations_num) < noise
+        actions_ids[noisy] = rng.integers(len(actions), size=int(noisy.sum()))
+        # creating the situations
+        for i in range(situations_num):
+            onto.Situation(f"s{i + 1}", hadUser=users[users_ids[i]], hadMood=moods[moods_ids[i]],
+                           wasWeather=weathers[weathers_ids[i]], wasTime=times[times_ids[i]],
+                           takenAction=[actions[actions_ids[i]]])
+    if save_path is not None:
+        onto.save(file=save_path)
+    return onto
+
+
+if __name__ == "__main__":
+    os.chdir("..")
+    synthetic_onto = build_synthetic_ontology(1000, users_num=50, random_state=100)
+    print(len(synthetic_onto.Situation.instances()), len(synthetic_onto.User.instances()))
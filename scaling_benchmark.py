@@ -0,0 +1,214 @@
+from integration.rules_induction import RULES_INDUCTORS
+from integration.reasoning_module import ReasoningModule
+from integration.rules_minimizer import RulesMinimizer
+from integration.tracing import tracer
+from other_functions.synthetic_ontology import build_synthetic_ontology
+from owlready2 import *
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from time import time
+
+
+KNOWLEDGE_FOLDER = "knowledge_folder"
+RESULTS_FOLDER = "results"
+BENCHMARK_FILE = "scaling_benchmark.json"
+BASELINE_FILE = "scaling_baseline.json"
+SITUATIONS_NUMBERS = [100, 1000, 10000]
+REASONERS = {"pellet": sync_reasoner_pellet, "hermit": sync_reasoner_hermit}
+# numbers of the individuals in the synthetic ontologies
+USERS_NUMBER = 14
+MOODS_NUMBER = 7
+WEATHERS_NUMBER = 6
+TIMES_NUMBER = 6
+ACTIONS_NUMBER = 22
+BENCHMARK_RANDOM_STATE = 100
+# the reasoning over the whole ontology is skipped above these numbers of situations (it would take hours)
+MAX_WORLD_REASONING_SITUATIONS = {"pellet": 10000, "hermit": 100}
+# the phase is considered slower if it takes more than 'tolerance' times the baseline's time (and at least the minimum)
+REGRESSION_TOLERANCE = 1.5
+MIN_REGRESSION_SECONDS = 0.1
+
+
+def run_benchmark(onto_path, rules_inductor_type, reasoner_type, rules_minimization=False):
+    """ Measuring the time of each phase of the system's work for the given ontology, inductor and reasoner (the induced
+     rules are minimized before they are put in the ontology, if 'rules_minimization' is True); returns
+     the dictionary of the phases' times (None if the phase was skipped) and other information about the run """
+    phases = dict()
+    # loading the ontology (in its own world)
+    phase_time = time()
+    world = World()
+    onto = world.get_ontology("file://" + onto_path).load()
+    phases["load"] = time() - phase_time
+    situations_num = len(onto.Situation.instances())
+    rules_inductor = RULES_INDUCTORS[rules_inductor_type](onto)
+    sync_reasoner = REASONERS[reasoner_type]
+    # the more detailed phases are measured with the tracer
+    tracer.enable()
+    phase_time = time()
+    rules_inductor.get_dataset()
+    phases["parse"] = time() - phase_time
+    phase_time = time()
+    rules_inductor.train_model()
+    phases["train"] = time() - phase_time
+    phase_time = time()
+    rules_swrl = rules_inductor.get_swrl_rules()
+    phases["swrl"] = time() - phase_time
+    induced_rules_num = len(rules_swrl)
+    phases["minimize"] = None
+    if rules_minimization:
+        phase_time = time()
+        rules_swrl = RulesMinimizer(onto).minimize(rules_swrl)
+        phases["minimize"] = time() - phase_time
+    phase_time = time()
+    rules_inductor.set_swrl_rules(rules_swrl)
+    phases["swrl"] += time() - phase_time
+    tracer.disable()
+    details = {name: total_time for name, (total_time, _) in tracer.get_summary().items()}
+    # reasoning about the new situation - over its module and over the whole ontology
+    new_sit = onto.Situation(f"s{situations_num + 1}", hadUser=onto.User.instances()[0],
+                             hadMood=onto.General_mood.instances()[0], wasWeather=onto.Weather.instances()[0],
+                             wasTime=onto.General_time.instances()[0])
+    # (the reasoner can refuse the rules, e.g. HermiT does not support the built-ins like 'lessThan')
+    errors = dict()
+    reasoning_module = ReasoningModule(onto)
+    reasoning_module.sync_rules(onto.rules())
+    phases["reasoning_module"] = None
+    phases["reasoning_world"] = None
+    try:
+        phase_time = time()
+        reasoning_module.classify([new_sit], sync_reasoner)
+        phases["reasoning_module"] = time() - phase_time
+        if situations_num <= MAX_WORLD_REASONING_SITUATIONS[reasoner_type]:
+            phase_time = time()
+            with onto:
+                sync_reasoner(world, infer_property_values=True)
+            phases["reasoning_world"] = time() - phase_time
+    except OwlReadyJavaError as e:
+        errors["reasoning"] = str(e).strip().splitlines()[-1]
+    # saving the ontology
+    phase_time = time()
+    onto.save(file=os.path.join(KNOWLEDGE_FOLDER, "benchmark_save.owl"))
+    phases["save"] = time() - phase_time
+    os.remove(os.path.join(KNOWLEDGE_FOLDER, "benchmark_save.owl"))
+    rules_num, avg_rule_body_len = rules_inductor.get_rules_info()
+    return {"situations": situations_num, "rules_inductor": rules_inductor_type, "reasoner": reasoner_type,
+            "phases": phases, "details": details, "errors": errors, "rules_num": rules_num,
+            "average_rule_body_length": avg_rule_body_len, "induced_rules_num": induced_rules_num,
+            "rules_minimization": rules_minimization}
+
+
+def run_suite(situations_numbers, rules_inductors, reasoners, users_num=USERS_NUMBER, moods_num=MOODS_NUMBER,
+              weathers_num=WEATHERS_NUMBER, times_num=TIMES_NUMBER, actions_num=ACTIONS_NUMBER, quiet=True,
+              rules_minimization=False):
+    """ Running the benchmark for each size of the synthetic ontology, inductor and reasoner; the work is done in
+     the temporary directory, so the files of the system are not overwritten """
+    base_onto_path = os.path.abspath(os.path.join(KNOWLEDGE_FOLDER, "jp_masters_project.owl"))
+    initial_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    os.makedirs(os.path.join(work_dir, KNOWLEDGE_FOLDER))
+    shutil.copy(base_onto_path, os.path.join(work_dir, KNOWLEDGE_FOLDER))
+    os.chdir(work_dir)
+    runs = []
+    try:
+        for situations_num in situations_numbers:
+            print(f"Building the synthetic ontology with {situations_num} situations...")
+            onto_path = os.path.abspath(os.path.join(KNOWLEDGE_FOLDER, f"synthetic_{situations_num}.owl"))
+            build_time = time()
+            build_synthetic_ontology(situations_num, users_num, moods_num, weathers_num, times_num, actions_num,
+                                     random_state=BENCHMARK_RANDOM_STATE, save_path=onto_path)
+            build_time = time() - build_time
+            for rules_inductor_type in rules_inductors:
+                for reasoner_type in reasoners:
+                    print(f"Benchmark: {situations_num} situations, {rules_inductor_type}, {reasoner_type}...")
+                    # the prints of the system's components (e.g. all the inferred rules) are hidden
+                    with contextlib.redirect_stdout(io.StringIO() if quiet else sys.stdout):
+                        run = run_benchmark(onto_path, rules_inductor_type, reasoner_type, rules_minimization)
+                    run["phases"]["build"] = build_time
+                    print("; ".join(f"{k}: {v:.3f}s" if v is not None else f"{k}: skipped"
+                                    for k, v in run["phases"].items()))
+                    print(f"Rules: {run['rules_num']} (induced: {run['induced_rules_num']})")
+                    for phase, error in run["errors"].items():
+                        print(f"WARNING: Phase '{phase}' failed: {error}")
+                    runs.append(run)
+    finally:
+        os.chdir(initial_dir)
+        shutil.rmtree(work_dir)
+    return runs
+
+
+def compare_with_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """ Comparing the phases' times with the ones from the baseline; returns the list of the regressions """
+    baseline_runs = {(r["situations"], r["rules_inductor"], r["reasoner"]): r for r in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        key = (run["situations"], run["rules_inductor"], run["reasoner"])
+        if key not in baseline_runs:
+            print(f"No baseline for: {key}")
+            continue
+        for phase, phase_time in run["phases"].items():
+            baseline_time = baseline_runs[key]["phases"].get(phase)
+            if phase_time is None or baseline_time is None:
+                continue
+            ratio = phase_time / baseline_time if baseline_time > 0 else float("inf")
+            regressed = phase_time > baseline_time * tolerance and phase_time - baseline_time > min_seconds
+            print(f"{key} {phase}: {baseline_time:.3f}s -> {phase_time:.3f}s (x{ratio:.2f})"
+                  f"{' REGRESSION' if regressed else ''}")
+            if regressed:
+                regressions.append({"run": key, "phase": phase, "baseline": baseline_time, "current": phase_time})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmark over the synthetic ontologies of growing size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SITUATIONS_NUMBERS,
+                        help="numbers of the situations in the synthetic ontologies (e.g. 100 1000 1000000)")
+    parser.add_argument("--inductors", nargs="+", default=list(RULES_INDUCTORS), choices=list(RULES_INDUCTORS))
+    parser.add_argument("--reasoners", nargs="+", default=list(REASONERS), choices=list(REASONERS))
+    parser.add_argument("--users", type=int, default=USERS_NUMBER)
+    parser.add_argument("--moods", type=int, default=MOODS_NUMBER)
+    parser.add_argument("--weathers", type=int, default=WEATHERS_NUMBER)
+    parser.add_argument("--times", type=int, default=TIMES_NUMBER)
+    parser.add_argument("--actions", type=int, default=ACTIONS_NUMBER)
+    parser.add_argument("--output", default=os.path.join(RESULTS_FOLDER, BENCHMARK_FILE))
+    parser.add_argument("--compare", nargs="?", const=os.path.join(RESULTS_FOLDER, BASELINE_FILE), default=None,
+                        help="compare the results with the stored baseline (exit code 1 on regressions)")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="show the prints of the system's components")
+    parser.add_argument("--minimization", action="store_true",
+                        help="minimize the induced rules before they are put in the ontology (e.g. to show "
+                             "the minimization's effect on the reasoning time)")
+    args = parser.parse_args()
+    # running the benchmark
+    benchmark_results = {"environment": {"python": platform.python_version(), "platform": platform.platform(),
+                                         "processor": platform.processor()},
+                         "config": {"users": args.users, "moods": args.moods, "weathers": args.weathers,
+                                    "times": args.times, "actions": args.actions,
+                                    "random_state": BENCHMARK_RANDOM_STATE,
+                                    "rules_minimization": args.minimization,
+                                    "max_world_reasoning_situations": MAX_WORLD_REASONING_SITUATIONS},
+                         "runs": run_suite(args.sizes, args.inductors, args.reasoners, args.users, args.moods,
+                                           args.weathers, args.times, args.actions, quiet=not args.verbose,
+                                           rules_minimization=args.minimization)}
+    # saving the results to .json file
+    with open(args.output, 'w') as f:
+        json.dump(benchmark_results, f, indent=4)
+    print(f"Results saved to: {args.output}")
+    if args.save_baseline:
+        with open(os.path.join(RESULTS_FOLDER, BASELINE_FILE), 'w') as f:
+            json.dump(benchmark_results, f, indent=4)
+        print(f"Baseline saved to: {os.path.join(RESULTS_FOLDER, BASELINE_FILE)}")
+    # comparing the results with the baseline
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline_results = json.load(f)
+        found_regressions = compare_with_baseline(benchmark_results, baseline_results)
+        print(f"Regressions found: {len(found_regressions)}")
+        if len(found_regressions) > 0:
+            sys.exit(1)
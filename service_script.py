@@ -0,0 +1,67 @@
+from integration.system_core import ReasoningAndLearningSystemPrototype
+from integration.classification_service import ClassificationService, ServiceClient
+import asyncio
+import csv
+import os
+
+
+ONTO_NAME = "jp_masters_project.owl"
+KNOWLEDGE_FOLDER = "knowledge_folder"
+RULES_INDUCTOR_TYPE = "sklearn"
+REASONER_TYPE = "pellet"
+RULES_ENGINE_MODE = "off"
+REASONING_SCOPE = "world"
+REASONER_WORKER = False
+CACHE_SIZE = 0
+BACKGROUND_LEARNING = False
+SYSTEM_RANDOM_STATE = 100
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+# number of the simulated robots replaying the 'test dataset' at once (0 - serving the actual robots until Ctrl+C)
+DEMO_ROBOTS = 4
+REPLAY_DATASET = "actions_test.csv"
+REPLAY_FIRST_ROW = 20
+
+
+async def run_demo_robot(robot_id, rows):
+    """ Simulated robot sending its observations (with the expected actions) to the service, one at a time """
+    client = ServiceClient(SERVICE_HOST, SERVICE_PORT)
+    await client.connect()
+    for row in rows:
+        situation = {"User": row["hadUser"], "General_mood": row["hadMood"], "Weather": row["wasWeather"],
+                     "General_time": row["wasTime"]}
+        outcome = await client.classify(situation, expected_action=row["takenAction"])
+        print(f"Robot {robot_id}: outcome for '{outcome.get('situation')}': {outcome.get('action')} "
+              f"(latency: {outcome.get('latency', 0.0):.3f}s)")
+    stats = await client.get_stats()
+    await client.close()
+    return stats
+
+
+async def main():
+    ral_sys = ReasoningAndLearningSystemPrototype()
+    # the service answers the system's questions with the robots' feedback
+    service = ClassificationService(ral_sys, SERVICE_HOST, SERVICE_PORT)
+    ral_sys.load_components(ONTO_NAME, rules_inductor_type=RULES_INDUCTOR_TYPE, reasoner_type=REASONER_TYPE,
+                            random_state=SYSTEM_RANDOM_STATE, rules_engine_mode=RULES_ENGINE_MODE,
+                            reasoning_scope=REASONING_SCOPE, reasoner_worker=REASONER_WORKER,
+                            cache_size=CACHE_SIZE, background_learning=BACKGROUND_LEARNING)
+    await service.start()
+    try:
+        if DEMO_ROBOTS > 0:
+            # each robot replays its share of the 'test dataset'
+            with open(os.path.join(KNOWLEDGE_FOLDER, REPLAY_DATASET), 'r') as f:
+                rows = list(csv.DictReader(f, delimiter=';'))[REPLAY_FIRST_ROW:]
+            all_stats = await asyncio.gather(*[run_demo_robot(i, rows[i::DEMO_ROBOTS]) for i in range(DEMO_ROBOTS)])
+            print(f"Service's statistics seen by the last robot: {all_stats[-1]}")
+        else:
+            await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Service stopped")
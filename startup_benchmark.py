@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+
+RESULTS_FOLDER = "results"
+BENCHMARK_FILE = "startup_benchmark.json"
+REPEATS = 5
+# modules that make the startup slow (reported if they were imported)
+HEAVY_MODULES = ["pandas", "sklearn", "chefboost", "tensorflow", "matplotlib"]
+# code run by the fresh interpreter in each scenario
+STARTUP_SCENARIOS = {
+    # importing the system (as the main script does)
+    "system_import": "import main_system_script",
+    # everything a classification-only process needs before the first observation
+    "classification_ready": "from integration.system_core import ReasoningAndLearningSystemPrototype\n"
+                            "from integration.rules_induction import get_rules_inductor_class\n"
+                            "from owlready2 import get_ontology\n"
+                            "onto = get_ontology('file://knowledge_folder/jp_masters_project.owl').load()\n"
+                            "get_rules_inductor_class('sklearn')(onto)",
+    # the backends, imported only when they are needed
+    "sklearn_backend": "import integration.rules_induction\n"
+                       "from sklearn.tree import DecisionTreeClassifier, export_text\n"
+                       "from sklearn.compose import make_column_transformer",
+    "chefboost_backend": "import integration.rules_induction\nfrom chefboost import Chefboost",
+    "visualizer": "import other_functions.results_visualizer",
+}
+
+
+def run_scenario(code, repeats=REPEATS):
+    """ Measuring the time (in seconds) of running the code by the fresh interpreter, the given number of times;
+     returns the times and the heavy modules imported by the code """
+    report = f"\nimport sys, json\nprint(json.dumps([m for m in {HEAVY_MODULES} if m in sys.modules]))"
+    times = []
+    imported_modules = []
+    for _ in range(repeats):
+        start_time = perf_counter()
+        result = subprocess.run([sys.executable, "-c", code + report], capture_output=True, text=True, check=True)
+        times.append(perf_counter() - start_time)
+        imported_modules = json.loads(result.stdout.strip().splitlines()[-1])
+    return times, imported_modules
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time of the system's processes (fresh interpreters)")
+    parser.add_argument("--scenarios", nargs="+", default=list(STARTUP_SCENARIOS), choices=list(STARTUP_SCENARIOS))
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default=os.path.join(RESULTS_FOLDER, BENCHMARK_FILE))
+    args = parser.parse_args()
+    # the baseline - starting the interpreter itself
+    benchmark_results = {"python": run_scenario("pass", args.repeats)[0]}
+    print(f"Interpreter's startup: {statistics.median(benchmark_results['python']):.3f}s")
+    for scenario in args.scenarios:
+        scenario_times, heavy_modules = run_scenario(STARTUP_SCENARIOS[scenario], args.repeats)
+        benchmark_results[scenario] = scenario_times
+        print(f"{scenario}: median {statistics.median(scenario_times):.3f}s, min {min(scenario_times):.3f}s "
+              f"(heavy modules: {', '.join(heavy_modules) if len(heavy_modules) > 0 else 'none'})")
+    # saving the results to .json file
+    with open(args.output, 'w') as f:
+        json.dump(benchmark_results, f, indent=4)
+    print(f"Results saved to: {args.output}")